@@ -0,0 +1,91 @@
+# scripts/benchmarks/context_allocations.py
+"""
+Allocation benchmark for context building (ContextBuilder.build + catalog import merge).
+
+Usage:
+    PYTHONPATH=scripts python3 scripts/benchmarks/context_allocations.py [--dependencies 50] [--config-keys 2000]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+from manifest_generator.context import ContextBuilder
+from manifest_generator.processors.imports import ImportProcessor
+
+
+def synthetic_ssot(dependencies: int, config_keys: int) -> dict:
+    """A service with a large config block, many sidecars and a few cross-references."""
+    return {
+        "import": "catalog/bench.yml",
+        "overrides": {
+            "service": {"name": "aac-bench", "hostname": "bench"},
+            "config": {
+                "domain_name": "int.example.com",
+                "settings": {f"key_{i}": {"value": i, "tags": [f"t{i}", "x"]} for i in range(config_keys)},
+            },
+            "environment": {"URL": "https://{{ service.hostname }}.{{ config.domain_name }}"},
+            "dependencies": {
+                f"dep{i}": {"import": "catalog/sidecar.yml", "overrides": {"environment": {"INDEX": str(i)}}}
+                for i in range(dependencies)
+            },
+        },
+        "stage_overrides": {"prod": {"overrides": {"config": {"domain_name": "example.com"}}}},
+    }
+
+
+def write_catalog(root: str, config_keys: int):
+    os.makedirs(os.path.join(root, "catalog"))
+    blueprint = {"service": {"image_repo": "bench"}, "config": {"defaults": {f"d{i}": i for i in range(config_keys)}}}
+    sidecar = {"service": {"image_repo": "redis"}, "environment": {"MODE": "sidecar"}, "ports": [{"port": 6379}]}
+    for name, data in (("bench.yml", blueprint), ("sidecar.yml", sidecar)):
+        with open(os.path.join(root, "catalog", name), "w", encoding="utf-8") as f:
+            json.dump(data, f)  # JSON is valid YAML
+
+
+def measure(ssot_json: str, importer: ImportProcessor, rounds: int) -> dict:
+    # Warm-up: expression compilation and catalog parsing are per-process caches, not per-run cost
+    importer.process(ContextBuilder(ssot_json, "prod").build())
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        importer.process(ContextBuilder(ssot_json, "prod").build())
+    seconds = (time.perf_counter() - start) / rounds
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Allocated blocks of one run (tracing overhead excluded)
+    before = sys.getallocatedblocks()
+    context = importer.process(ContextBuilder(ssot_json, "prod").build())
+    blocks = sys.getallocatedblocks() - before
+    del context
+    return {"ms_per_run": round(seconds * 1000, 2), "peak_kib": peak // 1024, "live_blocks": blocks}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure allocations of context building")
+    parser.add_argument('--dependencies', type=int, default=50, help="Number of imported sidecars")
+    parser.add_argument('--config-keys', type=int, default=2000, help="Size of the config block")
+    parser.add_argument('--rounds', type=int, default=20, help="Timed iterations")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        write_catalog(root, args.config_keys)
+        ssot_json = json.dumps(synthetic_ssot(args.dependencies, args.config_keys))
+        importer = ImportProcessor(root)
+        stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+        try:
+            result = measure(ssot_json, importer, args.rounds)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+    print(json.dumps({"dependencies": args.dependencies, "config_keys": args.config_keys, **result}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
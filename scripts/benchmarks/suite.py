@@ -0,0 +1,267 @@
+# scripts/benchmarks/suite.py
+"""
+Benchmark suite for the manifest generator: synthetic services of increasing size plus a fleet scenario.
+
+Times schema validation, ContextBuilder.build, every processor and every ManifestEngine.render_* method per
+service size, and a whole fleet through the batch runner. Results can be stored and compared against a baseline.
+
+Usage:
+    PYTHONPATH=scripts python3 scripts/benchmarks/suite.py --template-path . [--sizes small,medium,large]
+        [--fleet 200] [--output bench.json] [--baseline bench.json --threshold 0.25]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+from contextlib import nullcontext, redirect_stdout
+
+from manifest_generator.batch import run_batch
+from manifest_generator.context import ContextBuilder
+from manifest_generator.engine import ManifestEngine
+from manifest_generator.fingerprint import engine_version
+from manifest_generator.output import OutputWriter
+from manifest_generator.pipeline import build_processors, load_ssot
+from manifest_generator.processors.model import CONTEXT_MODEL_KEY
+from manifest_generator.schema import validate_ssot
+from manifest_generator.timings import Timings, recording
+
+RESULTS_FORMAT = 1
+
+# Knobs per fixture size: sidecars, volumes, ports, environment variables, custom files
+SIZES = {
+    'small': {'dependencies': 1, 'volumes': 2, 'ports': 1, 'env': 10, 'files': 1},
+    'medium': {'dependencies': 5, 'volumes': 10, 'ports': 5, 'env': 100, 'files': 10},
+    'large': {'dependencies': 25, 'volumes': 50, 'ports': 20, 'env': 1000, 'files': 50},
+}
+SIDECAR_BLUEPRINTS = ('catalog/mariadb.yml', 'catalog/redis.yml', 'catalog/postgres.yml', 'catalog/mosquitto.yml')
+
+# Differences below this are timer noise, not regressions
+NOISE_FLOOR_MS = 0.05
+
+CUSTOM_FILE_TEMPLATE = """\
+# {{ service.name }} generated config
+server:
+  url: "https://{{ service.hostname }}.{{ config.domain_name }}"
+environment:
+{%- for key, value in environment.items() %}
+  {{ key }}: {{ value | tojson }}
+{%- endfor %}
+ports: {{ processed_ports | tojson }}
+"""
+
+
+def synthetic_service(name: str, dependencies: int, volumes: int, ports: int, env: int) -> dict:
+    """A service.yml with the given number of elements; every tenth value is a templated cross-reference."""
+    environment = {}
+    for i in range(env):
+        if i % 10 == 0:
+            environment[f"URL_{i}"] = "https://{{ service.hostname }}.{{ config.domain_name }}/" + str(i)
+        elif i % 25 == 1:
+            environment[f"SERVICE_PASSWORD_{i}"] = f"secret-{i}"
+        else:
+            environment[f"SETTING_{i}"] = f"value-{i}"
+
+    return {
+        'service': {
+            'name': name, 'friendly_name': name.title(), 'description': f"Synthetic service {name}",
+            'category': "Benchmarks", 'icon': "mdi-speedometer", 'stage': "dev", 'hostname': name,
+            'image_repo': f"ghcr.io/example/{name}", 'image_tag': "1.0.0",
+        },
+        'config': {
+            'domain_name': "int.example.com",
+            'integrations': {
+                'traefik': {'enabled': True, 'internet_facing': False},
+                'homepage': {'enabled': True, 'widget': {'type': "custom", 'url': "https://{{ service.hostname }}.{{ config.domain_name }}"}},
+                'autodns': {'enabled': True},
+            },
+        },
+        'environment': environment,
+        'secrets': {f"API_TOKEN_{i}": f"CHANGE_ME_{i}" for i in range(max(1, env // 20))},
+        'ports': [
+            {'name': 'web' if i == 0 else f"port{i}", 'port': 8000 + i, 'protocol': "TCP",
+             **({'external_port': 30000 + i} if i % 2 == 0 else {})}
+            for i in range(ports)
+        ],
+        'volumes': {f"vol{i}": {'description': f"Volume {i}", 'target': f"/data/{i}"} for i in range(volumes)},
+        'deployments': {'docker_compose': {
+            'restart_policy': "always", 'host_base_path': "/export/docker",
+            'volumes': [f"vol{i}:/data/{i}" for i in range(volumes)],
+        }},
+        'dependencies': {
+            f"dep{i}": {'import': SIDECAR_BLUEPRINTS[i % len(SIDECAR_BLUEPRINTS)], 'overrides': {
+                'name': "{{ service.name }}-dep" + str(i),
+                'environment': {'PARENT': "{{ service.name }}", 'INDEX': str(i)},
+            }}
+            for i in range(dependencies)
+        },
+    }
+
+
+def write_service(root: str, name: str, size: str) -> str:
+    """Writes a synthetic service repository (service.yml + custom files) and returns its service.yml path."""
+    knobs = SIZES[size]
+    repo = os.path.join(root, name)
+    files_dir = os.path.join(repo, 'custom_templates', 'files', 'config')
+    os.makedirs(files_dir, exist_ok=True)
+    for i in range(knobs['files']):
+        with open(os.path.join(files_dir, f"generated-{i}.yml.j2"), 'w', encoding='utf-8') as f:
+            f.write(CUSTOM_FILE_TEMPLATE)
+
+    ssot = synthetic_service(name, knobs['dependencies'], knobs['volumes'], knobs['ports'], knobs['env'])
+    path = os.path.join(repo, 'service.yml')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(ssot, f, indent=2)  # JSON is valid YAML
+    return path
+
+
+def best_of(rounds: int, fn, setup=None) -> float:
+    """Fastest of rounds calls in ms; setup() runs untimed before each call and its result is passed to fn."""
+    best = None
+    for _ in range(rounds):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        fn(arg) if setup else fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None or elapsed < best else best
+    return round(best * 1000, 3)
+
+
+def bench_service(template_path: str, ssot_file: str, rounds: int) -> dict:
+    """{'phase': ms} for one synthetic service."""
+    results = {}
+    service_dir = os.path.dirname(ssot_file)
+    ssot_json = load_ssot(ssot_file)
+    raw_ssot = json.loads(ssot_json)
+    pipeline = build_processors(template_path)
+
+    results['schema.validate'] = best_of(rounds, lambda: validate_ssot(raw_ssot))
+    results['context.build'] = best_of(rounds, lambda: ContextBuilder(json.loads(ssot_json), 'dev').build())
+
+    # Each processor is timed on the context exactly as the previous processors left it
+    timings = {}
+    for _ in range(rounds):
+        context = ContextBuilder(json.loads(ssot_json), 'dev').build()
+        context['deployment_enabled'] = True
+        for proc in pipeline:
+            start = time.perf_counter()
+            context = proc.process(context)
+            elapsed = time.perf_counter() - start
+            name = type(proc).__name__
+            timings[name] = min(timings.get(name, elapsed), elapsed)
+    context.pop(CONTEXT_MODEL_KEY, None)
+    for name, seconds in timings.items():
+        results[f"processor.{name}"] = round(seconds * 1000, 3)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        def engine(_=None):
+            return ManifestEngine(template_path, service_dir, output_dir, OutputWriter())
+        results['render.all'] = best_of(rounds, lambda e: e.render_all(context, 'docker_compose'), engine)
+        results['render.files'] = best_of(rounds, lambda e: e.render_files(context), engine)
+        results['render.documentation'] = best_of(rounds, lambda e: e.render_documentation(context), engine)
+    return results
+
+
+def bench_fleet(template_path: str, services: int, jobs: int, timings: Timings = None) -> dict:
+    """Renders a fleet (a mix of sizes) through the batch runner: cold serial, cold parallel, warm incremental."""
+    mix = ['small'] * 6 + ['medium'] * 3 + ['large']
+    results = {}
+    with tempfile.TemporaryDirectory() as root:
+        ssot_files = [write_service(root, f"aac-svc{i:04d}", mix[i % len(mix)]) for i in range(services)]
+
+        def run(label, **kwargs):
+            start = time.perf_counter()
+            units = run_batch(ssot_files, ['dev'], template_path, explicit_stages=True, timings=timings, **kwargs)
+            results[f"fleet.{label}"] = round((time.perf_counter() - start) * 1000, 3)
+            failed = [u for u in units if not u['ok']]
+            if failed:
+                raise RuntimeError(f"Fleet scenario failed for {failed[0]['service']}: {failed[0]['error']}")
+
+        run('serial', jobs=1, incremental=False)
+        if jobs > 1:
+            run(f"parallel_{jobs}", jobs=jobs, incremental=False)
+        # Everything rendered above is unchanged now: measures the fingerprint fast path
+        run('incremental', jobs=1, incremental=True)
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Names of metrics that got slower than baseline by more than threshold (a fraction)."""
+    regressions = []
+    for name, ms in sorted(results.items()):
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if ms > before * (1 + threshold) and ms - before > NOISE_FLOOR_MS:
+            regressions.append(f"{name}: {before:.3f} ms -> {ms:.3f} ms (+{(ms / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def run_suite(template_path: str, sizes: list, rounds: int = 5, fleet: int = 0, jobs: int = 1,
+              timings: Timings = None) -> dict:
+    """
+    Runs the selected scenarios and returns {'size/phase' or 'fleet.*': ms}; generator output is discarded.
+    With a Timings recorder, the generator's own phase timings of all scenarios are collected into it as well.
+    """
+    template_path = os.path.abspath(template_path)
+    results = {}
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        with tempfile.TemporaryDirectory() as root, recording(timings) if timings else nullcontext():
+            for size in sizes:
+                ssot_file = write_service(root, f"aac-bench-{size}", size)
+                for phase, ms in bench_service(template_path, ssot_file, rounds).items():
+                    results[f"{size}/{phase}"] = ms
+        if fleet:
+            results.update(bench_fleet(template_path, fleet, jobs, timings))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the manifest generator on synthetic services")
+    parser.add_argument('--template-path', default='.', help="Path to template engine repo")
+    parser.add_argument('--sizes', default='small,medium,large', help=f"Comma separated fixture sizes ({', '.join(SIZES)})")
+    parser.add_argument('--rounds', type=int, default=5, help="Repetitions per measurement (the fastest counts)")
+    parser.add_argument('--fleet', type=int, default=0, help="Also render a fleet of this many services (e.g. 200)")
+    parser.add_argument('--jobs', '-j', type=int, default=0, help="Worker processes for the parallel fleet run (0 = one per CPU core)")
+    parser.add_argument('--output', help="Store the results as JSON")
+    parser.add_argument('--baseline', help="Results of an earlier run to compare against")
+    parser.add_argument('--trace', help="Also record the generator's phase timings and write them as a Chrome trace")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Allowed slowdown against the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    sizes = [s.strip() for s in args.sizes.split(',') if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(unknown)}")
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+
+    timings = Timings() if args.trace else None
+    results = run_suite(args.template_path, sizes, args.rounds, args.fleet, jobs, timings)
+    for name, ms in results.items():
+        print(f"  {name:<48} {ms:>12.3f} ms")
+    if timings is not None:
+        timings.write_chrome_trace(args.trace)
+        print(f"\n  [I] Chrome trace written to {args.trace}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'format': RESULTS_FORMAT, 'python': platform.python_version(), 'engine': engine_version(),
+                       'rounds': args.rounds, 'results': results}, f, indent=2)
+        print(f"\n  [I] Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n  [X] {len(regressions)} regression(s) against {args.baseline}:")
+            for line in regressions:
+                print(f"      {line}")
+            sys.exit(1)
+        print(f"\n  [I] No regressions against {args.baseline} (threshold {args.threshold:.0%})")
+
+
+if __name__ == "__main__":
+    main()
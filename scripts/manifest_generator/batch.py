@@ -0,0 +1,257 @@
+# scripts/manifest_generator/batch.py
+import argparse
+import sys
+import os
+import io
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext, redirect_stdout, redirect_stderr
+
+from .context_io import CONTEXT_FORMATS, CONTEXT_SIDECARS
+from .fleet import discover_services
+from .engine import configure_bytecode_cache, precompile_templates
+from .output import OutputWriter
+from .pipeline import OUTPUTS, ContextBase, load_ssot, build_processors, generate, output_modes
+from .processors.memo import PROCESSOR_CACHE_ENV, ProcessorMemo, format_hit_rates
+from .timings import Timings, recording, span
+
+def output_dir_for(ssot_file: str, stage: str, output_root: str = None, multi_stage: bool = False) -> str:
+    """Each service (and stage, if several are rendered) gets its own deployments directory."""
+    service_dir = os.path.dirname(ssot_file)
+    if output_root:
+        base = os.path.join(output_root, os.path.basename(service_dir))
+    else:
+        base = os.path.join(service_dir, "deployments")
+    return os.path.join(base, stage) if multi_stage else base
+
+def _cached_base(ssot_file: str, cache: dict) -> ContextBase:
+    """Keeps the last parsed and merged SSoT so consecutive stages of one service skip the YAML parse and merge."""
+    if cache.get('path') != ssot_file:
+        cache['path'], cache['base'] = ssot_file, ContextBase(load_ssot(ssot_file))
+    return cache['base']
+
+def run_unit(ssot_file: str, stage: str, output_dir: str, options: dict, processors: list, ssot_cache: dict) -> dict:
+    """Renders one (service, stage) unit and reports its outcome instead of raising."""
+    print(f"\n[*] {ssot_file} ({stage}) -> {output_dir}")
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    error, status = None, None
+    writer = OutputWriter()
+    memo = getattr(processors, 'memo', None)
+    memo_before = {name: list(counts) for name, counts in memo.stats.items()} if memo else {}
+    # With timings, every unit records into its own Timings; run_batch merges them
+    recorder = Timings() if options['timings'] else None
+    unit = f"{os.path.basename(os.path.dirname(ssot_file))} ({stage})"
+    try:
+        with recording(recorder) if recorder else nullcontext(), span(unit, 'unit'):
+            base = _cached_base(ssot_file, ssot_cache)
+            status = generate(base.ssot_json, options['template_path'], stage, os.path.dirname(ssot_file), output_dir,
+                              processors, options['deployment_type'], options['process_documentation'],
+                              options['process_files'], strategy_stage=not options['explicit_stages'],
+                              writer=writer, incremental=options['incremental'],
+                              context_format=options['context_format'], context_sidecars=options['context_sidecars'], base=base,
+                              outputs=options['outputs'])['status']
+        if status == 'disabled':
+            print("  [!] DEPLOYMENT SKIPPED: Branch is disabled by deployment_strategy.")
+        print(f"  [I] Outputs: {writer.summary()}")
+    except Exception as e:
+        print(f"  [X] FAILED: {e}")
+        traceback.print_exc()
+        error = str(e)
+    return {
+        'service': ssot_file,
+        'stage': stage,
+        'output_dir': output_dir,
+        'ok': error is None,
+        'status': status,
+        'error': error,
+        'seconds': time.perf_counter() - started,
+        'cpu_seconds': time.process_time() - cpu_started,
+        'outputs': writer.counts(),
+        # Processor memo hits/misses of this unit: {name: [hits, misses]}
+        'processor_cache': {
+            name: [hits - memo_before.get(name, [0, 0])[0], misses - memo_before.get(name, [0, 0])[1]]
+            for name, (hits, misses) in memo.stats.items()
+        } if memo else {},
+        'timings': recorder.export() if recorder else None
+    }
+
+# Per-process state of a pool worker, populated once by _init_worker
+_WORKER = {}
+
+def _memo(options: dict):
+    if not options['memoize']:
+        return None
+    return ProcessorMemo(directory=options['processor_cache'])
+
+def _init_worker(template_path: str, template_subdirs: list, options: dict):
+    """Pre-warms a pool worker so every unit it receives reuses the same processor chain and caches."""
+    _WORKER['processors'] = build_processors(template_path, memo=_memo(options))
+    _WORKER['ssot_cache'] = {}
+    precompile_templates(template_path, template_subdirs)
+
+def _run_pooled_unit(ssot_file: str, stage: str, output_dir: str, options: dict) -> dict:
+    """Pool entry point: captures the unit's console output so the parent can print it in order."""
+    buffer = io.StringIO()
+    with redirect_stdout(buffer), redirect_stderr(buffer):
+        result = run_unit(ssot_file, stage, output_dir, options, _WORKER['processors'], _WORKER['ssot_cache'])
+    result['log'] = buffer.getvalue()
+    return result
+
+def run_batch(ssot_files: list, stages: list, template_path: str, output_root: str = None,
+              deployment_type: str = 'docker_compose', process_documentation: bool = False,
+              process_files: bool = False, explicit_stages: bool = False, jobs: int = 1,
+              incremental: bool = True, memoize: bool = False, processor_cache: str = None,
+              context_format: str = 'pretty', context_sidecars=(), timings: Timings = None, outputs=None) -> list:
+    """
+    Renders every (service, stage) unit and returns one result dict per unit, in input order.
+    With jobs > 1 the units are fanned out across a process pool; output stays deterministic.
+    With memoize, processor results are reused across units (and runs, given a processor_cache directory).
+    With a Timings recorder, the phase timings of every unit (from any worker) are merged into it.
+    outputs (see pipeline.OUTPUTS) renders several output families per unit from one context build.
+    """
+    multi_stage = len(stages) > 1
+    units = [(f, stage, output_dir_for(f, stage, output_root, multi_stage)) for f in ssot_files for stage in stages]
+    options = {
+        'template_path': template_path,
+        'deployment_type': deployment_type,
+        'process_documentation': process_documentation,
+        'process_files': process_files,
+        'explicit_stages': explicit_stages,
+        'incremental': incremental,
+        'memoize': memoize or bool(processor_cache),
+        'processor_cache': processor_cache,
+        'context_format': context_format,
+        'context_sidecars': tuple(context_sidecars),
+        'timings': timings is not None,
+        'outputs': tuple(outputs) if outputs is not None else None
+    }
+
+    if jobs <= 1 or len(units) <= 1:
+        # Processors are stateless, so one chain serves the whole batch
+        processors = build_processors(template_path, memo=_memo(options))
+        ssot_cache = {}
+        results = [run_unit(*unit, options, processors, ssot_cache) for unit in units]
+        return _merge_timings(results, timings)
+
+    results = []
+    workers = min(jobs, len(units))
+    if outputs is not None:
+        subdirs = [mode for mode in output_modes(outputs, deployment_type) if mode != 'files']
+    else:
+        subdirs = ['documentation'] if process_documentation else ([] if process_files else [deployment_type])
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(template_path, subdirs, options)) as pool:
+        futures = [pool.submit(_run_pooled_unit, *unit, options) for unit in units]
+        # Collect in submission order so logs and results are identical to a serial run
+        for (ssot_file, stage, output_dir), future in zip(units, futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker itself died (e.g. BrokenProcessPool); record it against the unit
+                result = {'service': ssot_file, 'stage': stage, 'output_dir': output_dir, 'ok': False, 'status': None,
+                          'error': f"Worker failed: {e}", 'seconds': 0.0, 'cpu_seconds': 0.0,
+                          'outputs': OutputWriter().counts(), 'processor_cache': {}, 'timings': None, 'log': ''}
+            print(result.pop('log'), end='')
+            results.append(result)
+    return _merge_timings(results, timings)
+
+def _merge_timings(results: list, timings: Timings = None) -> list:
+    """Moves the per-unit timings out of the results into the batch recorder."""
+    for result in results:
+        exported = result.pop('timings', None)
+        if timings is not None and exported:
+            timings.merge(exported)
+    return results
+
+def print_summary(results: list, wall_seconds: float = None):
+    failed = [r for r in results if not r['ok']]
+    print("\n======================================================")
+    for r in results:
+        marker = ("SKIP" if r['status'] == 'unchanged' else "OK  ") if r['ok'] else "FAIL"
+        print(f"  [{marker}] {r['service']} ({r['stage']}) {r['seconds']:.2f}s wall, {r['cpu_seconds']:.2f}s cpu")
+    totals = {k: sum(r['outputs'][k] for r in results) for k in ('written', 'unchanged', 'removed')}
+    print(f"  Outputs: {totals['written']} written, {totals['unchanged']} unchanged, {totals['removed']} removed")
+    cache_stats = {}
+    for r in results:
+        for name, (hits, misses) in r.get('processor_cache', {}).items():
+            counts = cache_stats.setdefault(name, [0, 0])
+            counts[0] += hits
+            counts[1] += misses
+    if cache_stats:
+        print(f"  Processor cache hits: {format_hit_rates(cache_stats)}")
+    if wall_seconds is not None:
+        busy = sum(r['seconds'] for r in results)
+        print(f"  Batch wall time: {wall_seconds:.2f}s (sum of unit times: {busy:.2f}s)")
+    if failed:
+        print(f"  {len(failed)} out of {len(results)} units failed.")
+    else:
+        print(f"  All {len(results)} units rendered successfully.")
+    print("======================================================")
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch Manifest Generator (many services, one process)")
+    parser.add_argument('services', nargs='+', help="service.yml files, service repositories or a directory of repositories")
+    parser.add_argument('--template-path', required=True, help="Path to template engine repo")
+    parser.add_argument('--stage', default='dev', help="Deployment stage, may be overridden by deployment_strategy")
+    parser.add_argument('--stages', help="Comma separated stages rendered verbatim for every service (e.g. dev,test,prod)")
+    parser.add_argument('--output-root', help="Write to <output-root>/<repo>/ instead of <repo>/deployments/")
+    parser.add_argument('--deployment-type', default='docker_compose')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help="Parallel worker processes (0 = one per CPU core)")
+    parser.add_argument('--force', action='store_true', help="Ignore fingerprint manifests and regenerate every unit")
+    parser.add_argument('--bytecode-cache', help="Directory for the persistent Jinja bytecode cache (default: $AAC_TEMPLATE_CACHE_DIR)")
+    parser.add_argument('--memoize-processors', action='store_true', help="Reuse processor results across units with identical inputs")
+    parser.add_argument('--processor-cache', default=os.getenv(PROCESSOR_CACHE_ENV),
+                        help="Directory persisting memoized processor results across runs (default: $AAC_PROCESSOR_CACHE_DIR)")
+    parser.add_argument('--context-format', choices=CONTEXT_FORMATS, default='pretty',
+                        help="Layout of ansible_context.json (compact: no indentation, smaller and faster)")
+    parser.add_argument('--context-sidecar', action='append', choices=sorted(CONTEXT_SIDECARS), default=[],
+                        help="Also write the context as ansible_context.json.gz or ansible_context.msgpack (repeatable)")
+
+    parser.add_argument('--timings', action='store_true', help="Print wall/CPU time per phase, summed over all units")
+    parser.add_argument('--trace', help="Write the timings of all units as a Chrome trace (JSON) to this file (implies --timings)")
+
+    parser.add_argument('--process-documentation', action='store_true', help="Generate documentation")
+    parser.add_argument('--process-files', action='store_true', help="Process custom files")
+    parser.add_argument('--outputs', help=f"Comma separated outputs rendered from one context build ({','.join(OUTPUTS)})")
+
+    args = parser.parse_args()
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    if args.bytecode_cache:
+        configure_bytecode_cache(args.bytecode_cache)
+
+    try:
+        ssot_files = discover_services(args.services)
+    except FileNotFoundError as e:
+        print(f"FATAL ERROR: {e}")
+        sys.exit(1)
+    if not ssot_files:
+        print("FATAL ERROR: No service.yml files found.")
+        sys.exit(1)
+
+    outputs = [o.strip() for o in args.outputs.split(',') if o.strip()] if args.outputs else None
+    if outputs is not None:
+        try:
+            output_modes(outputs)
+        except ValueError as e:
+            parser.error(str(e))
+
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()] if args.stages else [args.stage]
+    started = time.perf_counter()
+    timings = Timings() if args.timings or args.trace else None
+    results = run_batch(ssot_files, stages, args.template_path, args.output_root, args.deployment_type,
+                        args.process_documentation, args.process_files, explicit_stages=bool(args.stages), jobs=jobs,
+                        incremental=not args.force, memoize=args.memoize_processors,
+                        processor_cache=args.processor_cache, context_format=args.context_format,
+                        context_sidecars=args.context_sidecar, timings=timings, outputs=outputs)
+
+    print_summary(results, time.perf_counter() - started)
+    if timings is not None:
+        print(f"\n  [I] Timings over all units (slowest first):\n{timings.summary()}")
+        if args.trace:
+            timings.write_chrome_trace(args.trace)
+            print(f"  [I] Chrome trace written to {args.trace} (open in chrome://tracing or ui.perfetto.dev)")
+    sys.exit(0 if all(r['ok'] for r in results) else 1)
+
+if __name__ == "__main__":
+    main()
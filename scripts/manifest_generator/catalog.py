@@ -0,0 +1,120 @@
+# scripts/manifest_generator/catalog.py
+import os
+import json
+import threading
+import yaml
+
+from .timings import span
+
+# libyaml's C parser is several times faster than the pure-Python SafeLoader
+SafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+CATALOG_INDEX_FILE = '.catalog-index.json'
+CATALOG_INDEX_ENV = 'AAC_CATALOG_INDEX'
+CATALOG_INDEX_FORMAT = 1
+
+# abs path -> (mtime_ns, size, parsed blueprint); entries are never handed out directly
+_CACHE = {}
+# template base -> {rel path: entry} from the pre-compiled index (empty if there is none)
+_INDEXES = {}
+_LOCK = threading.Lock()
+
+
+def load_yaml(stream):
+    """yaml.safe_load with the libyaml fast path when available."""
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def _view(node):
+    """Private copy of a cached blueprint: containers are copied, scalars (immutable) are shared."""
+    if isinstance(node, dict):
+        return {k: _view(v) for k, v in node.items()}
+    if isinstance(node, list):
+        return [_view(v) for v in node]
+    return node
+
+
+def _stat_key(path: str):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def index_path(template_path: str) -> str:
+    return os.getenv(CATALOG_INDEX_ENV) or os.path.join(template_path, 'catalog', CATALOG_INDEX_FILE)
+
+
+def _index_for(template_path: str) -> dict:
+    index = _INDEXES.get(template_path)
+    if index is None:
+        index = {}
+        try:
+            with open(index_path(template_path), 'r', encoding='utf-8') as f:
+                loaded = json.load(f)
+            if loaded.get('format') == CATALOG_INDEX_FORMAT:
+                index = loaded['blueprints']
+        except (OSError, ValueError, KeyError):
+            pass
+        _INDEXES[template_path] = index
+    return index
+
+
+def load_blueprint(template_path: str, import_path: str) -> dict:
+    """
+    Returns the parsed catalog blueprint template_path/import_path as a private, mutable copy.
+    Each file is parsed once per process (per mtime/size); the pre-compiled index avoids parsing entirely.
+    Raises FileNotFoundError if the blueprint does not exist.
+    """
+    template_path = os.path.abspath(template_path)
+    path = os.path.join(template_path, import_path)
+    key = _stat_key(path)
+
+    with span(import_path, 'catalog'), _LOCK:
+        cached = _CACHE.get(path)
+        if cached is None or cached[:2] != key:
+            entry = _index_for(template_path).get(os.path.relpath(path, template_path))
+            if entry is not None and (entry['mtime_ns'], entry['size']) == key:
+                data = entry['data']
+            else:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = load_yaml(f) or {}
+            cached = _CACHE[path] = (key[0], key[1], data)
+        return _view(cached[2])
+
+
+def clear_catalog_cache():
+    with _LOCK:
+        _CACHE.clear()
+        _INDEXES.clear()
+
+
+def build_catalog_index(template_path: str, output: str = None) -> int:
+    """Parses every catalog/*.yml once and stores the result as JSON (image build time). Returns the count."""
+    template_path = os.path.abspath(template_path)
+    catalog_dir = os.path.join(template_path, 'catalog')
+    blueprints = {}
+    for root, dirs, files in os.walk(catalog_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.endswith(('.yml', '.yaml')):
+                continue
+            path = os.path.join(root, name)
+            mtime_ns, size = _stat_key(path)
+            with open(path, 'r', encoding='utf-8') as f:
+                data = load_yaml(f) or {}
+            try:
+                exact = json.loads(json.dumps(data)) == data
+            except (TypeError, ValueError):
+                exact = False
+            if not exact:
+                # e.g. dates or non-string keys; these keep being parsed at runtime
+                print(f"  [!] Not indexing {path}: content does not round-trip through JSON")
+                continue
+            blueprints[os.path.relpath(path, template_path)] = {'mtime_ns': mtime_ns, 'size': size, 'data': data}
+
+    output = output or index_path(template_path)
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'format': CATALOG_INDEX_FORMAT, 'blueprints': blueprints}, f)
+    with _LOCK:
+        _INDEXES.pop(template_path, None)
+    return len(blueprints)
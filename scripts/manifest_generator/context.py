@@ -1,48 +1,104 @@
 # scripts/manifest_generator/context.py
 import json
-from copy import deepcopy
-from jinja2 import Environment
+from collections import namedtuple
+from copy import copy
+from functools import lru_cache
+from jinja2 import Environment, nodes
+from jinja2.sandbox import SandboxedEnvironment
+
+from .timings import span
+
+# Markers that turn a plain string leaf into a Jinja expression
+TEMPLATE_MARKERS = ('{{', '{%', '{#')
+
+# Upper bound of distinct expressions kept compiled per process (shared by all services and stages)
+EXPRESSION_CACHE_SIZE = 2048
+
+_EXPRESSION_ENV = Environment(trim_blocks=True, lstrip_blocks=True)
+# For SSoTs from untrusted sources (the daemon): no access to internals like __globals__
+_SANDBOXED_EXPRESSION_ENV = SandboxedEnvironment(trim_blocks=True, lstrip_blocks=True)
+
+CompiledExpression = namedtuple('CompiledExpression', ['render', 'references'])
+
+
+def reference_path(node):
+    """Turns a Getattr/Getitem chain like secrets['DB_PASS'].x into ('secrets', 'DB_PASS', 'x')."""
+    parts = []
+    while True:
+        if isinstance(node, nodes.Getattr):
+            parts.append(node.attr)
+            node = node.node
+        elif isinstance(node, nodes.Getitem) and isinstance(node.arg, nodes.Const):
+            parts.append(node.arg.value)
+            node = node.node
+        elif isinstance(node, nodes.Name):
+            parts.append(node.name)
+            return tuple(reversed(parts))
+        else:
+            return None
+
+
+def extract_references(node, refs: set) -> set:
+    """Collects every context path an expression AST reads from."""
+    # Method calls (secrets.items(), service.name.lower()) read the object they are called on
+    if isinstance(node, nodes.Call) and isinstance(node.node, nodes.Getattr):
+        extract_references(node.node.node, refs)
+        for child in node.iter_child_nodes(exclude=('node',)):
+            extract_references(child, refs)
+        return refs
+    if isinstance(node, (nodes.Getattr, nodes.Getitem, nodes.Name)):
+        ref = reference_path(node)
+        if ref is not None:
+            if not isinstance(node, nodes.Name) or node.ctx == 'load':
+                refs.add(ref)
+            return refs
+    for child in node.iter_child_nodes():
+        extract_references(child, refs)
+    return refs
+
+
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def compile_expression(source: str, sandboxed: bool = False) -> CompiledExpression:
+    """
+    Compiles one templated leaf into a reusable render callable plus the context paths it reads.
+    Identical expressions ({{ service.name }}, {{ config.domain_name }}) are compiled once per process.
+    """
+    env = _SANDBOXED_EXPRESSION_ENV if sandboxed else _EXPRESSION_ENV
+    ast = env.parse(source)
+    references = frozenset(extract_references(ast, set()))
+    return CompiledExpression(env.from_string(ast).render, references)
+
+
+def _clone(data):
+    """Copies every dict/list of a tree; leaves (strings, numbers) are shared."""
+    if isinstance(data, dict):
+        return {key: _clone(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_clone(value) for value in data]
+    return data
+
+
+def _containers(data, found: set) -> set:
+    """ids of every dict/list in a tree."""
+    if isinstance(data, (dict, list)):
+        found.add(id(data))
+        for value in (data.values() if isinstance(data, dict) else data):
+            _containers(value, found)
+    return found
+
 
 class ContextBuilder:
-    def __init__(self, ssot_json: str, stage: str):
-        self.raw_data = json.loads(ssot_json)
+    def __init__(self, ssot_json, stage: str, sandboxed: bool = False):
+        # Accepts the SSoT as JSON or as an already parsed dict; build() shares its subtrees with the result (see build())
+        self.raw_data = json.loads(ssot_json) if isinstance(ssot_json, str) else ssot_json
         self.stage = stage
+        # Renders the SSoT's expressions in a Jinja sandbox (untrusted input)
+        self.sandboxed = sandboxed
 
-    def _deep_merge(self, source, destination):
-        """Standard deep merge to ensure overrides don't wipe out existing blocks."""
-        for key, value in source.items():
-            if isinstance(value, dict):
-                node = destination.setdefault(key, {})
-                self._deep_merge(value, node)
-            else:
-                destination[key] = value
-        return destination
-
-    def _render_recursive(self, data: dict, passes=5) -> dict:
-        """
-        Resolves internal references (e.g., {{ secrets.DB_PASS }}).
-        Uses string-serialization to allow cross-referencing anywhere in the tree.
-        """
-        env = Environment(trim_blocks=True, lstrip_blocks=True)
-        current_render = json.dumps(data)
-        
-        for i in range(passes):
-            previous_render = current_render
-            context = json.loads(previous_render)
-            template = env.from_string(previous_render)
-            
-            # This handles the actual 'Rendering' of the entire YAML structure
-            current_render = template.render(context)
-            
-            if previous_render == current_render:
-                break
-        return json.loads(current_render)
-
-    def build(self) -> dict:
-        # 1. Start with the "Safety Net"
-        # This ensures Jinja never sees an 'Undefined' error for standard keys
-        context = {
-            "service": {"name": "app", "stage": self.stage},
+    def _safety_net(self, stage) -> dict:
+        """Standard keys, so Jinja never sees an 'Undefined' error for them."""
+        return {
+            "service": {"name": "app", "stage": stage},
             "config": {},
             "environment": {},
             "secrets": {},
@@ -55,20 +111,158 @@ class ContextBuilder:
                     "networks_to_join": []
                 }
             },
-            "stage": self.stage
+            "stage": stage
         }
 
-        # 2. Merge the actual SSoT data into the safety net
-        # We use deepcopy to avoid mutating the original raw_data
-        data = deepcopy(self.raw_data)
-        self._deep_merge(data, context)
+    def _deep_merge(self, source, destination, owned: set = None):
+        """
+        Deep merge to ensure overrides don't wipe out existing blocks.
+        Values from source are shared, not copied. With owned (ids of containers the builder created),
+        borrowed dicts of destination are copied before they are modified (copy-on-write).
+        """
+        for key, value in source.items():
+            node = destination.get(key)
+            if isinstance(value, dict) and isinstance(node, dict):
+                if owned is not None and id(node) not in owned:
+                    node = destination[key] = dict(node)
+                    owned.add(id(node))
+                self._deep_merge(value, node, owned)
+            else:
+                destination[key] = value
+        return destination
+
+    def _collect_templated_leaves(self, data, path=(), found=None) -> dict:
+        """
+        Walks the tree once and returns {path: source} for every string leaf containing Jinja markers.
+        Plain strings and non-string values are skipped and never reach Jinja.
+        """
+        if found is None:
+            found = {}
+        if isinstance(data, dict):
+            items = data.items()
+        elif isinstance(data, list):
+            items = enumerate(data)
+        else:
+            if isinstance(data, str) and any(m in data for m in TEMPLATE_MARKERS):
+                found[path] = data
+            return found
+
+        for key, value in items:
+            self._collect_templated_leaves(value, path + (key,), found)
+        return found
+
+    def _resolution_order(self, graph: dict) -> list:
+        """Topologically sorts templated leaves so every reference is resolved before its readers."""
+        order, state = [], {}
+
+        def visit(path, trail):
+            if state.get(path) == 'done':
+                return
+            if state.get(path) == 'active':
+                cycle = trail[trail.index(path):] + [path]
+                chain = ' -> '.join('.'.join(str(p) for p in step) for step in cycle)
+                raise ValueError(f"Circular reference in SSoT: {chain}")
+
+            state[path] = 'active'
+            trail.append(path)
+            for dep in graph[path]:
+                visit(dep, trail)
+            trail.pop()
+            state[path] = 'done'
+            order.append(path)
+
+        for path in graph:
+            visit(path, [])
+        return order
+
+    def _render_recursive(self, data: dict, owned: set = None) -> dict:
+        """
+        Resolves internal references (e.g., {{ secrets.DB_PASS }}).
+        Only string leaves carrying Jinja markers are compiled. A dependency graph between
+        them (environment.DB_URL -> secrets.DB_PASS) decides the order they are rendered in,
+        so every leaf is rendered exactly once against already-resolved values.
+        With owned, only the containers on the path to a rendered leaf are copied if borrowed.
+        """
+        leaves = self._collect_templated_leaves(data)
+        if not leaves:
+            return data
+
+        compiled = {path: compile_expression(source, self.sandboxed) for path, source in leaves.items()}
+
+        # 1. Build the graph: a leaf depends on every templated leaf inside (or above) a path it reads
+        by_root = {}
+        for path in leaves:
+            by_root.setdefault(path[0], []).append(path)
+
+        graph = {}
+        for path, expression in compiled.items():
+            deps = set()
+            for ref in expression.references:
+                for candidate in by_root.get(ref[0], []):
+                    depth = min(len(ref), len(candidate))
+                    # Reading a block that contains the leaf itself is not a dependency on it
+                    if candidate == path and len(ref) < len(path):
+                        continue
+                    if candidate[:depth] == ref[:depth]:
+                        deps.add(candidate)
+            graph[path] = sorted(deps, key=str)
+
+        # 2. Render in dependency order, writing each result back into the tree
+        for path in self._resolution_order(graph):
+            node = data
+            for key in path[:-1]:
+                child = node[key]
+                if owned is not None and id(child) not in owned:
+                    child = node[key] = copy(child)
+                    owned.add(id(child))
+                node = child
+            node[path[-1]] = compiled[path].render(data)
+
+        return data
+
+    def merge_base(self) -> dict:
+        """
+        The SSoT merged into the safety net with the stage left open (None): the part of the context
+        shared by every stage. build(base) derives a stage from a private copy, so one base serves many stages.
+        """
+        context = self._safety_net(None)
+        owned = _containers(context, set())
+        with span('context.merge'):
+            return self._deep_merge(self.raw_data, context, owned)
+
+    def build(self, base: dict = None) -> dict:
+        """
+        Returns the merged and rendered context. Untouched subtrees are shared with raw_data
+        instead of copied; only the containers a merge or render modifies are copied.
+        Mutating the result (as the processors do) therefore also affects raw_data.
+        With a base from merge_base(), the context is built from a full copy of it instead (shares nothing).
+        """
+        if base is None:
+            # 1. Start with the "Safety Net"
+            context = self._safety_net(self.stage)
+
+            # 2. Merge the actual SSoT data into the safety net
+            # Copy-on-write: raw_data subtrees are shared and only copied where a merge or render writes
+            owned = _containers(context, set())
+            with span('context.merge'):
+                self._deep_merge(self.raw_data, context, owned)
+        else:
+            # 1. + 2. Copy the shared base and fill in the stage wherever the SSoT left it open
+            with span('context.clone'):
+                context, owned = _clone(base), None
+            if context.get('stage') is None:
+                context['stage'] = self.stage
+            if isinstance(context.get('service'), dict) and context['service'].get('stage') is None:
+                context['service']['stage'] = self.stage
 
         # 3. Apply Stage Overrides (e.g., prod changes hostname)
         # We look for overrides specific to the current stage (dev/test/prod)
         overrides = context.pop("stage_overrides", {}).get(self.stage, {})
         if overrides:
-            self._deep_merge(overrides, context)
-        
-        # 4. Final Multi-pass rendering
+            with span('context.stage_overrides'):
+                self._deep_merge(overrides, context, owned)
+
+        # 4. Reference-graph rendering
         # This resolves all {{ }} brackets using the fully merged context
-        return self._render_recursive(context)
\ No newline at end of file
+        with span('context.render'):
+            return self._render_recursive(context, owned)
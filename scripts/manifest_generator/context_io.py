@@ -0,0 +1,138 @@
+# scripts/manifest_generator/context_io.py
+import os
+import json
+import re
+import gzip
+import math
+import zlib
+
+try:
+    import orjson
+except ImportError:  # optional speed-up, the stdlib encoder produces the same documents
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # only needed for the msgpack sidecar
+    msgpack = None
+
+CONTEXT_FILE = 'ansible_context.json'
+CONTEXT_FORMATS = ('pretty', 'compact')
+# Optional extra copies of the context next to ansible_context.json, for consumers that parse it often
+CONTEXT_SIDECARS = {'gzip': 'ansible_context.json.gz', 'msgpack': 'ansible_context.msgpack'}
+
+# An exponent in orjson output (1e16); the 'e' first lets re skip ahead quickly
+_ORJSON_EXPONENT = re.compile(rb'e(?<=[0-9]e)')
+
+# Encoder output is written in blocks of this size instead of one str for the whole document
+CHUNK_SIZE = 64 * 1024
+
+
+def _floats_match_json(value) -> bool:
+    """
+    False if value holds a float orjson writes differently from the json module: NaN and Infinity
+    (orjson: null) or exponent forms (1e+16 vs. 1e16).
+    """
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            stack.extend(item.values())
+            stack.extend(key for key in item if not isinstance(key, str))
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+        elif isinstance(item, float) and not (math.isfinite(item) and 'e' not in repr(item)):
+            return False
+    return True
+
+
+def _orjson(context: dict, compact: bool):
+    """
+    orjson encoding, or None if it would differ from the json module (see _floats_match_json) or cannot
+    encode the context (e.g. integers beyond 64 bit).
+    """
+    if orjson is None:
+        return None
+    option = orjson.OPT_NON_STR_KEYS | (0 if compact else orjson.OPT_INDENT_2)
+    try:
+        data = orjson.dumps(context, option=option)
+    except TypeError:
+        return None
+    # The walk over the context only runs if the output hints at such floats (NaN/Infinity become null)
+    suspect = b'null' in data or _ORJSON_EXPONENT.search(data)
+    if suspect and not _floats_match_json(context):
+        return None
+    return data
+
+
+def _buffered(pieces):
+    """Joins the encoder's many tiny str pieces into UTF-8 blocks of about CHUNK_SIZE."""
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buffer).encode('utf-8')
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def json_chunks(context: dict, compact: bool = False):
+    """
+    The context as JSON, as an iterable of bytes.
+    'pretty' is byte-identical to json.dumps(context, indent=2), whichever encoder runs: orjson output is
+    only used where it matches (pure ASCII, no NaN/Infinity or exponent-form floats), otherwise the stdlib
+    encoder streams the document in blocks.
+    'compact' has no whitespace and keeps non-ASCII characters as UTF-8.
+    """
+    data = _orjson(context, compact)
+    if data is not None and (compact or data.isascii()):
+        return [data]
+    if compact:
+        return [json.dumps(context, separators=(',', ':'), ensure_ascii=False).encode('utf-8')]
+    return _buffered(json.JSONEncoder(indent=2).iterencode(context))
+
+
+def gzip_chunks(chunks):
+    """gzip stream of chunks; the header carries no timestamp, so equal content gives equal bytes."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def context_layout(context_format: str = 'pretty', sidecars=()) -> str:
+    """Short description of the files write_context produces, e.g. 'compact+gzip' (part of the fingerprint)."""
+    return '+'.join([context_format, *sorted(set(sidecars))])
+
+
+def write_context(context: dict, output_dir: str, writer, context_format: str = 'pretty', sidecars=()):
+    """Writes ansible_context.json in the given format plus the selected sidecars through writer."""
+    if context_format not in CONTEXT_FORMATS:
+        raise ValueError(f"Unknown context format '{context_format}', expected one of {', '.join(CONTEXT_FORMATS)}")
+    writer.write_chunks(os.path.join(output_dir, CONTEXT_FILE), json_chunks(context, context_format == 'compact'))
+
+    for sidecar in sorted(set(sidecars)):
+        path = os.path.join(output_dir, CONTEXT_SIDECARS[sidecar])
+        if sidecar == 'gzip':
+            writer.write_chunks(path, gzip_chunks(json_chunks(context, compact=True)))
+        elif msgpack is None:
+            print(f"  [!] msgpack is not installed, not writing {CONTEXT_SIDECARS[sidecar]}")
+        else:
+            writer.write(path, msgpack.packb(context, use_bin_type=True))
+
+
+def read_context(path: str) -> dict:
+    """Loads a context written by write_context, in any of its formats (by file name)."""
+    if path.endswith('.msgpack'):
+        if msgpack is None:
+            raise RuntimeError(f"msgpack is required to read {path}")
+        with open(path, 'rb') as f:
+            return msgpack.unpackb(f.read(), raw=False, strict_map_key=False)
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        data = f.read()
+    return orjson.loads(data) if orjson is not None else json.loads(data)
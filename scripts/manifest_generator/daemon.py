@@ -0,0 +1,340 @@
+# scripts/manifest_generator/daemon.py
+import os
+import sys
+import json
+import hmac
+import time
+import socket
+import argparse
+import ipaddress
+import threading
+import traceback
+import socketserver
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import yaml
+from jinja2.exceptions import SecurityError
+
+from .catalog import clear_catalog_cache, load_yaml
+from .engine import clear_environment_cache, precompile_templates, template_subdirs
+from .fingerprint import data_fingerprint
+from .pipeline import OUTPUTS, build_context, build_processors, iter_outputs, output_modes, validate_inputs
+from .schema import SchemaValidationError
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8787
+# Upper bound of processed contexts kept warm (one per distinct SSoT, stage and branch)
+CONTEXT_CACHE_SIZE = 256
+MAX_REQUEST_BYTES = 8 * 1024 * 1024
+# Requests beyond max_concurrent wait this long (s) for a render slot before they are turned away (503)
+QUEUE_TIMEOUT = 30
+# Bearer token clients must send (Authorization: Bearer <token>); required to listen beyond loopback
+TOKEN_ENV = 'AAC_DAEMON_TOKEN'
+
+
+class RequestError(Exception):
+    """A request the daemon rejects: status is the HTTP status, payload the JSON error body."""
+    def __init__(self, status: int, message: str, **details):
+        super().__init__(message)
+        self.status = status
+        self.payload = {'error': message, **details}
+
+
+class ContextCache:
+    """Processed contexts keyed by their data fingerprint; the least recently used are evicted first."""
+    def __init__(self, size: int = CONTEXT_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        with self._lock:
+            context = self._entries.get(key)
+            if context is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return context
+
+    def put(self, key: str, context: dict):
+        with self._lock:
+            self._entries[key] = context
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'size': self.size, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions}
+
+
+def _ssot_payload(request: dict):
+    """(SSoT as JSON, original text or None) from a request's 'ssot': a mapping or YAML/JSON text."""
+    ssot = request.get('ssot')
+    if isinstance(ssot, str):
+        try:
+            data = load_yaml(ssot)
+        except yaml.YAMLError as e:
+            raise RequestError(400, f"'ssot' is not valid YAML: {e}")
+        source = ssot
+    else:
+        data, source = ssot, None
+    if not isinstance(data, dict):
+        raise RequestError(400, "'ssot' must be a mapping or YAML/JSON text of one")
+    return json.dumps(data), source
+
+
+class Generator:
+    """
+    Warm generator state shared by every request: one processor chain, the shared Jinja environments
+    (compiled templates), parsed catalog blueprints and an LRU cache of processed contexts.
+    At most max_concurrent requests render at a time. SSoT expressions and templates are rendered in a
+    Jinja sandbox, since requests are untrusted input.
+    """
+    def __init__(self, template_path: str, max_concurrent: int = 4, cache_size: int = CONTEXT_CACHE_SIZE,
+                 queue_timeout: float = QUEUE_TIMEOUT):
+        self.template_path = os.path.abspath(template_path)
+        self.processors = build_processors(self.template_path)
+        self.contexts = ContextCache(cache_size)
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self.started = time.time()
+        self.requests = 0
+        self.active = 0
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+
+    def warm(self) -> int:
+        """Compiles every global template up front; returns the count."""
+        return precompile_templates(self.template_path, template_subdirs(self.template_path), sandboxed=True)
+
+    def clear(self):
+        """Drops every warm cache (contexts, compiled templates, catalog)."""
+        self.contexts.clear()
+        clear_environment_cache()
+        clear_catalog_cache()
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests, active = self.requests, self.active
+        return {'ok': True, 'uptime_s': round(time.time() - self.started, 1), 'requests': requests,
+                'active': active, 'max_concurrent': self.max_concurrent, 'contexts': self.contexts.stats()}
+
+    def render(self, request: dict) -> dict:
+        """
+        Renders one request in memory: {'ssot': mapping or YAML/JSON text, 'stage', optional 'branch' (main),
+        'outputs' (see pipeline.OUTPUTS, default ['compose']), 'deployment_type', 'service_path' (checkout
+        providing custom_templates/)}. The stage is used verbatim; the branch only decides deployment_enabled.
+        Returns {'status': 'rendered' | 'disabled', 'cached_context', 'files': {path below deployments/: text}, 'ms'}.
+        """
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise RequestError(503, f"All {self.max_concurrent} render slots are busy")
+        with self._lock:
+            self.requests += 1
+            self.active += 1
+        try:
+            return self._render(request)
+        finally:
+            with self._lock:
+                self.active -= 1
+            self._slots.release()
+
+    def _render(self, request: dict) -> dict:
+        started = time.perf_counter()
+        if not isinstance(request, dict):
+            raise RequestError(400, "The request must be a JSON object")
+        ssot_json, source = _ssot_payload(request)
+        stage, branch = request.get('stage'), request.get('branch', 'main')
+        if not isinstance(stage, str) or not stage:
+            raise RequestError(400, "'stage' is required")
+        outputs = request.get('outputs', ['compose'])
+        deployment_type = request.get('deployment_type', 'docker_compose')
+        try:
+            output_modes(outputs, deployment_type)
+        except (TypeError, ValueError) as e:
+            raise RequestError(400, str(e))
+        # Without a service checkout only the global templates are rendered
+        service_path = request.get('service_path')
+        if service_path and not os.path.isdir(service_path):
+            raise RequestError(400, f"'service_path' {service_path} is not a directory")
+
+        # 1. Context: warm if this SSoT, stage and branch (and its catalog files) were seen before
+        key = data_fingerprint(ssot_json, stage, branch, self.template_path, False)
+        context = self.contexts.get(key)
+        cached = context is not None
+        if context is None:
+            try:
+                validate_inputs(ssot_json, self.template_path, source)
+            except SchemaValidationError as e:
+                raise RequestError(422, str(e).splitlines()[0], issues=[str(issue) for issue in e.issues])
+            try:
+                context = build_context(ssot_json, stage, self.processors, branch, strategy_stage=False, sandboxed=True)
+            except SecurityError as e:
+                raise RequestError(400, f"Unsafe expression in 'ssot': {e}")
+            self.contexts.put(key, context)
+
+        # 2. Render into memory; cached contexts are only read, so concurrent requests can share them
+        try:
+            files = dict(iter_outputs(context, self.template_path, service_path, outputs, deployment_type,
+                                      sandboxed=True))
+        except SecurityError as e:
+            raise RequestError(400, f"Unsafe template: {e}")
+        return {
+            'status': 'rendered' if context['deployment_enabled'] else 'disabled',
+            'cached_context': cached,
+            'files': dict(sorted(files.items())),
+            'ms': round((time.perf_counter() - started) * 1000, 3)
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """GET /health, POST /render (JSON request, see Generator.render) and POST /cache/clear."""
+    protocol_version = 'HTTP/1.1'
+    server_version = 'aac-manifest-daemon'
+
+    def _send(self, status: int, payload: dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self) -> bool:
+        token = self.server.token
+        if not token:
+            return True
+        if hmac.compare_digest(self.headers.get('Authorization', ''), f"Bearer {token}"):
+            return True
+        # The unread body would be taken for the next request
+        self.close_connection = True
+        self._send(401, {'error': "Missing or wrong bearer token"})
+        return False
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if self.path == '/health':
+            self._send(200, self.server.generator.stats())
+        else:
+            self._send(404, {'error': f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        generator = self.server.generator
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            if length > MAX_REQUEST_BYTES:
+                # The unread body would be taken for the next request
+                self.close_connection = True
+                raise RequestError(413, f"Request body exceeds {MAX_REQUEST_BYTES} bytes")
+            body = self.rfile.read(length)
+            if self.path == '/render':
+                try:
+                    request = json.loads(body or b'{}')
+                except ValueError as e:
+                    raise RequestError(400, f"Invalid JSON: {e}")
+                self._send(200, generator.render(request))
+            elif self.path == '/cache/clear':
+                generator.clear()
+                self._send(200, generator.stats())
+            else:
+                self._send(404, {'error': f"Unknown path {self.path}"})
+        except RequestError as e:
+            self._send(e.status, e.payload)
+        except Exception as e:
+            traceback.print_exc()
+            self._send(500, {'error': str(e)})
+
+    def address_string(self) -> str:
+        # Unix socket peers have no address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        print(f"  [I] {self.address_string()} {format % args}", file=sys.stderr)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def is_loopback(host: str) -> bool:
+    """True if every address host resolves to is a loopback address."""
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+    except socket.gaierror:
+        return False
+    return bool(addresses) and all(ipaddress.ip_address(a.split('%')[0]).is_loopback for a in addresses)
+
+
+def make_server(generator: Generator, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: str = None,
+                token: str = None):
+    """
+    HTTP server for generator on host:port, or on a Unix socket if socket_path is given. With a token, every
+    request needs 'Authorization: Bearer <token>'; without one the server only listens on loopback.
+    """
+    if not socket_path and not token and not is_loopback(host):
+        raise ValueError(f"Refusing to listen on {host} without a token: anyone reaching it could render")
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = _UnixHTTPServer(socket_path, _Handler)
+    else:
+        server = ThreadingHTTPServer((host, port), _Handler)
+        server.daemon_threads = True
+    server.generator = generator
+    server.token = token
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident manifest generator with warm caches and a local HTTP API")
+    parser.add_argument('--template-path', required=True, help="Path to template engine repo")
+    parser.add_argument('--socket', help="Listen on this Unix socket instead of TCP")
+    parser.add_argument('--host', default=DEFAULT_HOST,
+                        help=f"TCP address to listen on (default: {DEFAULT_HOST}); other than loopback needs a token")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"TCP port (default: {DEFAULT_PORT})")
+    parser.add_argument('--max-concurrent', type=int, default=os.cpu_count() or 1,
+                        help="Requests rendered at the same time (default: one per CPU core)")
+    parser.add_argument('--queue-timeout', type=float, default=QUEUE_TIMEOUT,
+                        help=f"Seconds a request waits for a free slot before it gets a 503 (default: {QUEUE_TIMEOUT})")
+    parser.add_argument('--cache-size', type=int, default=CONTEXT_CACHE_SIZE,
+                        help=f"Processed contexts kept warm, least recently used evicted first (default: {CONTEXT_CACHE_SIZE})")
+    parser.add_argument('--token-file', help=f"File holding the bearer token clients must send (default: ${TOKEN_ENV})")
+    args = parser.parse_args()
+
+    token = os.getenv(TOKEN_ENV)
+    if args.token_file:
+        with open(args.token_file, 'r', encoding='utf-8') as f:
+            token = f.read().strip()
+    if not args.socket and not token and not is_loopback(args.host):
+        parser.error(f"--host {args.host} is not a loopback address; set --token-file or ${TOKEN_ENV}")
+
+    generator = Generator(args.template_path, max(1, args.max_concurrent), args.cache_size, args.queue_timeout)
+    print(f"  [I] Compiled {generator.warm()} templates")
+    server = make_server(generator, args.host, args.port, args.socket, token)
+    where = args.socket or f"http://{args.host}:{server.server_address[1]}"
+    print(f"  [I] Serving on {where} (outputs: {', '.join(OUTPUTS)}; POST /render, GET /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+if __name__ == "__main__":
+    main()
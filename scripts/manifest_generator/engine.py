@@ -1,100 +1,298 @@
 # scripts/manifest_generator/engine.py
 import os
+import threading
 import yaml
-from jinja2 import Environment, FileSystemLoader, ChoiceLoader
+from collections import OrderedDict
+from jinja2 import Environment, FileSystemLoader, ChoiceLoader, FileSystemBytecodeCache, TemplateNotFound, TemplateSyntaxError
+from jinja2.sandbox import SandboxedEnvironment
+
+from .output import OutputWriter
+from .template_index import TemplateIndex, template_info
+from .timings import span
+
+# Environments are shared process-wide, keyed by their template search paths.
+# Every environment keeps its own compiled-template cache, so a global template
+# is compiled once no matter how many services render it.
+ENV_CACHE_SIZE = 256
+_ENV_CACHE = OrderedDict()
+_ENV_LOCK = threading.Lock()
+
+# Optional persistent bytecode cache (e.g. pre-populated in the engine image)
+BYTECODE_CACHE_ENV = 'AAC_TEMPLATE_CACHE_DIR'
+_BYTECODE_CACHE = None
+
+
+class _TolerantBytecodeCache(FileSystemBytecodeCache):
+    """Bytecode cache that degrades to read-only when the directory is not writable (e.g. non-root CI jobs)."""
+    def dump_bytecode(self, bucket):
+        try:
+            super().dump_bytecode(bucket)
+        except OSError:
+            pass
+
+
+def bytecode_cache_dir():
+    """Directory of the active bytecode cache, or None if it is disabled."""
+    return _BYTECODE_CACHE.directory if _BYTECODE_CACHE is not None else None
+
+
+def _to_yaml_filter(data, indent=2):
+    return yaml.dump(data, indent=indent, default_flow_style=False, sort_keys=False)
+
+
+def configure_bytecode_cache(directory: str = None):
+    """
+    Enables (or with None disables) the on-disk bytecode cache for all environments created afterwards.
+    Entries are keyed by template path and source checksum, so edited templates are recompiled.
+    """
+    global _BYTECODE_CACHE
+    if directory:
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError:
+            pass
+        _BYTECODE_CACHE = _TolerantBytecodeCache(directory)
+    else:
+        _BYTECODE_CACHE = None
+    clear_environment_cache()
+
+
+def get_environment(*search_paths: str, sandboxed: bool = False) -> Environment:
+    """
+    Returns the shared Environment for the given search paths (first path wins), creating it once.
+    sandboxed gives a SandboxedEnvironment (for untrusted templates or context) instead.
+    """
+    key = (sandboxed,) + tuple(os.path.abspath(p) for p in search_paths)
+    with _ENV_LOCK:
+        env = _ENV_CACHE.get(key)
+        if env is not None:
+            _ENV_CACHE.move_to_end(key)
+            return env
+
+        paths = key[1:]
+        if len(paths) == 1:
+            loader = FileSystemLoader(paths[0])
+        else:
+            loader = ChoiceLoader([FileSystemLoader(p) for p in paths])
+        if sandboxed:
+            # Sandboxed code differs from the regular one, but bytecode cache entries are keyed by template only
+            env = SandboxedEnvironment(loader=loader, trim_blocks=True, lstrip_blocks=True)
+        else:
+            env = Environment(loader=loader, trim_blocks=True, lstrip_blocks=True, bytecode_cache=_BYTECODE_CACHE)
+        env.filters['to_yaml'] = _to_yaml_filter
+
+        _ENV_CACHE[key] = env
+        if len(_ENV_CACHE) > ENV_CACHE_SIZE:
+            _ENV_CACHE.popitem(last=False)
+        return env
+
+
+def clear_environment_cache():
+    """Drops every shared Environment (and with it all compiled templates)."""
+    with _ENV_LOCK:
+        _ENV_CACHE.clear()
+
+
+def template_subdirs(template_base_path: str) -> list:
+    """Every deployment type (templates/<subdir>) that ships at least one .j2 template."""
+    root = os.path.join(template_base_path, 'templates')
+    subdirs = []
+    for entry in sorted(os.listdir(root)):
+        if not os.path.isdir(os.path.join(root, entry)):
+            continue
+        if any(name.endswith('.j2') for _, _, files in os.walk(os.path.join(root, entry)) for name in files):
+            subdirs.append(entry)
+    return subdirs
+
+
+def precompile_templates(template_base_path: str, subdirs: list, sandboxed: bool = False) -> int:
+    """
+    Compiles every global template of the given subdirectories into the shared cache
+    (and into the bytecode cache, if one is configured). Returns the count.
+    """
+    count = 0
+    for subdir in subdirs:
+        env = get_environment(os.path.join(template_base_path, 'templates', subdir), sandboxed=sandboxed)
+        for template_name in env.list_templates():
+            if not template_name.endswith('.j2'):
+                continue
+            try:
+                env.get_template(template_name)
+                count += 1
+            except TemplateSyntaxError as e:
+                # Not every .j2 is meant for this engine (e.g. Ansible role templates); warm what we can
+                print(f"  [!] Skipping {subdir}/{template_name}: {e}")
+    return count
+
 
 class ManifestEngine:
-    def __init__(self, template_base_path: str, service_repo_path: str):
+    def __init__(self, template_base_path: str, service_repo_path: str = None, output_path: str = "deployments",
+                 writer: OutputWriter = None, log=print, sandboxed: bool = False):
         self.template_base = template_base_path
+        # Renders in a Jinja sandbox (untrusted custom templates or context values)
+        self.sandboxed = sandboxed
+        # Without a service checkout only the global templates are rendered (no overlays, no custom files)
         self.service_path = service_repo_path
+        # Root for all rendered artifacts (relative paths resolve against the CWD)
+        self.output_path = output_path
+        # Skips unchanged files and tracks written/unchanged/removed outputs
+        self.writer = writer or OutputWriter()
+        # Progress lines go through log, so concurrent renders can buffer them (see pipeline.render_outputs)
+        self.log = log
+        # output path -> {'inputs': digest, 'output': sha256} from the previous run (see pipeline.generate)
+        self.previous_renders = {}
+        # output path -> input digest of this run
+        self.renders = {}
+        self._indexes = {}
 
-    def _to_yaml_filter(self, data, indent=2):
-        return yaml.dump(data, indent=indent, default_flow_style=False, sort_keys=False)
+    def _uses_overrides(self, env: Environment, name: str, overrides: set, seen=None) -> bool:
+        """True if the template, or anything it includes/extends, is overridden by the service."""
+        if name in overrides:
+            return True
+        seen = seen if seen is not None else set()
+        if name in seen:
+            return False
+        seen.add(name)
 
-    def render_all(self, context: dict, deployment_type: str):
-        # Setup loader: Look in Service Custom Templates FIRST, then Global Engine
-        loader = ChoiceLoader([
-            FileSystemLoader(os.path.join(self.service_path, 'custom_templates', deployment_type)),
-            FileSystemLoader(os.path.join(self.template_base, 'templates', deployment_type))
-        ])
+        try:
+            refs = template_info(env, name).includes
+        except TemplateNotFound:
+            # Only the overlay can provide it
+            return True
+        if refs is None:
+            return True
+        return any(self._uses_overrides(env, ref, overrides, seen) for ref in refs)
 
-        env = Environment(loader=loader, trim_blocks=True, lstrip_blocks=True)
-        env.filters['to_yaml'] = self._to_yaml_filter
+    def _custom_dir(self, subdir: str):
+        """The service's custom_templates/<subdir>, or None if it has none."""
+        if not self.service_path:
+            return None
+        custom_dir = os.path.join(self.service_path, 'custom_templates', subdir)
+        return custom_dir if os.path.isdir(custom_dir) else None
 
-        output_dir = os.path.join("deployments", deployment_type)
-        os.makedirs(output_dir, exist_ok=True)
+    def _environments(self, subdir: str):
+        """(global_env, overlay_env or None, overridden names) for templates/<subdir> + custom_templates/<subdir>."""
+        custom_dir = self._custom_dir(subdir)
+        global_dir = os.path.join(self.template_base, 'templates', subdir)
 
-        # Render every template found in the directory
-        for template_name in env.list_templates():
-            if not template_name.endswith('.j2'): continue
-            
-            print(f"  [>] Rendering: {template_name}")
-            template = env.get_template(template_name)
-            output_file = os.path.join(output_dir, template_name.replace('.j2', ''))
-            
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(template.render(context))
-                
-                
-                
-    def render_documentation(self, context: dict):
-        # Lade Templates aus dem 'documentation' Ordner
-        loader = ChoiceLoader([
-            FileSystemLoader(os.path.join(self.service_path, 'custom_templates', 'documentation')),
-            FileSystemLoader(os.path.join(self.template_base, 'templates', 'documentation'))
-        ])
-        env = Environment(loader=loader, trim_blocks=True, lstrip_blocks=True)
-        env.filters['to_yaml'] = self._to_yaml_filter
+        global_env = get_environment(global_dir, sandboxed=self.sandboxed)
+        overrides = set(FileSystemLoader(custom_dir).list_templates()) if custom_dir else set()
+        overlay_env = get_environment(custom_dir, global_dir, sandboxed=self.sandboxed) if overrides else None
+        return global_env, overlay_env, overrides
 
-        # MkDocs Struktur vorbereiten
-        base_output_dir = os.path.join("deployments", "documentation")
-        docs_output_dir = os.path.join(base_output_dir, "docs")
-        os.makedirs(docs_output_dir, exist_ok=True)
+    def template_index(self, subdir: str) -> TemplateIndex:
+        """Context reads and include graph of every template this service resolves for templates/<subdir>."""
+        global_env, overlay_env, _ = self._environments(subdir)
+        return TemplateIndex(overlay_env or global_env)
 
-        for template_name in env.list_templates():
+    def _index_for(self, env: Environment) -> TemplateIndex:
+        index = self._indexes.get(id(env))
+        if index is None:
+            index = self._indexes[id(env)] = TemplateIndex(env, [])
+        return index
+
+    def _render_to(self, output_file: str, template_name: str, template, env: Environment, context: dict,
+                   label: str = "Rendering") -> bool:
+        """Renders one template unless its inputs are identical to the previous run. Returns True if rendered."""
+        index = self._index_for(env)
+        index.add(template_name)
+        digest = index.input_digest(template_name, context)
+        self.renders[output_file] = digest
+
+        previous = self.previous_renders.get(output_file)
+        if previous and previous['inputs'] == digest and self.writer.keep(output_file, previous['output']):
+            self.log(f"  [=] Up to date: {template_name}")
+            return False
+
+        self.log(f"  [>] {label}: {template_name}")
+        with span(template_name, 'template'):
+            content = template.render(context)
+        self.writer.write(output_file, content)
+        return True
+
+    def _load_templates(self, subdir: str):
+        """
+        Yields (template_name, template, env) for every .j2 template of templates/<subdir>,
+        overlaid by the service's custom_templates/<subdir>.
+        Templates untouched by the overlay come from the shared global environment.
+        """
+        global_env, overlay_env, overrides = self._environments(subdir)
+
+        for template_name in sorted(set(global_env.list_templates()) | overrides):
             if not template_name.endswith('.j2'): continue
-            
-            print(f"  [>] Rendering Documentation: {template_name}")
-            template = env.get_template(template_name)
-            
-            # Dateinamen für MkDocs anpassen
-            if template_name == 'mkdocs.yml.j2':
-                output_file = os.path.join(base_output_dir, 'mkdocs.yml')
-            elif template_name == 'documentation.md.j2':
-                output_file = os.path.join(docs_output_dir, 'index.md')
+
+            if overlay_env is not None and self._uses_overrides(global_env, template_name, overrides):
+                yield template_name, overlay_env.get_template(template_name), overlay_env
             else:
-                output_file = os.path.join(docs_output_dir, template_name.replace('.j2', ''))
-                
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(template.render(context))
-                
+                yield template_name, global_env.get_template(template_name), global_env
+
+    def targets(self, mode: str):
+        """
+        Yields (output_file, template_name, template, env, label) for every template of an output family:
+        a deployment type, 'documentation' or 'files'. All outputs of a family lie below output_path/<mode>.
+        """
+        output_dir = os.path.join(self.output_path, mode)
+        if mode == 'files':
+            # Load templates directly from the custom files directory
+            base_src_dir = self._custom_dir('files')
+            if base_src_dir is None:
+                return
+            env = get_environment(base_src_dir, sandboxed=self.sandboxed)
+            for template_name in env.list_templates():
+                if not template_name.endswith('.j2'):
+                    continue
+                # This preserves subdirectory structures (e.g. data/seatcupra.netrc.j2 -> data/seatcupra.netrc)
+                output_file = os.path.join(output_dir, template_name.replace('.j2', ''))
+                yield output_file, template_name, env.get_template(template_name), env, "Rendering Custom File"
+
+        elif mode == 'documentation':
+            # Lade Templates aus dem 'documentation' Ordner
+            for template_name, template, env in self._load_templates('documentation'):
+                # Dateinamen für MkDocs anpassen
+                if template_name == 'mkdocs.yml.j2':
+                    output_file = os.path.join(output_dir, 'mkdocs.yml')
+                elif template_name == 'documentation.md.j2':
+                    output_file = os.path.join(output_dir, 'docs', 'index.md')
+                else:
+                    output_file = os.path.join(output_dir, 'docs', template_name.replace('.j2', ''))
+                yield output_file, template_name, template, env, "Rendering Documentation"
+
+        else:
+            # Look in Service Custom Templates FIRST, then Global Engine
+            for template_name, template, env in self._load_templates(mode):
+                yield os.path.join(output_dir, template_name.replace('.j2', '')), template_name, template, env, "Rendering"
+
+    def _render_family(self, context: dict, mode: str):
+        """Renders every target of mode through the writer and prunes what the family no longer produces."""
+        produced = set()
+        for output_file, template_name, template, env, label in self.targets(mode):
+            self._render_to(output_file, template_name, template, env, context, label)
+            produced.add(output_file)
+        self.writer.prune(os.path.join(self.output_path, mode), produced)
+
+    def iter_render(self, context: dict, mode: str):
+        """Yields (path relative to output_path, content) per template of mode, one at a time; writes nothing."""
+        for output_file, template_name, template, _, _ in self.targets(mode):
+            with span(template_name, 'template'):
+                content = template.render(context)
+            yield os.path.relpath(output_file, self.output_path), content
+
+    def render_all(self, context: dict, deployment_type: str):
+        self.writer.makedirs(os.path.join(self.output_path, deployment_type))
+        self._render_family(context, deployment_type)
+
+    def render_documentation(self, context: dict):
+        # MkDocs Struktur vorbereiten
+        self.writer.makedirs(os.path.join(self.output_path, "documentation", "docs"))
+        self._render_family(context, 'documentation')
+
     def render_files(self, context: dict):
-        base_src_dir = os.path.join(self.service_path, 'custom_templates', 'files')
-        if not os.path.exists(base_src_dir):
-            print("  [>] No custom files directory found. Skipping.")
+        if self._custom_dir('files') is None:
+            self.log("  [>] No custom files directory found. Skipping.")
             return
+        self._render_family(context, 'files')
 
-        # Load templates directly from the custom files directory
-        loader = FileSystemLoader(base_src_dir)
-        env = Environment(loader=loader, trim_blocks=True, lstrip_blocks=True)
-        env.filters['to_yaml'] = self._to_yaml_filter
 
-        output_base_dir = os.path.join("deployments", "files")
-
-        for template_name in env.list_templates():
-            if not template_name.endswith('.j2'): 
-                continue
-                
-            print(f"  [>] Rendering Custom File: {template_name}")
-            template = env.get_template(template_name)
-            
-            # This preserves subdirectory structures (e.g. data/seatcupra.netrc.j2 -> data/seatcupra.netrc)
-            relative_out_path = template_name.replace('.j2', '')
-            output_file = os.path.join(output_base_dir, relative_out_path)
-            
-            # Ensure the target subdirectories exist
-            os.makedirs(os.path.dirname(output_file), exist_ok=True)
-            
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(template.render(context))
-                
\ No newline at end of file
+# Honour a cache directory baked into the environment (see Dockerfile)
+if os.environ.get(BYTECODE_CACHE_ENV):
+    configure_bytecode_cache(os.environ[BYTECODE_CACHE_ENV])
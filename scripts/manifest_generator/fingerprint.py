@@ -0,0 +1,173 @@
+# scripts/manifest_generator/fingerprint.py
+import os
+import json
+import hashlib
+from functools import lru_cache
+
+import jinja2
+import yaml
+
+from .catalog import load_blueprint
+from .context_io import CONTEXT_FILE, read_context
+from .output import file_hash
+
+FINGERPRINT_FILE = '.fingerprints.json'
+FINGERPRINT_FORMAT = 1
+
+
+def _digest(*parts) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+@lru_cache(maxsize=1)
+def engine_version() -> str:
+    """Digest of the generator's own code and its Jinja/PyYAML versions; any change invalidates all fingerprints."""
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    parts = [jinja2.__version__, yaml.__version__]
+    for root, dirs, files in os.walk(package_dir):
+        dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+        for name in sorted(files):
+            if name.endswith('.py'):
+                path = os.path.join(root, name)
+                parts.append(os.path.relpath(path, package_dir))
+                parts.append(file_hash(path))
+    return _digest(*parts)
+
+
+def _import_paths(node, found: set):
+    """Adds the value of every 'import' key anywhere below node."""
+    if isinstance(node, dict):
+        if isinstance(node.get('import'), str):
+            found.add(node['import'].lstrip('/'))
+        for value in node.values():
+            _import_paths(value, found)
+    elif isinstance(node, list):
+        for value in node:
+            _import_paths(value, found)
+
+
+def catalog_imports(raw_ssot: dict, template_path: str = None) -> list:
+    """
+    Catalog files a service can import: every 'import' of the SSoT (root, dependencies, overrides, stage
+    overrides) and, with template_path, of the blueprints those load (e.g. dependencies a blueprint declares).
+    Listing a file the ImportProcessor ends up not loading only costs a hash.
+    """
+    found = set()
+    _import_paths(raw_ssot, found)
+    pending = sorted(found) if template_path else []
+    while pending:
+        try:
+            blueprint = load_blueprint(template_path, pending.pop())
+        except (OSError, yaml.YAMLError):
+            # Missing or broken blueprints are reported by validation and the ImportProcessor
+            continue
+        nested = set()
+        _import_paths(blueprint, nested)
+        pending += sorted(nested - found)
+        found |= nested
+    return sorted(found)
+
+
+def data_fingerprint(ssot_json: str, stage: str, current_branch: str, template_path: str, strategy_stage: bool = True) -> str:
+    """Everything the processed context depends on: SSoT, catalog blueprints, stage, branch and engine code."""
+    raw_ssot = json.loads(ssot_json)
+    parts = [engine_version(), ssot_json, stage, current_branch, strategy_stage]
+    for import_path in catalog_imports(raw_ssot, template_path):
+        parts += [import_path, file_hash(os.path.join(os.path.abspath(template_path), import_path))]
+    return _digest(*parts)
+
+
+def _hash_tree(directory: str, prefix: str, found: dict):
+    if not os.path.isdir(directory):
+        return
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith('.j2'):
+                path = os.path.join(root, name)
+                found[f"{prefix}/{os.path.relpath(path, directory)}"] = file_hash(path)
+
+
+def template_fingerprint(template_path: str, service_path: str, mode: str) -> dict:
+    """Hashes of every template the given output mode can resolve (service overlay and global engine)."""
+    found = {}
+    _hash_tree(os.path.join(service_path, 'custom_templates', mode), 'custom', found)
+    if mode != 'files':
+        _hash_tree(os.path.join(template_path, 'templates', mode), 'global', found)
+    return found
+
+
+class FingerprintManifest:
+    """
+    Input/output fingerprints of the last successful run, stored next to the generated outputs.
+    Lets the generator skip context building, processing and rendering when nothing changed.
+    """
+    def __init__(self, output_dir: str):
+        self.path = os.path.join(output_dir, FINGERPRINT_FILE)
+        self.output_dir = output_dir
+        self.data = {'format': FINGERPRINT_FORMAT, 'context': None, 'modes': {}}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                loaded = json.load(f)
+            if loaded.get('format') == FINGERPRINT_FORMAT:
+                self.data = loaded
+        except (OSError, ValueError):
+            pass
+
+    def _outputs_intact(self, outputs: dict) -> bool:
+        """Generated files must still exist with the content we wrote (guards against manual edits)."""
+        return all(file_hash(os.path.join(self.output_dir, rel)) == digest for rel, digest in outputs.items())
+
+    def context_is_current(self, data_fp: str) -> bool:
+        ctx = self.data.get('context')
+        return bool(ctx) and ctx['inputs'] == data_fp and self._outputs_intact(ctx['outputs'])
+
+    def context_is_reusable(self, data_fp: str) -> bool:
+        """The previous run's context is current and was written to disk (see generate's 'ansible' output)."""
+        return self.context_is_current(data_fp) and self.data['context'].get('layout', 'pretty') is not None
+
+    def load_context(self) -> dict:
+        return read_context(os.path.join(self.output_dir, CONTEXT_FILE))
+
+    def context_layout_is_current(self, data_fp: str, layout: str = 'pretty') -> bool:
+        return self.context_is_current(data_fp) and self.data['context'].get('layout', 'pretty') == layout
+
+    def mode_is_current(self, mode: str, data_fp: str, templates: dict) -> bool:
+        """The outputs of mode are intact and were rendered from these inputs (the context is checked separately)."""
+        entry = self.data['modes'].get(mode)
+        return (bool(entry) and entry['inputs'] == data_fp and entry['templates'] == templates
+                and self._outputs_intact(entry['outputs']))
+
+    def is_current(self, mode: str, data_fp: str, templates: dict, layout: str = 'pretty') -> bool:
+        return self.context_layout_is_current(data_fp, layout) and self.mode_is_current(mode, data_fp, templates)
+
+    def _relative(self, hashes: dict) -> dict:
+        return {os.path.relpath(p, self.output_dir): h for p, h in hashes.items()}
+
+    def record_context(self, data_fp: str, context_hashes: dict, layout: str = 'pretty'):
+        # layout: format and sidecars of the context files (see context_io.context_layout), None if not written
+        self.data['context'] = {'inputs': data_fp, 'outputs': self._relative(context_hashes), 'layout': layout}
+
+    def previous_renders(self, mode: str) -> dict:
+        """output path -> {'inputs': per-template input digest, 'output': sha256} of the last run of mode."""
+        entry = self.data['modes'].get(mode) or {}
+        outputs = entry.get('outputs', {})
+        return {
+            os.path.join(self.output_dir, rel): {'inputs': digest, 'output': outputs.get(rel)}
+            for rel, digest in entry.get('renders', {}).items()
+        }
+
+    def record(self, mode: str, data_fp: str, templates: dict, output_hashes: dict, renders: dict = None):
+        self.data['modes'][mode] = {
+            'inputs': data_fp,
+            'templates': templates,
+            'outputs': self._relative(output_hashes),
+            'renders': self._relative(renders or {})
+        }
+
+    def save(self, writer):
+        writer.write(self.path, json.dumps(self.data, indent=2, sort_keys=True))
@@ -0,0 +1,32 @@
+# scripts/manifest_generator/fleet.py
+import os
+
+SSOT_FILENAMES = ('service.yml', 'service.yaml')
+
+def discover_services(paths: list) -> list:
+    """
+    Resolves CLI inputs into a sorted list of service.yml files.
+    Accepts service.yml files, service repositories, or a directory of service repositories.
+    """
+    found = set()
+    for path in paths:
+        if os.path.isfile(path):
+            found.add(os.path.abspath(path))
+            continue
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"Service path not found: {path}")
+
+        # 1. The directory is a service repository itself
+        direct = [os.path.join(path, n) for n in SSOT_FILENAMES if os.path.isfile(os.path.join(path, n))]
+        if direct:
+            found.add(os.path.abspath(direct[0]))
+            continue
+
+        # 2. The directory holds many service repositories (one level deep)
+        for entry in sorted(os.listdir(path)):
+            for name in SSOT_FILENAMES:
+                candidate = os.path.join(path, entry, name)
+                if os.path.isfile(candidate):
+                    found.add(os.path.abspath(candidate))
+                    break
+    return sorted(found)
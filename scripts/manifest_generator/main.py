@@ -2,141 +2,227 @@
 import argparse
 import sys
 import os
-import traceback
-import yaml 
 import json
-
-from .context import ContextBuilder
-from .engine import ManifestEngine
-
-# 1. Import ALL Processors
-from .processors.imports import ImportProcessor
-from .processors.metadata import MetadataProcessor
-from .processors.environment import EnvironmentProcessor
-from .processors.networks import NetworkProcessor
-from .processors.ingress import IngressProcessor
-from .processors.specs import SpecProcessor
-from .processors.volumes import VolumeProcessor
-from .processors.ansible import AnsibleProcessor
-from .processors.ports import PortProcessor
-
-def get_strategy_for_branch(strategy_block, current_branch):
-    """Determines the correct deployment strategy using exact or prefix matching."""
-    if not strategy_block:
-        # Failsafe default if block is completely missing
-        return {'enabled': True, 'target_stage': 'dev'}
-
-    # 1. Exact match (e.g., 'main', 'dev', 'test')
-    if current_branch in strategy_block:
-        return strategy_block[current_branch]
-
-    # 2. Prefix match (e.g., 'ansible-dev-feature' matches 'ansible-dev')
-    for key, strategy in strategy_block.items():
-        if current_branch.startswith(key):
-            return strategy
-
-    # 3. Default fallback if branch is entirely unknown
-    return {'enabled': False, 'target_stage': 'none'}
+import time
+import traceback
+from contextlib import ExitStack
+
+from .catalog import build_catalog_index, index_path
+from .context_io import CONTEXT_FORMATS, CONTEXT_SIDECARS
+from .engine import bytecode_cache_dir, configure_bytecode_cache, precompile_templates, template_subdirs
+from .output import ArchiveWriter, OutputWriter
+from .pipeline import (OUTPUTS, load_ssot, build_context, build_processors, generate, generate_stages, iter_outputs,
+                       output_mode, output_modes, validate_inputs)
+from .processors.memo import PROCESSOR_CACHE_ENV, ProcessorMemo
+from .schema import SchemaValidationError
+from .timings import profiling, recording, span
+from .watch import input_paths, watch
 
 def main():
     parser = argparse.ArgumentParser(description="Modular Manifest Generator")
-    parser.add_argument('--ssot-json', required=True, help="JSON string OR path to a JSON file")
+    parser.add_argument('--ssot-json', help="JSON string OR path to a JSON file")
     parser.add_argument('--template-path', required=True, help="Path to template engine repo")
-    parser.add_argument('--stage', required=True, help="Deployment stage (dev, prod)")
+    parser.add_argument('--stage', help="Deployment stage (dev, prod)")
+    parser.add_argument('--stages', help="Comma-separated stages rendered verbatim in one pass into deployments/<stage>/")
     parser.add_argument('--deployment-type', default='docker_compose')
-    
+
     parser.add_argument('--process-documentation', action='store_true', help="Generate documentation")
     parser.add_argument('--process-files', action='store_true', help="Process custom files")
-    
+    parser.add_argument('--outputs', help=f"Comma-separated outputs rendered from one context build ({','.join(OUTPUTS)}), "
+                                          "instead of --process-documentation/--process-files")
+
+    parser.add_argument('--bytecode-cache', help="Directory for the persistent Jinja bytecode cache (default: $AAC_TEMPLATE_CACHE_DIR)")
+    parser.add_argument('--warm-cache', action='store_true', help="Compile all templates into the bytecode cache, pre-parse the catalog and exit")
+    parser.add_argument('--force', action='store_true', help="Ignore the fingerprint manifest and regenerate everything")
+    parser.add_argument('--processor-cache', default=os.getenv(PROCESSOR_CACHE_ENV),
+                        help="Directory of memoized processor results shared across runs (default: $AAC_PROCESSOR_CACHE_DIR)")
+    parser.add_argument('--context-format', choices=CONTEXT_FORMATS, default='pretty',
+                        help="Layout of ansible_context.json (compact: no indentation, smaller and faster)")
+    parser.add_argument('--context-sidecar', action='append', choices=sorted(CONTEXT_SIDECARS), default=[],
+                        help="Also write the context as ansible_context.json.gz or ansible_context.msgpack (repeatable)")
+    parser.add_argument('--archive', metavar='FILE',
+                        help="Render into this .zip, .tar.gz or .tar instead of deployments/ (ansible_context.json included)")
+    parser.add_argument('--watch', action='store_true',
+                        help="Keep running and re-render whenever service.yml, its catalog imports or a template changes")
+    parser.add_argument('--poll', action='store_true', help="With --watch, poll for changes instead of using inotify")
+    parser.add_argument('--timings', action='store_true',
+                        help="Print wall/CPU time per phase, processor, template and written file")
+    parser.add_argument('--trace', help="Write the timings as a Chrome trace (JSON) to this file (implies --timings)")
+    parser.add_argument('--profile', nargs='?', const='', metavar='STATS_FILE',
+                        help="Run under cProfile, print the top functions and optionally dump the stats to STATS_FILE")
+
     args = parser.parse_args()
 
+    if args.bytecode_cache:
+        configure_bytecode_cache(args.bytecode_cache)
+
+    # --- Cache warm-up (image build time) ---
+    if args.warm_cache:
+        if not bytecode_cache_dir():
+            parser.error("--warm-cache needs --bytecode-cache or $AAC_TEMPLATE_CACHE_DIR")
+        subdirs = template_subdirs(args.template_path)
+        count = precompile_templates(args.template_path, subdirs)
+        print(f"  [I] Compiled {count} templates into {bytecode_cache_dir()} for: {', '.join(subdirs)}")
+        count = build_catalog_index(args.template_path)
+        print(f"  [I] Indexed {count} catalog blueprints into {index_path(args.template_path)}")
+        sys.exit(0)
+
+    if not args.ssot_json or not (args.stage or args.stages):
+        parser.error("--ssot-json and --stage (or --stages) are required unless --warm-cache is given")
+    if args.stage and args.stages:
+        parser.error("--stage and --stages are mutually exclusive")
+    if args.archive and (args.stages or args.watch):
+        parser.error("--archive renders a single --stage and cannot be combined with --watch")
+    if args.watch and not os.path.isfile(args.ssot_json):
+        parser.error("--watch needs --ssot-json to be a file")
+    if args.outputs:
+        if args.process_documentation or args.process_files:
+            parser.error("--outputs replaces --process-documentation and --process-files")
+        args.outputs = [o.strip() for o in args.outputs.split(',') if o.strip()]
+        try:
+            output_modes(args.outputs)
+        except ValueError as e:
+            parser.error(str(e))
+
+    # --- Timings & Profiling ---
+    with ExitStack() as stack:
+        timings = stack.enter_context(recording()) if args.timings or args.trace else None
+        if args.profile is not None:
+            stack.enter_context(profiling(args.profile or None))
+        try:
+            run(args)
+        finally:
+            if timings is not None:
+                print(f"\n  [I] Timings (slowest first):\n{timings.summary()}")
+                if args.trace:
+                    timings.write_chrome_trace(args.trace)
+                    print(f"  [I] Chrome trace written to {args.trace} (open in chrome://tracing or ui.perfetto.dev)")
+
+def load_inputs(args) -> str:
+    """Reads the SSoT and checks it and its catalog imports against the schemas; returns it as JSON."""
     # --- Robust Input Handling ---
-    ssot_input = args.ssot_json
-    if os.path.isfile(ssot_input):
-        print(f"  [I] Reading SSoT from file: {ssot_input}")
-        # CRITICAL FIX: utf-8-sig ignores the Windows/PowerShell BOM
-        with open(ssot_input, 'r', encoding='utf-8-sig') as f:
-            if ssot_input.endswith(('.yml', '.yaml')):
-                parsed_yaml = yaml.safe_load(f)
-                ssot_input = json.dumps(parsed_yaml)
-            else:
-                ssot_input = f.read()
+    with span('input.parse'):
+        ssot_input = load_ssot(args.ssot_json)
+
+    # --- Schema Validation (before any context building or rendering) ---
+    if os.path.isfile(args.ssot_json):
+        with open(args.ssot_json, 'r', encoding='utf-8-sig') as f:
+            ssot_source = f.read()
+    else:
+        ssot_source = args.ssot_json
+    with span('schema.validate'):
+        validate_inputs(ssot_input, args.template_path, ssot_source)
+    return ssot_input
+
+def render(args, ssot_input: str, processors, incremental: bool = True) -> set:
+    """Context, processors, ansible_context.json and the manifests for this CI job; returns the run statuses."""
+    current_branch = os.getenv('SERVICE_BRANCH', 'main')
+    output_dir = os.path.join(os.getcwd(), "deployments")
+    writer = OutputWriter()
+    options = dict(deployment_type=args.deployment_type, process_documentation=args.process_documentation,
+                   process_files=args.process_files, current_branch=current_branch, incremental=incremental,
+                   context_format=args.context_format, context_sidecars=args.context_sidecar,
+                   outputs=args.outputs)
+    if args.archive:
+        writer = ArchiveWriter(args.archive)
+        with writer:
+            statuses = {render_archive(args, ssot_input, processors, current_branch, writer)}
+    elif args.stages:
+        # One pass over several stages: the SSoT is parsed and merged once, each stage applies its overrides
+        stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+        results = generate_stages(ssot_input, args.template_path, stages, os.getcwd(), output_dir, processors,
+                                  **options)
+        statuses = {result['status'] for result in results.values()}
+    else:
+        statuses = {generate(ssot_input, args.template_path, args.stage, os.getcwd(), output_dir, processors,
+                             writer=writer, **options)['status']}
+
+    if statuses == {'disabled'}:
+        print(f"\n  [!] DEPLOYMENT SKIPPED: Branch '{current_branch}' is disabled by deployment_strategy.")
+        print("  [I] Context written successfully for Ansible evaluation.")
+        return statuses
+    if not args.stages:
+        print(f"\n  [I] Outputs: {writer.summary()}")
+    memo = processors.memo
+    if memo and memo.stats:
+        print(f"  [I] Processor cache hits: {memo.summary()}")
+    return statuses
+
+def render_archive(args, ssot_input: str, processors, current_branch: str, sink: ArchiveWriter) -> str:
+    """--archive: streams the context and the outputs into sink as deployments/<path>; returns the status."""
+    if args.outputs:
+        outputs = args.outputs
+    else:
+        mode = output_mode(args.deployment_type, args.process_documentation, args.process_files)
+        outputs = ['ansible', {'documentation': 'docs', 'files': 'files'}.get(mode, 'compose')]
+    context = build_context(ssot_input, args.stage, processors, current_branch)
+    for path, content in iter_outputs(context, args.template_path, os.getcwd(), outputs, args.deployment_type,
+                                      args.context_format):
+        sink.write(os.path.join('deployments', path), content)
+    return 'rendered' if context['deployment_enabled'] else 'disabled'
+
+def run(args):
+    """Validates the SSoT and renders the outputs of one CI job; exits the process on errors."""
+    memo = ProcessorMemo(directory=args.processor_cache) if args.processor_cache else None
+    # One context per CI job: checking each processor's declared writes costs a few ms and stops a wrong
+    # declaration (which would corrupt the dependency graph and the processor cache) before anything is written
+    processors = build_processors(args.template_path, check_writes=True, memo=memo)
+    if args.watch:
+        watch_inputs(args, processors)
+        return
 
     try:
-        # --- STRATEGY & KILL-SWITCH LOGIC ---
-        raw_ssot_dict = json.loads(ssot_input)
-        strategy_block = raw_ssot_dict.get('deployment_strategy', {})
-        current_branch = os.getenv('SERVICE_BRANCH', 'main')
-        
-        active_strategy = get_strategy_for_branch(strategy_block, current_branch)
-        is_enabled = active_strategy.get('enabled', True)
-        
-        # Override the CLI stage arg with the strategy's target stage
-        calculated_stage = active_strategy.get('target_stage', args.stage)
-
-        # 1. Build Data Context using the correct calculated stage
-        builder = ContextBuilder(ssot_input, calculated_stage)
-        context = builder.build()
-
-        # Inject the enabled flag into the context for Ansible to read later
-        context['deployment_enabled'] = is_enabled
-
-        # 2. Run Logic Processors (Strict Order Required)
-        processors = [
-            ImportProcessor(args.template_path),
-            MetadataProcessor(),
-            PortProcessor(),
-            EnvironmentProcessor(),
-            NetworkProcessor(),
-            IngressProcessor(),
-            SpecProcessor(),
-            VolumeProcessor(),
-            AnsibleProcessor() 
-        ]
-
-        for proc in processors:
-            context = proc.process(context)
-
-        # 3. Dump the fully rendered context for Ansible to consume
-        output_dir = os.path.join(os.getcwd(), "deployments")
-        os.makedirs(output_dir, exist_ok=True)
-        with open(os.path.join(output_dir, "ansible_context.json"), "w", encoding="utf-8") as f:
-            json.dump(context, f, indent=2)
-
-        # --- THE ABORT GATE ---
-        if not is_enabled:
-            print(f"\n  [!] DEPLOYMENT SKIPPED: Branch '{current_branch}' is disabled by deployment_strategy.")
-            print("  [I] Context written successfully for Ansible evaluation. Exiting cleanly.")
-            sys.exit(0)
-
-        # 4. Render Manifests
-        engine = ManifestEngine(args.template_path, os.getcwd())
-        
-        # 5. Switch for the CI jobs
-        if args.process_documentation:
-            print("  [I] Processing Documentation...")
-            if hasattr(engine, 'render_documentation'):
-                engine.render_documentation(context)
-            else:
-                engine.render_all(context, args.deployment_type)
-                
-        elif args.process_files:
-            print("  [I] Processing Custom Files...")
-            if hasattr(engine, 'render_files'):
-                engine.render_files(context)
-            else:
-                engine.render_all(context, args.deployment_type)
-                
-        else:
-            print("  [I] Processing Docker Compose...")
-            engine.render_all(context, args.deployment_type)
-        
-        print("\nSuccess: Manifest generation complete.")
-
+        ssot_input = load_inputs(args)
+        statuses = render(args, ssot_input, processors, incremental=not args.force)
+    except SchemaValidationError as e:
+        print(f"\nFATAL ERROR: {e}")
+        sys.exit(1)
     except Exception as e:
         print(f"\nFATAL ERROR: {e}")
         traceback.print_exc()
         sys.exit(1)
 
+    # --- THE ABORT GATE ---
+    if statuses == {'disabled'}:
+        sys.exit(0)
+    print("\nSuccess: Manifest generation complete.")
+
+def watch_inputs(args, processors):
+    """
+    --watch: renders once, then again after every change to the SSoT, its catalog imports or the templates.
+    Template-only changes skip parsing and validation; generate() then reuses the context and re-renders
+    only the templates whose inputs changed.
+    """
+    state = {'ssot': None, 'first': True}
+    if args.outputs:
+        modes = output_modes(args.outputs, args.deployment_type)
+    else:
+        modes = [output_mode(args.deployment_type, args.process_documentation, args.process_files)]
+
+    def inputs():
+        # Without a valid SSoT its catalog imports are unknown; its own file is watched regardless
+        raw = json.loads(state['ssot']) if state['ssot'] else {}
+        return input_paths(args.ssot_json, raw, args.template_path, os.getcwd(), modes)
+
+    def rebuild(changed=None):
+        started = time.perf_counter()
+        if changed:
+            print(f"\n[*] Changed: {', '.join(sorted(os.path.relpath(p) for p in changed))}")
+        try:
+            if state['ssot'] is None or set((changed or {}).values()) != {'templates'}:
+                state['ssot'] = None
+                state['ssot'] = load_inputs(args)
+            render(args, state['ssot'], processors, incremental=not (args.force and state['first']))
+        except SchemaValidationError as e:
+            print(f"\n  [X] {e}")
+        except Exception as e:
+            print(f"\n  [X] FAILED: {e}")
+            traceback.print_exc()
+        state['first'] = False
+        print(f"  [I] Rebuilt in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    rebuild()
+    watch(inputs, rebuild, polling=args.poll)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
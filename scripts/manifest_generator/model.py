@@ -0,0 +1,160 @@
+# scripts/manifest_generator/model.py
+from dataclasses import dataclass, field
+
+DATABASE_IMAGES = ('mariadb', 'mysql', 'postgres', 'redis')
+
+# Scalars a port number may be given as (templated values are rendered to strings)
+_PORT_TYPES = (int, str)
+
+
+class ContextError(ValueError):
+    """The context has the wrong structure, e.g. a port that is not a mapping."""
+    def __init__(self, path: str, message: str):
+        super().__init__(f"Invalid context at '{path}': {message}")
+        self.path = path
+
+
+def _type_name(value) -> str:
+    return 'null' if value is None else type(value).__name__
+
+
+def _mapping(value, path: str, default=None) -> dict:
+    if value is None and default is not None:
+        return default
+    if not isinstance(value, dict):
+        raise ContextError(path, f"expected a mapping, got {_type_name(value)}")
+    return value
+
+
+def _sequence(value, path: str) -> list:
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        raise ContextError(path, f"expected a list, got {_type_name(value)}")
+    return value
+
+
+def _scalar(value, path: str, types=str):
+    if value is not None and not isinstance(value, types):
+        raise ContextError(path, f"expected a scalar, got {_type_name(value)}")
+    return value
+
+
+@dataclass(slots=True)
+class Port:
+    port: object = None
+    external_port: object = None
+    protocol: str = 'TCP'
+    name: str = None
+
+    @classmethod
+    def from_dict(cls, data, path: str) -> 'Port':
+        data = _mapping(data, path)
+        return cls(_scalar(data.get('port'), f"{path}.port", _PORT_TYPES),
+                   _scalar(data.get('external_port'), f"{path}.external_port", _PORT_TYPES),
+                   str(data.get('protocol', 'TCP')),
+                   data.get('name'))
+
+    @property
+    def mapping(self):
+        """'external:internal/protocol' for published ports, None otherwise."""
+        if self.port and self.external_port:
+            return f"{self.external_port}:{self.port}/{self.protocol.lower()}"
+        return None
+
+
+@dataclass(slots=True)
+class Volume:
+    id: str
+    # The original definition; named volumes are rendered from it verbatim
+    definition: dict
+    type: str = 'bind'
+    target: str = None
+    source: str = None
+    file: str = None
+    driver: str = None
+    flags: str = ''
+
+    @classmethod
+    def from_dict(cls, v_id: str, data, path: str) -> 'Volume':
+        data = _mapping(data, path, default={})
+        return cls(v_id, data, data.get('type', 'bind'), data.get('target', f"/{v_id}"), data.get('source'),
+                   data.get('file'), data.get('driver'), data.get('flags', ''))
+
+
+@dataclass(slots=True)
+class Service:
+    name: str = 'app'
+    hostname: str = None
+    stage: str = None
+
+    @classmethod
+    def from_dict(cls, data, path: str = 'service') -> 'Service':
+        data = _mapping(data, path, default={})
+        return cls(_scalar(data.get('name', 'app'), f"{path}.name"),
+                   _scalar(data.get('hostname'), f"{path}.hostname"),
+                   _scalar(data.get('stage'), f"{path}.stage"))
+
+
+@dataclass(slots=True)
+class Dependency:
+    """Facts about one sidecar that every processor needs, derived once per context."""
+    key: str
+    # The dependency's own (mutable) block in context['dependencies']; processors write into it
+    config: dict
+    name: str
+    image_repo: str = ''
+    is_database: bool = False
+    network_mode: str = None
+    has_healthcheck: bool = False
+    ports: list = field(default_factory=list)
+    volumes: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, key: str, data, main_service: str, path: str) -> 'Dependency':
+        data = _mapping(data, path)
+        image_repo = str(data.get('image_repo') or '').lower()
+        ports = [Port.from_dict(p, f"{path}.ports[{i}]") for i, p in enumerate(_sequence(data.get('ports'), f"{path}.ports"))]
+        # Sidecar volumes are mounted from their definition; an empty ('db:' / null) one is not mounted at all
+        volumes = {
+            v_id: Volume.from_dict(v_id, v_def, f"{path}.volumes.{v_id}")
+            for v_id, v_def in _mapping(data.get('volumes'), f"{path}.volumes", default={}).items()
+            if v_def is not None
+        }
+        # 'disable: true' only switches the image's healthcheck off; there is nothing to wait for
+        healthcheck = data.get('healthcheck')
+        has_healthcheck = 'healthcheck' in data and not (isinstance(healthcheck, dict) and healthcheck.get('disable'))
+        return cls(key, data, data.get('name', f"{main_service}-{key}"), image_repo,
+                   any(db in image_repo for db in DATABASE_IMAGES), data.get('network_mode'),
+                   has_healthcheck, ports, volumes)
+
+    def __repr__(self):
+        return f"Dependency({self.key!r}, name={self.name!r})"
+
+
+@dataclass(slots=True)
+class ContextModel:
+    """
+    Typed view of the structural parts of a context (service identity, ports, volumes, sidecars).
+    Built once after the catalog import; raises ContextError on malformed blocks instead of letting
+    them fail later inside a processor or template. The context dict stays the source of truth for
+    rendering and ansible_context.json.
+    """
+    service: Service
+    ports: list
+    volumes: dict
+    dependencies: list
+
+    @classmethod
+    def from_context(cls, context: dict) -> 'ContextModel':
+        service = Service.from_dict(context.get('service'))
+        ports = [Port.from_dict(p, f"ports[{i}]") for i, p in enumerate(_sequence(context.get('ports'), 'ports'))]
+        volumes = {
+            v_id: Volume.from_dict(v_id, v_def, f"volumes.{v_id}")
+            for v_id, v_def in _mapping(context.get('volumes'), 'volumes', default={}).items()
+        }
+        deps = _mapping(context.get('dependencies'), 'dependencies', default={})
+        dependencies = [
+            Dependency.from_dict(key, cfg, service.name, f"dependencies.{key}") for key, cfg in deps.items()
+        ]
+        return cls(service, ports, volumes, dependencies)
@@ -0,0 +1,232 @@
+# scripts/manifest_generator/output.py
+import io
+import os
+import gzip
+import tarfile
+import zipfile
+import hashlib
+import tempfile
+from contextlib import contextmanager
+
+from .timings import span
+
+# Permission bits a plain open(path, 'w') would have produced (temp files default to 0600)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+DEFAULT_FILE_MODE = 0o666 & ~_UMASK
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path: str):
+    """sha256 of a file's content, or None if it does not exist."""
+    try:
+        with open(path, 'rb') as f:
+            return content_hash(f.read())
+    except FileNotFoundError:
+        return None
+
+
+class OutputWriter:
+    """
+    Writes rendered artifacts only when their content actually changed.
+    Unchanged files keep their mtime; changed files are replaced atomically (temp file + rename).
+    """
+    def __init__(self):
+        self.written = []
+        self.unchanged = []
+        self.removed = []
+        # path -> sha256 of every file written or confirmed unchanged
+        self.hashes = {}
+
+    def write(self, path: str, content) -> bool:
+        """Returns True if the file was (re)written, False if it already had this content (str or bytes)."""
+        with span(path, 'write'):
+            return self._write(path, content)
+
+    def _write(self, path: str, content) -> bool:
+        data = content.encode('utf-8') if isinstance(content, str) else content
+        try:
+            same_size = os.path.getsize(path) == len(data)
+        except OSError:
+            same_size = False
+
+        digest = content_hash(data)
+        if same_size and file_hash(path) == digest:
+            self.unchanged.append(path)
+            self.hashes[path] = digest
+            return False
+
+        with self._replacing(path) as f:
+            f.write(data)
+        self.written.append(path)
+        self.hashes[path] = digest
+        return True
+
+    def write_chunks(self, path: str, chunks) -> bool:
+        """
+        Like write(), for content produced as an iterable of bytes: it is streamed into the temp file
+        (never held in memory as a whole), which is discarded again if the result is unchanged.
+        """
+        h = hashlib.sha256()
+        with span(path, 'write'), self._replacing(path) as f:
+            for chunk in chunks:
+                h.update(chunk)
+                f.write(chunk)
+            digest = h.hexdigest()
+            if file_hash(path) == digest:
+                f.discard = True
+
+        self.hashes[path] = digest
+        if f.discard:
+            self.unchanged.append(path)
+            return False
+        self.written.append(path)
+        return True
+
+    @contextmanager
+    def _replacing(self, path: str):
+        """Temp file next to path that atomically replaces it on success (unless marked discard)."""
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = DEFAULT_FILE_MODE
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.discard = False
+                yield f
+            if f.discard:
+                os.remove(tmp_path)
+            else:
+                os.chmod(tmp_path, mode)
+                os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def makedirs(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+
+    def keep(self, path: str, expected_hash: str) -> bool:
+        """Confirms an existing output still has the expected content without re-rendering it."""
+        if expected_hash is None or file_hash(path) != expected_hash:
+            return False
+        self.unchanged.append(path)
+        self.hashes[path] = expected_hash
+        return True
+
+    def prune(self, directory: str, keep: set):
+        """Removes files below directory that this run did not produce (e.g. from deleted templates)."""
+        if not os.path.isdir(directory):
+            return
+        keep = {os.path.abspath(p) for p in keep}
+        for root, dirs, files in os.walk(directory, topdown=False):
+            for name in files:
+                path = os.path.join(root, name)
+                if os.path.abspath(path) not in keep:
+                    os.remove(path)
+                    self.removed.append(path)
+            if root != directory and not os.listdir(root):
+                os.rmdir(root)
+
+    def merge(self, other: 'OutputWriter'):
+        """Adds the results of another writer (e.g. of an output family rendered in its own thread)."""
+        self.written += other.written
+        self.unchanged += other.unchanged
+        self.removed += other.removed
+        self.hashes.update(other.hashes)
+
+    def counts(self) -> dict:
+        return {'written': len(self.written), 'unchanged': len(self.unchanged), 'removed': len(self.removed)}
+
+    def summary(self) -> str:
+        c = self.counts()
+        return f"{c['written']} written, {c['unchanged']} unchanged, {c['removed']} removed"
+
+
+class MemoryWriter(OutputWriter):
+    """OutputWriter that keeps every artifact in memory (files: path -> bytes) and never touches the disk."""
+    def __init__(self):
+        super().__init__()
+        self.files = {}
+
+    def _write(self, path: str, content) -> bool:
+        data = content.encode('utf-8') if isinstance(content, str) else content
+        self._store(path, data)
+        self.written.append(path)
+        self.hashes[path] = content_hash(data)
+        return True
+
+    def _store(self, path: str, data: bytes):
+        self.files[path] = data
+
+    def write_chunks(self, path: str, chunks) -> bool:
+        with span(path, 'write'):
+            return self._write(path, b''.join(chunks))
+
+    def merge(self, other: OutputWriter):
+        super().merge(other)
+        self.files.update(getattr(other, 'files', {}))
+
+    def makedirs(self, directory: str):
+        pass
+
+    def keep(self, path: str, expected_hash: str) -> bool:
+        return False
+
+    def prune(self, directory: str, keep: set):
+        pass
+
+
+class ArchiveWriter(MemoryWriter):
+    """
+    Streams every artifact into a tar (.tar, .tar.gz/.tgz) or zip archive instead of a directory tree.
+    Members are named by the path they are written under and carry a fixed timestamp, so equal content
+    gives an equal archive. Close it (or use it as a context manager) to finish the archive.
+    """
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._zip = self._tar = self._gzip = self._file = None
+        if path.endswith('.zip'):
+            self._zip = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED)
+        elif path.endswith(('.tar.gz', '.tgz')):
+            # The gzip header would otherwise carry the current time and the archive's name
+            self._file = open(path, 'wb')
+            self._gzip = gzip.GzipFile('', 'wb', fileobj=self._file, mtime=0)
+            self._tar = tarfile.open(fileobj=self._gzip, mode='w', format=tarfile.PAX_FORMAT)
+        else:
+            self._tar = tarfile.open(path, 'w', format=tarfile.PAX_FORMAT)
+
+    def _store(self, path: str, data: bytes):
+        name = path.lstrip('/')
+        if self._zip is not None:
+            info = zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = (0o100000 | DEFAULT_FILE_MODE) << 16
+            self._zip.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size, info.mode, info.mtime = len(data), DEFAULT_FILE_MODE, 0
+            self._tar.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        (self._zip or self._tar).close()
+        if self._gzip is not None:
+            self._gzip.close()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,379 @@
+# scripts/manifest_generator/pipeline.py
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from .catalog import load_blueprint, load_yaml
+from .context import ContextBuilder
+from .context_io import CONTEXT_FILE, context_layout, json_chunks, write_context
+from .engine import ManifestEngine
+from .output import MemoryWriter, OutputWriter
+from .fingerprint import FingerprintManifest, catalog_imports, data_fingerprint, template_fingerprint
+from .schema import SchemaValidationError, fatal_issues, validate_blueprint, validate_ssot
+from .timings import span
+
+from .processors.imports import ImportProcessor
+from .processors.model import CONTEXT_MODEL_KEY, ModelProcessor
+from .processors.metadata import MetadataProcessor
+from .processors.environment import EnvironmentProcessor
+from .processors.networks import NetworkProcessor
+from .processors.ingress import IngressProcessor
+from .processors.specs import SpecProcessor
+from .processors.volumes import VolumeProcessor
+from .processors.ansible import AnsibleProcessor
+from .processors.ports import PortProcessor
+from .processors.scheduler import ProcessorPipeline
+
+# Names accepted by --outputs: 'compose' renders the deployment type, 'ansible' is ansible_context.json
+OUTPUTS = ('compose', 'files', 'docs', 'ansible')
+
+def get_strategy_for_branch(strategy_block, current_branch):
+    """Determines the correct deployment strategy using exact or prefix matching."""
+    if not strategy_block:
+        # Failsafe default if block is completely missing
+        return {'enabled': True, 'target_stage': 'dev'}
+
+    # 1. Exact match (e.g., 'main', 'dev', 'test')
+    if current_branch in strategy_block:
+        return strategy_block[current_branch]
+
+    # 2. Prefix match (e.g., 'ansible-dev-feature' matches 'ansible-dev')
+    for key, strategy in strategy_block.items():
+        if current_branch.startswith(key):
+            return strategy
+
+    # 3. Default fallback if branch is entirely unknown
+    return {'enabled': False, 'target_stage': 'none'}
+
+def load_ssot(ssot_input: str) -> str:
+    """Accepts a JSON string OR a path to a JSON/YAML file and returns the SSoT as a JSON string."""
+    if os.path.isfile(ssot_input):
+        print(f"  [I] Reading SSoT from file: {ssot_input}")
+        # CRITICAL FIX: utf-8-sig ignores the Windows/PowerShell BOM
+        with open(ssot_input, 'r', encoding='utf-8-sig') as f:
+            if ssot_input.endswith(('.yml', '.yaml')):
+                return json.dumps(load_yaml(f))
+            return f.read()
+    return ssot_input
+
+def validate_inputs(ssot_json: str, template_path: str, source: str = None):
+    """
+    Checks the SSoT and every catalog blueprint it imports against their schemas before anything is built.
+    source is the SSoT's original text (for line numbers). Raises SchemaValidationError listing every fatal issue;
+    lint findings the generator has a fallback for are left to the fleet linter.
+    """
+    raw_ssot = json.loads(ssot_json)
+    issues = fatal_issues(validate_ssot(raw_ssot, source))
+    if issues:
+        raise SchemaValidationError('service.yml', issues)
+    for import_path in catalog_imports(raw_ssot, template_path):
+        try:
+            blueprint = load_blueprint(template_path, import_path)
+        except FileNotFoundError:
+            # Reported by the ImportProcessor with the full path
+            continue
+        issues = fatal_issues(validate_blueprint(blueprint))
+        if issues:
+            with open(os.path.join(template_path, import_path), 'r', encoding='utf-8') as f:
+                raise SchemaValidationError(import_path, fatal_issues(validate_blueprint(blueprint, f.read())))
+
+def build_processors(template_path: str, check_writes: bool = False, memo=None) -> ProcessorPipeline:
+    """
+    Returns the logic processors in their required order.
+    Their declared reads/writes define which of them depend on each other (see ProcessorPipeline).
+    With a ProcessorMemo, processors whose declared inputs are unchanged reuse their cached result.
+    check_writes raises UndeclaredWriteError as soon as a processor changes anything it does not declare;
+    the CLI enables it, batch mode and the daemon skip it for throughput (it snapshots the context twice per processor).
+    """
+    return ProcessorPipeline([
+        ImportProcessor(template_path),
+        ModelProcessor(),
+        MetadataProcessor(),
+        PortProcessor(),
+        EnvironmentProcessor(),
+        NetworkProcessor(),
+        IngressProcessor(),
+        SpecProcessor(),
+        VolumeProcessor(),
+        AnsibleProcessor()
+    ], check_writes, memo)
+
+class ContextBase:
+    """
+    One service's SSoT, parsed and merged once and shared by the contexts of all its stages.
+    Only the stage overrides, the rendering of references and the processors run per stage.
+    """
+    def __init__(self, ssot_json: str):
+        self.ssot_json = ssot_json
+        self.raw = json.loads(ssot_json)
+        self._merged = None
+
+    def merged(self) -> dict:
+        # Built on first use, so stages skipped as unchanged cost no merge at all
+        if self._merged is None:
+            self._merged = ContextBuilder(self.raw, None).merge_base()
+        return self._merged
+
+def build_context(ssot_json: str, stage: str, processors: list, current_branch: str = None, strategy_stage: bool = True,
+                  base: ContextBase = None, sandboxed: bool = False) -> dict:
+    """
+    Builds the fully processed context for one service and stage.
+    With strategy_stage the branch's deployment_strategy may override the requested stage.
+    With a ContextBase (of the same ssot_json), the SSoT is not parsed and merged again.
+    sandboxed renders the SSoT's Jinja expressions in a sandbox (SSoTs from untrusted sources).
+    """
+    # --- STRATEGY & KILL-SWITCH LOGIC ---
+    raw_ssot_dict = base.raw if base is not None else json.loads(ssot_json)
+    strategy_block = raw_ssot_dict.get('deployment_strategy', {})
+    if current_branch is None:
+        current_branch = os.getenv('SERVICE_BRANCH', 'main')
+
+    active_strategy = get_strategy_for_branch(strategy_block, current_branch)
+    is_enabled = active_strategy.get('enabled', True)
+
+    # Override the requested stage with the strategy's target stage
+    calculated_stage = active_strategy.get('target_stage', stage) if strategy_stage else stage
+
+    # 1. Build Data Context using the correct calculated stage
+    # The parsed SSoT is handed over (not re-parsed); the context shares its untouched subtrees
+    with span('context.build'):
+        builder = ContextBuilder(raw_ssot_dict, calculated_stage, sandboxed)
+        context = builder.build(base.merged() if base is not None else None)
+
+    # Inject the enabled flag into the context for Ansible to read later
+    context['deployment_enabled'] = is_enabled
+
+    # 2. Run Logic Processors (Strict Order Required)
+    if not isinstance(processors, ProcessorPipeline):
+        processors = ProcessorPipeline(processors)
+    context = processors.run(context)
+    # A top-level import replaces the whole context, flag included
+    context.setdefault('deployment_enabled', is_enabled)
+    # The typed model is processor-internal; templates and Ansible get the plain dict
+    context.pop(CONTEXT_MODEL_KEY, None)
+    return context
+
+def write_ansible_context(context: dict, output_dir: str, writer: OutputWriter = None,
+                          context_format: str = 'pretty', sidecars=()):
+    """Dumps the fully rendered context for Ansible to consume (skipped if the content is unchanged)."""
+    writer = writer or OutputWriter()
+    write_context(context, output_dir, writer, context_format, sidecars)
+
+def render_manifests(engine: ManifestEngine, context: dict, deployment_type: str = 'docker_compose',
+                     process_documentation: bool = False, process_files: bool = False):
+    """Switch for the CI jobs: documentation, custom files or the deployment manifests."""
+    render_output(engine, context, output_mode(deployment_type, process_documentation, process_files))
+
+def render_output(engine: ManifestEngine, context: dict, mode: str):
+    """Renders one output family (see output_mode) through engine."""
+    if mode == 'documentation':
+        engine.log("  [I] Processing Documentation...")
+        engine.render_documentation(context)
+    elif mode == 'files':
+        engine.log("  [I] Processing Custom Files...")
+        engine.render_files(context)
+    else:
+        engine.log("  [I] Processing Docker Compose...")
+        engine.render_all(context, mode)
+
+def output_modes(outputs, deployment_type: str = 'docker_compose') -> list:
+    """Output families for --outputs names (see OUTPUTS), in the order given; 'ansible' has none."""
+    unknown = [name for name in outputs if name not in OUTPUTS]
+    if unknown:
+        raise ValueError(f"Unknown output '{unknown[0]}', expected any of {', '.join(OUTPUTS)}")
+    families = {'compose': deployment_type, 'files': 'files', 'docs': 'documentation'}
+    return list(dict.fromkeys(families[name] for name in outputs if name != 'ansible'))
+
+def render_outputs(modes: list, context: dict, template_path: str, service_path: str, output_dir: str,
+                   previous_renders=None, writer_factory=OutputWriter, log=print) -> list:
+    """
+    Renders several output families from one context and returns their engines in the order of modes.
+    Families write to disjoint directories, so each gets its own engine and writer (from writer_factory) and
+    they render in a thread pool; their log lines go to log per family, in order. previous_renders(mode)
+    enables skipping templates whose inputs are unchanged.
+    """
+    def render(mode, log):
+        engine = ManifestEngine(template_path, service_path, output_dir, writer_factory(), log)
+        if previous_renders is not None:
+            engine.previous_renders = previous_renders(mode)
+        render_output(engine, context, mode)
+        return engine
+
+    if len(modes) < 2:
+        return [render(mode, log) for mode in modes]
+
+    logs = {mode: [] for mode in modes}
+    with ThreadPoolExecutor(max_workers=len(modes)) as pool:
+        futures = [pool.submit(render, mode, logs[mode].append) for mode in modes]
+    for mode in modes:
+        for line in logs[mode]:
+            log(line)
+    # Raises the first family's error, if any, after every log is out
+    return [future.result() for future in futures]
+
+def output_mode(deployment_type: str = 'docker_compose', process_documentation: bool = False, process_files: bool = False) -> str:
+    """Name of the output family a run renders (also its template folder): documentation, files or the deployment type."""
+    if process_documentation:
+        return 'documentation'
+    if process_files:
+        return 'files'
+    return deployment_type
+
+def generate(ssot_json: str, template_path: str, stage: str, service_path: str, output_dir: str,
+             processors: list = None, deployment_type: str = 'docker_compose', process_documentation: bool = False,
+             process_files: bool = False, current_branch: str = None, strategy_stage: bool = True,
+             writer: OutputWriter = None, incremental: bool = True, context_format: str = 'pretty',
+             context_sidecars=(), base: ContextBase = None, outputs=None) -> dict:
+    """
+    Runs the full pipeline for one service/stage and writes ansible_context.json plus the selected outputs.
+    With incremental, a fingerprint manifest in output_dir lets unchanged runs skip all work, and
+    template-only changes reuse the previous ansible_context.json instead of rebuilding the context.
+    context_format ('pretty' or 'compact') and context_sidecars ('gzip', 'msgpack') select the context files.
+    A ContextBase shares the parsed and merged SSoT with other stages of the same service.
+    outputs (names of OUTPUTS) replaces the single output family of deployment_type/process_* with any
+    combination, rendered from one context; ansible_context.json is then only written if 'ansible' is listed.
+    Returns {'status': 'rendered' | 'unchanged' | 'disabled', 'context': dict or None}.
+    """
+    writer = writer or OutputWriter()
+    if current_branch is None:
+        current_branch = os.getenv('SERVICE_BRANCH', 'main')
+    if outputs is None:
+        modes, context_files = [output_mode(deployment_type, process_documentation, process_files)], True
+    else:
+        modes, context_files = output_modes(outputs, deployment_type), 'ansible' in outputs
+
+    manifest = FingerprintManifest(output_dir)
+    with span('fingerprint'):
+        data_fp = data_fingerprint(ssot_json, stage, current_branch, template_path, strategy_stage)
+        templates = {mode: template_fingerprint(template_path, service_path, mode) for mode in modes}
+    layout = context_layout(context_format, context_sidecars) if context_files else None
+
+    # Only the output families whose inputs changed are rendered
+    context_current = incremental and manifest.context_layout_is_current(data_fp, layout)
+    stale = [mode for mode in modes if not (context_current and manifest.mode_is_current(mode, data_fp, templates[mode]))]
+    if context_current and not stale:
+        names = ', '.join(f"'{mode}'" for mode in modes) or f"'{CONTEXT_FILE}'"
+        print(f"  [I] Inputs unchanged since the last run. Skipping {names}.")
+        return {'status': 'unchanged', 'context': None}
+
+    # 1. + 2. Context: reuse the previous one if only templates changed
+    if incremental and manifest.context_is_reusable(data_fp):
+        print("  [I] SSoT and catalog unchanged. Reusing previous ansible_context.json.")
+        with span('context.load'):
+            context = manifest.load_context()
+    else:
+        if processors is None:
+            processors = build_processors(template_path)
+        context = build_context(ssot_json, stage, processors, current_branch, strategy_stage, base)
+
+    # 3. Dump the fully rendered context for Ansible to consume
+    context_writer = OutputWriter()
+    if context_files:
+        write_ansible_context(context, output_dir, context_writer, context_format, context_sidecars)
+    writer.merge(context_writer)
+
+    # --- THE ABORT GATE ---
+    if not context['deployment_enabled']:
+        return {'status': 'disabled', 'context': context}
+
+    # 4. Render Manifests
+    # Templates whose own inputs (source, partials, context values read) are unchanged are not re-rendered
+    engines = render_outputs(stale, context, template_path, service_path, output_dir,
+                             manifest.previous_renders if incremental else None)
+
+    manifest.record_context(data_fp, context_writer.hashes, layout)
+    for mode, engine in zip(stale, engines):
+        writer.merge(engine.writer)
+        manifest.record(mode, data_fp, templates[mode], engine.writer.hashes, engine.renders)
+    with span('fingerprint.save'):
+        manifest.save(writer)
+    return {'status': 'rendered', 'context': context}
+
+def generate_stages(ssot_json: str, template_path: str, stages: list, service_path: str, output_root: str,
+                    processors: list = None, **options) -> dict:
+    """
+    Runs generate() for several stages of one service in one pass, each verbatim into output_root/<stage>/.
+    The SSoT is parsed and merged once and the processors are built once; options are passed to generate().
+    Returns {stage: generate() result plus 'outputs' (the stage's OutputWriter counts)}.
+    """
+    if processors is None:
+        processors = build_processors(template_path)
+    base = ContextBase(ssot_json)
+    results = {}
+    for stage in stages:
+        output_dir = os.path.join(output_root, stage)
+        print(f"\n[*] Stage '{stage}' -> {output_dir}")
+        writer = OutputWriter()
+        with span(stage, 'stage'):
+            result = generate(ssot_json, template_path, stage, service_path, output_dir, processors,
+                              strategy_stage=False, writer=writer, base=base, **options)
+        print(f"  [I] Outputs: {writer.summary()}")
+        results[stage] = dict(result, outputs=writer.counts())
+    return results
+
+def ssot_json_of(ssot) -> str:
+    """The SSoT as JSON from a mapping, a service.yml/JSON file path or YAML/JSON text."""
+    if isinstance(ssot, dict):
+        return json.dumps(ssot)
+    if os.path.isfile(ssot):
+        return load_ssot(ssot)
+    data = load_yaml(ssot)
+    if not isinstance(data, dict):
+        raise ValueError("The SSoT must be a mapping")
+    return json.dumps(data)
+
+def iter_outputs(context: dict, template_path: str, service_path: str = None, outputs=('compose',),
+                 deployment_type: str = 'docker_compose', context_format: str = 'pretty', sandboxed: bool = False):
+    """
+    Yields (path relative to deployments/, content) for the selected outputs (see OUTPUTS) of a processed
+    context, rendering one template at a time; nothing is written. Without service_path only the global
+    templates are used. sandboxed renders the templates in a Jinja sandbox.
+    """
+    modes = output_modes(outputs, deployment_type)
+    if 'ansible' in outputs:
+        yield CONTEXT_FILE, b''.join(json_chunks(context, context_format == 'compact')).decode('utf-8')
+    if not context['deployment_enabled']:
+        return
+    engine = ManifestEngine(template_path, service_path, 'deployments', MemoryWriter(), log=lambda line: None,
+                            sandboxed=sandboxed)
+    for mode in modes:
+        yield from engine.iter_render(context, mode)
+
+def iter_service(ssot, stage: str, template_path: str, service_path: str = None, outputs=('compose',),
+                 current_branch: str = 'main', deployment_type: str = 'docker_compose', processors: list = None,
+                 validate: bool = True, strategy_stage: bool = False, context_format: str = 'pretty',
+                 sandboxed: bool = False):
+    """
+    Library entry point: validates and processes a service (see ssot_json_of for ssot), then streams its
+    outputs like iter_outputs. The stage is used verbatim unless strategy_stage is set.
+    sandboxed renders expressions and templates in a Jinja sandbox (SSoTs from untrusted sources).
+    """
+    ssot_json = ssot_json_of(ssot)
+    if validate:
+        # The original text gives schema errors their line numbers
+        source = None
+        if isinstance(ssot, str):
+            if os.path.isfile(ssot):
+                with open(ssot, 'r', encoding='utf-8-sig') as f:
+                    source = f.read()
+            else:
+                source = ssot
+        validate_inputs(ssot_json, template_path, source)
+    if processors is None:
+        processors = build_processors(template_path)
+    context = build_context(ssot_json, stage, processors, current_branch, strategy_stage, sandboxed=sandboxed)
+    yield from iter_outputs(context, template_path, service_path, outputs, deployment_type, context_format, sandboxed)
+
+def render_service(ssot, stage: str, template_path: str, service_path: str = None, outputs=('compose',),
+                   sink: OutputWriter = None, root: str = '', **options) -> dict:
+    """
+    Renders a service in memory and returns {path relative to deployments/: content}; options as iter_service.
+    With a sink (OutputWriter for a directory, MemoryWriter, ArchiveWriter), every output is also written
+    through it as root/<path>, as soon as it is rendered.
+    """
+    rendered = {}
+    for path, content in iter_service(ssot, stage, template_path, service_path, outputs, **options):
+        rendered[path] = content
+        if sink is not None:
+            sink.write(os.path.join(root, path), content)
+    return rendered
@@ -1,6 +1,12 @@
 from .base import BaseProcessor
+from .model import CONTEXT_MODEL_KEY, model_of
 
 class AnsibleProcessor(BaseProcessor):
+    reads = (('service', 'name'), ('environment', 'PUID'), ('environment', 'PGID'), ('processed_volumes',),
+             ('deployments', 'docker_compose', 'host_base_path'),
+             (CONTEXT_MODEL_KEY,), ('dependencies', '*', 'image_repo'), ('dependencies', '*', 'processed_volumes'))
+    writes = (('ansible_directories',),)
+
     def process(self, context: dict) -> dict:
         """
         Pre-calculates all host directories and their required ownership 
@@ -43,16 +49,12 @@ class AnsibleProcessor(BaseProcessor):
                 add_dir(source, is_db=False)
 
         # 4. Process Dependency Volumes (Sidecars)
-        for dep_name, dep_cfg in context.get('dependencies', {}).items():
-            image_repo = dep_cfg.get('image_repo', '').lower()
-            
-            # THE FIX 2: Added 'redis' to the database check list
-            is_db = any(db in image_repo for db in ['mariadb', 'mysql', 'postgres', 'redis'])
-
-            for vol_str in dep_cfg.get('processed_volumes', []):
+        for dep in model_of(context).dependencies:
+            # THE FIX 2: 'redis' is part of the database check list (Dependency.is_database)
+            for vol_str in dep.config.get('processed_volumes', []):
                 source = vol_str.split(':')[0]
                 if source.startswith('/') and not is_file_mount(source):
-                    add_dir(source, is_db=is_db)
+                    add_dir(source, is_db=dep.is_database)
 
         # 5. Deduplicate (in case paths overlap) while preserving the first assignment
         unique_dirs = {}
@@ -3,6 +3,13 @@ from abc import ABC, abstractmethod
 
 class BaseProcessor(ABC):
     """Interface for all manifest data processors."""
+    # Context paths the processor reads and writes, as key tuples ('*' matches any key, e.g. every dependency).
+    # None means the whole context; such a processor is ordered against every other one.
+    reads = None
+    writes = None
+    # Whether ProcessorMemo may replay a cached result instead of calling process()
+    memoize = True
+
     @abstractmethod
     def process(self, context: dict) -> dict:
         """Modify the context and return it."""
@@ -1,6 +1,15 @@
 from .base import BaseProcessor
+from .model import CONTEXT_MODEL_KEY, model_of
 
 class EnvironmentProcessor(BaseProcessor):
+    reads = (('environment',), ('secrets',), (CONTEXT_MODEL_KEY,), ('dependencies', '*', 'environment'),
+             ('deployments', 'docker_compose', 'dot_env'), ('deployments', 'docker_compose', 'environment'),
+             ('deployments', 'docker_compose', 'stack_env'))
+    # The legacy docker_compose blocks are lifted (popped) into environment/secrets
+    writes = (('environment',), ('secrets',), ('processed_env',), ('processed_secrets',),
+              ('deployments', 'docker_compose', 'dot_env'), ('deployments', 'docker_compose', 'environment'),
+              ('deployments', 'docker_compose', 'stack_env'))
+
     def process(self, context: dict) -> dict:
         # 1. Root-Container sicherstellen
         context.setdefault('environment', {})
@@ -45,8 +54,8 @@ class EnvironmentProcessor(BaseProcessor):
         # 3. Dependencies verarbeiten
         # HINWEIS: Sidecars sollten idealerweise ihre eigene Env-Datei haben. 
         # Wenn du sie in die globale mischen willst, ist dies der Weg:
-        for dep_name, dep_cfg in context.get('dependencies', {}).items():
-            dep_env = dep_cfg.get('environment', {})
+        for dep in model_of(context).dependencies:
+            dep_env = dep.config.get('environment', {})
             if isinstance(dep_env, dict):
                 distribute_env(dep_env, is_secret_source=False)
 
@@ -1,21 +1,27 @@
 # scripts/manifest_generator/processors/imports.py
 import os
-import yaml
-from copy import deepcopy
 from .base import BaseProcessor
+from ..catalog import load_blueprint
 
 class ImportProcessor(BaseProcessor):
+    # Replaces the whole context with blueprint + overrides
+    reads = None
+    writes = None
+
     def __init__(self, template_base_path: str):
         # Normalize the path to handle relative/absolute inputs correctly
         self.template_path = os.path.abspath(template_base_path)
 
     def _deep_merge(self, base: dict, override: dict) -> dict:
-        """Recursively merges the override dictionary heavily onto the base dictionary."""
+        """
+        Recursively merges the override dictionary heavily onto the base dictionary.
+        Override values are moved, not copied: they belong to the context this import replaces.
+        """
         for key, value in override.items():
             if isinstance(value, dict) and key in base and isinstance(base[key], dict):
                 self._deep_merge(base[key], value)
             else:
-                base[key] = deepcopy(value)
+                base[key] = value
         return base
 
     def process(self, context: dict) -> dict:
@@ -28,8 +34,7 @@ class ImportProcessor(BaseProcessor):
             
             if os.path.isfile(import_path):
                 print(f"  [I] Importing base template: {import_path}")
-                with open(import_path, 'r', encoding='utf-8') as f:
-                    base_def = yaml.safe_load(f) or {}
+                base_def = load_blueprint(self.template_path, clean_import)
                 
                 overrides = context.get('overrides', {})
                 context = self._deep_merge(base_def, overrides)
@@ -48,8 +53,7 @@ class ImportProcessor(BaseProcessor):
                 import_path = os.path.join(self.template_path, dep_cfg['import'])
                 if os.path.isfile(import_path):
                     print(f"  [I] Importing base template for Dependency '{dep_name}': {dep_cfg['import']}")
-                    with open(import_path, 'r', encoding='utf-8') as f:
-                        base_def = yaml.safe_load(f) or {}
+                    base_def = load_blueprint(self.template_path, dep_cfg['import'])
                     
                     overrides = dep_cfg.get('overrides', {})
                     merged = self._deep_merge(base_def, overrides)
@@ -1,7 +1,13 @@
 # scripts/manifest_generator/processors/ingress.py
 from .base import BaseProcessor
+from .model import CONTEXT_MODEL_KEY, model_of
 
 class IngressProcessor(BaseProcessor):
+    reads = (('service',), ('config',), (CONTEXT_MODEL_KEY,), ('ports',), ('inventory_hostname',), ('inventory_hostname_friendly',),
+             ('ansible_host_ip',), ('deployments', 'docker_compose', 'network_mode'),
+             ('deployments', 'docker_compose', 'network_definitions'))
+    writes = (('processed_labels',),)
+
     def process(self, context: dict) -> dict:
         svc = context.get('service', {})
         cfg = context.get('config', {})
@@ -37,8 +43,8 @@ class IngressProcessor(BaseProcessor):
             if public_fqdn:
                 rule += f" || Host(`{public_fqdn}`)"
                 
-            ports = context.get('ports', [])
-            default_port = ports[0].get('port') if ports else 80
+            ports = model_of(context).ports
+            default_port = ports[0].port if ports else 80
             svc_port = str(t.get('service_port', default_port))
             
             # Extract the new variables with safe defaults
@@ -0,0 +1,187 @@
+# scripts/manifest_generator/processors/memo.py
+import os
+import json
+import pickle
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+from ..fingerprint import engine_version
+from .scheduler import WILDCARD
+from .model import CONTEXT_MODEL_KEY
+
+MEMO_CACHE_SIZE = 1024
+PROCESSOR_CACHE_ENV = 'AAC_PROCESSOR_CACHE_DIR'
+
+class _Absent:
+    """Marks a path that does not exist (distinct from an explicit None value)."""
+    def __repr__(self):
+        return '<absent>'
+
+
+_ABSENT = _Absent()
+
+
+def select(context: dict, paths) -> list:
+    """[(concrete path, value or _ABSENT)] for every path; '*' expands to the keys present in the context."""
+    found = []
+
+    def walk(node, path, prefix):
+        if not path:
+            found.append((prefix, node))
+            return
+        key, rest = path[0], path[1:]
+        if key == WILDCARD:
+            if isinstance(node, dict):
+                for k in node:
+                    walk(node[k], rest, prefix + (k,))
+            elif isinstance(node, list):
+                for i, v in enumerate(node):
+                    walk(v, rest, prefix + (i,))
+            else:
+                found.append((prefix, _ABSENT))
+        elif isinstance(node, dict) and key in node:
+            walk(node[key], rest, prefix + (key,))
+        else:
+            found.append((prefix + (key,), _ABSENT))
+
+    for path in paths:
+        walk(context, tuple(path), ())
+    return found
+
+
+def encode(fragment: list):
+    """
+    JSON for a fragment ([path, value], or [path] for _ABSENT), or None if it would not read back as the
+    same fragment (e.g. tuples or non-string keys). JSON, unlike pickle, cannot run code when a shared
+    cache directory has been tampered with.
+    """
+    entries = [[list(path)] if value is _ABSENT else [list(path), value] for path, value in fragment]
+    try:
+        data = json.dumps(entries, separators=(',', ':')).encode('utf-8')
+    except (TypeError, ValueError):
+        return None
+    return data if json.loads(data) == entries else None
+
+
+def decode(data: bytes) -> list:
+    """Fragment from encode()'s JSON; every call returns fresh objects."""
+    return [(tuple(entry[0]), entry[1] if len(entry) == 2 else _ABSENT) for entry in json.loads(data)]
+
+
+def apply(context: dict, fragment: list):
+    """Writes a fragment returned by select() back into the context (deleting _ABSENT paths)."""
+    for path, value in fragment:
+        node = context
+        for key in path[:-1]:
+            if isinstance(node, dict):
+                node = node.setdefault(key, {})
+            else:
+                node = node[key]
+        if value is _ABSENT:
+            if isinstance(node, dict):
+                node.pop(path[-1], None)
+        else:
+            node[path[-1]] = value
+
+
+class ProcessorMemo:
+    """
+    Memoizes processor results: the key is a hash of everything a processor declares to read (plus the prior
+    values of what it writes), the value is the fragment it writes. In-memory LRU, optionally persisted to disk.
+    """
+    def __init__(self, size: int = MEMO_CACHE_SIZE, directory: str = None):
+        self.size = size
+        self.directory = directory
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # processor name -> [hits, misses]
+        self.stats = {}
+
+    def key(self, proc, context: dict) -> str:
+        paths = [p for p in tuple(proc.reads) + tuple(proc.writes) if p[0] != CONTEXT_MODEL_KEY]
+        inputs = select(context, paths)
+        h = hashlib.sha256(engine_version().encode('utf-8'))
+        h.update(f"{type(proc).__module__}.{type(proc).__qualname__}\0".encode('utf-8'))
+        # pickle is order-sensitive, which is intended: key order of dicts ends up in the outputs
+        h.update(pickle.dumps(inputs, protocol=pickle.HIGHEST_PROTOCOL))
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str):
+        """Encoded fragment (see encode) for key, or None."""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                return data
+        if self.directory:
+            try:
+                with open(self._path(key), 'rb') as f:
+                    data = f.read()
+            except OSError:
+                return None
+            self._remember(key, data)
+        return data
+
+    def put(self, key: str, data: bytes):
+        self._remember(key, data)
+        if self.directory:
+            path = self._path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except OSError:
+                # A read-only or full cache directory only costs the speed-up
+                pass
+
+    def _remember(self, key: str, data: bytes):
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def run(self, proc, context: dict) -> dict:
+        """proc.process(context), or the cached fragment applied to context if its inputs were seen before."""
+        name = type(proc).__name__
+        counts = self.stats.setdefault(name, [0, 0])
+        key = self.key(proc, context)
+        fragment = None
+        data = self.get(key)
+        if data is not None:
+            try:
+                fragment = decode(data)
+            except (ValueError, TypeError, IndexError):
+                # A corrupt cache entry only costs the speed-up
+                pass
+        if fragment is not None:
+            counts[0] += 1
+            # Every hit gets fresh objects, later processors mutate them freely
+            apply(context, fragment)
+            return context
+
+        counts[1] += 1
+        context = proc.process(context)
+        data = encode(select(context, proc.writes))
+        if data is not None:
+            self.put(key, data)
+        return context
+
+    def summary(self) -> str:
+        return format_hit_rates(self.stats)
+
+
+def format_hit_rates(stats: dict) -> str:
+    """'IngressProcessor 2/3 (66%), ...' from {name: [hits, misses]}."""
+    parts = []
+    for name, (hits, misses) in sorted(stats.items()):
+        total = hits + misses
+        parts.append(f"{name} {hits}/{total} ({100 * hits // total if total else 0}%)")
+    return ', '.join(parts)
@@ -2,6 +2,9 @@
 from .base import BaseProcessor
 
 class MetadataProcessor(BaseProcessor):
+    reads = (('service',), ('inventory_hostname',))
+    writes = (('service',), ('inventory_hostname_friendly',))
+
     def process(self, context: dict) -> dict:
         svc = context.setdefault('service', {})
         name = svc.get('name', 'unknown-service')
@@ -0,0 +1,29 @@
+# scripts/manifest_generator/processors/model.py
+from .base import BaseProcessor
+from ..model import ContextModel
+
+# Transient context key holding the ContextModel; removed before the context is rendered or dumped.
+# Processors reading it also declare the raw paths they consult: the model is derived from them,
+# so it is left out of memo keys.
+CONTEXT_MODEL_KEY = '__model__'
+
+
+def model_of(context: dict) -> ContextModel:
+    """The typed model built after the import, or a fresh one if a processor runs on its own."""
+    model = context.get(CONTEXT_MODEL_KEY)
+    return model if model is not None else ContextModel.from_context(context)
+
+
+class ModelProcessor(BaseProcessor):
+    """
+    Builds the typed ContextModel once after the import: service identity, ports, volumes and one
+    Dependency record per sidecar. Malformed blocks fail here with their path (ContextError).
+    """
+    reads = (('service', 'name'), ('ports',), ('volumes',), ('dependencies',))
+    writes = ((CONTEXT_MODEL_KEY,),)
+    # The records point at the live dependency blocks, a cached copy would detach them
+    memoize = False
+
+    def process(self, context: dict) -> dict:
+        context[CONTEXT_MODEL_KEY] = ContextModel.from_context(context)
+        return context
@@ -1,12 +1,20 @@
 # scripts/manifest_generator/processors/networks.py
 from .base import BaseProcessor
+from .model import CONTEXT_MODEL_KEY, model_of
 
 class NetworkProcessor(BaseProcessor):
+    reads = (('service', 'name'), ('config', 'integrations', 'traefik', 'enabled'), ('ports',),
+             ('deployments', 'docker_compose', 'network_mode'), ('deployments', 'docker_compose', 'networks_to_join'),
+             (CONTEXT_MODEL_KEY,), ('dependencies', '*', 'network_mode'), ('dependencies', '*', 'processed_networks'))
+    # deployments.docker_compose is created if an imported blueprint lacks it
+    writes = (('network_definitions',), ('processed_networks',), ('deployments', 'docker_compose'),
+              ('dependencies', '*', 'processed_networks'))
+
     def process(self, context: dict) -> dict:
         svc_name = context.get('service', {}).get('name', 'app')
         dc = context.setdefault('deployments', {}).setdefault('docker_compose', {})
         cfg = context.get('config', {})
-        ports = context.get('ports', [])
+        model = model_of(context)
         
         # 1. Infrastructure Definitions
         context['network_definitions'] = {
@@ -24,18 +32,18 @@ class NetworkProcessor(BaseProcessor):
             if cfg.get('integrations', {}).get('traefik', {}).get('enabled', False):
                 assigned.append("secured")
             
-            if any(isinstance(p, dict) and p.get('external_port') is not None for p in ports):
+            if any(p.external_port is not None for p in model.ports):
                 assigned.append("exposed")
 
             context['processed_networks'] = sorted(list(set(assigned + dc.get('networks_to_join', []))))
         
         # 3. Dependency Logic (The Fix)
-        for dep_name, dep_cfg in context.get('dependencies', {}).items():
-            if dep_cfg.get('network_mode'):
-                dep_cfg['processed_networks'] = []
+        for dep in model.dependencies:
+            if dep.network_mode:
+                dep.config['processed_networks'] = []
                 continue
 
-            dep_nets = dep_cfg.setdefault('processed_networks', [])
+            dep_nets = dep.config.setdefault('processed_networks', [])
             if "stack_internal" not in dep_nets:
                 dep_nets.append("stack_internal")
 
@@ -1,30 +1,22 @@
 from .base import BaseProcessor
+from .model import CONTEXT_MODEL_KEY, model_of
 
 class PortProcessor(BaseProcessor):
-    def _format_ports(self, ports_data):
-        """Helper to convert port dicts to strings."""
-        processed = []
-        if not isinstance(ports_data, list):
-            return processed
-            
-        for p in ports_data:
-            if not isinstance(p, dict):
-                continue
-            internal = p.get('port')
-            external = p.get('external_port')
-            protocol = p.get('protocol', 'TCP').lower()
-            if internal and external:
-                processed.append(f"{external}:{internal}/{protocol}")
-        return processed
+    reads = ((CONTEXT_MODEL_KEY,), ('ports',), ('dependencies', '*', 'ports'))
+    writes = (('processed_ports',), ('dependencies', '*', 'processed_ports'))
+
+    def _format_ports(self, ports):
+        """Helper to convert Port records to 'external:internal/protocol' strings."""
+        return [p.mapping for p in ports if p.mapping]
 
     def process(self, context: dict) -> dict:
+        model = model_of(context)
+
         # 1. Process Main Service Ports
-        context['processed_ports'] = self._format_ports(context.get('ports', []))
+        context['processed_ports'] = self._format_ports(model.ports)
 
         # 2. Process Dependency Ports (The Fix)
-        for dep_name, dep_cfg in context.get('dependencies', {}).items():
-            # Look for a 'ports' key inside each dependency configuration
-            dep_ports = dep_cfg.get('ports', [])
-            dep_cfg['processed_ports'] = self._format_ports(dep_ports)
+        for dep in model.dependencies:
+            dep.config['processed_ports'] = self._format_ports(dep.ports)
 
         return context
\ No newline at end of file
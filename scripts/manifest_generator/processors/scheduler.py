@@ -0,0 +1,114 @@
+# scripts/manifest_generator/processors/scheduler.py
+import json
+
+from ..timings import span
+
+WILDCARD = '*'
+
+
+class UndeclaredWriteError(RuntimeError):
+    """A processor modified context paths it does not declare in `writes`."""
+
+
+def paths_overlap(a: tuple, b: tuple) -> bool:
+    """True if one path is a prefix of the other ('*' matches any key)."""
+    return all(x == y or WILDCARD in (x, y) for x, y in zip(a, b))
+
+
+def _overlap(paths_a, paths_b) -> bool:
+    if paths_a is None or paths_b is None:
+        return True
+    return any(paths_overlap(a, b) for a in paths_a for b in paths_b)
+
+
+def _without(node, paths):
+    """node with every subtree at one of paths (relative to node) left out; used to detect undeclared writes."""
+    if any(len(p) == 0 for p in paths):
+        return None
+    if isinstance(node, dict):
+        kept = {}
+        for k, v in node.items():
+            sub = [p[1:] for p in paths if p[0] in (k, WILDCARD)]
+            if any(len(p) == 0 for p in sub):
+                continue
+            value = _without(v, sub)
+            # An otherwise empty parent of declared paths (e.g. created by setdefault) belongs to those writes
+            if sub and value == {}:
+                continue
+            kept[str(k)] = value
+        return kept
+    if isinstance(node, list):
+        return [_without(v, [p[1:] for p in paths if p[0] in (i, WILDCARD)]) for i, v in enumerate(node)]
+    return node
+
+
+def _snapshot(context: dict, writes) -> str:
+    return json.dumps(_without(context, list(writes)), sort_keys=True, default=str)
+
+
+class ProcessorPipeline:
+    """
+    Dependency graph of processors, derived from their declared reads/writes.
+    Two processors depend on each other if one writes a path the other reads or writes; the list order
+    decides which one runs first. Processors always run one after another, in list order.
+    `levels` is diagnostic only: it groups processors without such a conflict into stages that could run
+    in any order, to inspect the dependency structure; nothing executes them concurrently.
+    With a memo (ProcessorMemo), processors whose declared inputs were seen before are not re-run.
+    """
+    def __init__(self, processors: list, check_writes: bool = False, memo=None):
+        self.processors = list(processors)
+        # Verifies after every processor that nothing outside its declared writes changed
+        self.check_writes = check_writes
+        self.memo = memo
+        self.graph = self._build_graph()
+        self.levels = self._levels()
+
+    def _build_graph(self) -> dict:
+        """index -> set of indices that must run before it."""
+        graph = {i: set() for i in range(len(self.processors))}
+        for j, b in enumerate(self.processors):
+            for i, a in enumerate(self.processors[:j]):
+                if _overlap(a.writes, b.reads) or _overlap(a.writes, b.writes) or _overlap(a.reads, b.writes):
+                    graph[j].add(i)
+        return graph
+
+    def _levels(self) -> list:
+        """Processors grouped by dependency depth; each group only depends on earlier groups (not used to run them)."""
+        depth = {}
+        for i in range(len(self.processors)):
+            depth[i] = 1 + max((depth[d] for d in self.graph[i]), default=-1)
+        levels = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+        for i, proc in enumerate(self.processors):
+            levels[depth[i]].append(proc)
+        return levels
+
+    def dependencies(self, proc) -> list:
+        """Processors that must run before proc."""
+        index = self.processors.index(proc)
+        return [self.processors[i] for i in sorted(self.graph[index])]
+
+    def __iter__(self):
+        # The list order is always a valid topological order of the graph (edges only point forward)
+        return iter(self.processors)
+
+    def __len__(self):
+        return len(self.processors)
+
+    def _process(self, proc, context: dict) -> dict:
+        with span(type(proc).__name__, 'processor'):
+            # Only processors with declared inputs and outputs can be memoized
+            if self.memo is not None and proc.memoize and proc.reads is not None and proc.writes is not None:
+                return self.memo.run(proc, context)
+            return proc.process(context)
+
+    def run(self, context: dict) -> dict:
+        for proc in self:
+            if self.check_writes and proc.writes is not None:
+                before = _snapshot(context, proc.writes)
+                context = self._process(proc, context)
+                if _snapshot(context, proc.writes) != before:
+                    raise UndeclaredWriteError(
+                        f"{type(proc).__name__} modified the context outside its declared writes {list(proc.writes)}")
+            else:
+                context = self._process(proc, context)
+        return context
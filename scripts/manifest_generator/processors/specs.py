@@ -1,9 +1,13 @@
 from .base import BaseProcessor
+from .model import CONTEXT_MODEL_KEY, model_of
 
 class SpecProcessor(BaseProcessor):
+    # Everything not blacklisted is passed through, so the whole docker_compose and dependency blocks are read
+    reads = (('deployments', 'docker_compose'), ('service', 'name'), (CONTEXT_MODEL_KEY,), ('dependencies',))
+    writes = (('processed_specs',), ('dependencies', '*', 'processed_specs'))
+
     def process(self, context: dict) -> dict:
         dc = context.get('deployments', {}).get('docker_compose', {})
-        main_svc = context.get('service', {}).get('name', 'app')
         
         blacklist = {
             'image', 'container_name', 'hostname', 'restart', 'restart_policy',
@@ -28,23 +32,23 @@ class SpecProcessor(BaseProcessor):
         depends_on_block = {}
 
         # 2. Process Dependencies
-        for dep_name, dep_cfg in context.get('dependencies', {}).items():
-            dep_specs = get_clean_specs(dep_cfg)
-            dep_svc_name = dep_cfg.get('name', f"{main_svc}-{dep_name}")
+        for dep in model_of(context).dependencies:
+            dep_specs = get_clean_specs(dep.config)
             
-            if dep_cfg.get('network_mode') == 'host':
-                extra_hosts = processed_specs.setdefault('extra_hosts', [])
-                mapping = f"{dep_svc_name}:host-gateway"
+            if dep.network_mode == 'host':
+                # get_clean_specs shares its values with docker_compose; this list is appended to
+                extra_hosts = processed_specs['extra_hosts'] = list(processed_specs.get('extra_hosts', []))
+                mapping = f"{dep.name}:host-gateway"
                 if mapping not in extra_hosts:
                     extra_hosts.append(mapping)
             
             # INJECT DEPENDS_ON LOGIC
-            if 'healthcheck' in dep_cfg:
-                depends_on_block[dep_svc_name] = {"condition": "service_healthy"}
+            if dep.has_healthcheck:
+                depends_on_block[dep.name] = {"condition": "service_healthy"}
             else:
-                depends_on_block[dep_svc_name] = {"condition": "service_started"}
+                depends_on_block[dep.name] = {"condition": "service_started"}
 
-            dep_cfg['processed_specs'] = dep_specs
+            dep.config['processed_specs'] = dep_specs
 
         if depends_on_block:
             processed_specs['depends_on'] = depends_on_block
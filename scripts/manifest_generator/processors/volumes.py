@@ -1,11 +1,19 @@
 # scripts/manifest_generator/processors/volumes.py
 from .base import BaseProcessor
+from .model import CONTEXT_MODEL_KEY, model_of
+from ..model import Volume
 
 class VolumeProcessor(BaseProcessor):
-    def _generate_volume_string(self, v_id, v_def, svc_name, base_path, context, mount_str):
+    reads = (('service', 'name'), (CONTEXT_MODEL_KEY,), ('volumes',), ('deployments', 'docker_compose', 'host_base_path'),
+             ('deployments', 'docker_compose', 'volumes'), ('deployments', 'docker_compose', 'raw_volumes'),
+             ('dependencies', '*', 'name'), ('dependencies', '*', 'volumes'))
+    writes = (('processed_volumes',), ('named_volumes',), ('dependencies', '*', 'processed_volumes'))
+
+    def _generate_volume_string(self, volume: Volume, svc_name, base_path, context, mount_str):
         """Helper to generate the final source:target string and register named volumes."""
+        v_id = volume.id
         parts = mount_str.split(':')
-        target = v_def.get('target', f"/{v_id}")
+        target = volume.target
         flags = ""
         
         if len(parts) >= 2:
@@ -15,20 +23,18 @@ class VolumeProcessor(BaseProcessor):
 
         # FIX: Explicitly evaluate 'driver' first. 
         # Any definition with a custom driver belongs in named_volumes.
-        if v_def.get('driver'):
+        if volume.driver:
             source = v_id
-            context['named_volumes'][v_id] = v_def
+            context['named_volumes'][v_id] = volume.definition
         else:
             # Fallback for standard bind mounts or other un-driven types
-            v_type = v_def.get('type', 'bind')
-            
-            if v_type == 'bind':
+            if volume.type == 'bind':
                 # Native support for single-file mounts without Jinja-variables
-                if 'file' in v_def:
-                    source = f"{base_path}/{svc_name}/{v_def['file']}"
+                if volume.file is not None:
+                    source = f"{base_path}/{svc_name}/{volume.file}"
                 else:
                     # Standard behavior for folders or explicit 'source' strings
-                    source = v_def.get('source', f"{base_path}/{svc_name}/{v_id}")
+                    source = volume.source or f"{base_path}/{svc_name}/{v_id}"
             else:
                 source = f"{base_path}/{svc_name}/{v_id}"
 
@@ -38,7 +44,7 @@ class VolumeProcessor(BaseProcessor):
         dc = context.get('deployments', {}).get('docker_compose', {})
         base_path = dc.get('host_base_path', '/export/docker')
         main_svc = context.get('service', {}).get('name', 'app')
-        vol_defs = context.get('volumes', {}) 
+        model = model_of(context)
 
         context['processed_volumes'] = []
         context['named_volumes'] = {}
@@ -49,9 +55,10 @@ class VolumeProcessor(BaseProcessor):
                 continue
                 
             v_id = mount_str.split(':')[0]
-            v_def = vol_defs.get(v_id, {})
+            # Mounts without a root 'volumes' definition fall back to the defaults
+            volume = model.volumes.get(v_id) or Volume.from_dict(v_id, {}, f"volumes.{v_id}")
 
-            vol_string = self._generate_volume_string(v_id, v_def, main_svc, base_path, context, mount_str)
+            vol_string = self._generate_volume_string(volume, main_svc, base_path, context, mount_str)
             context['processed_volumes'].append(vol_string)
             
         # 2. Automatically lift any lingering 'raw_volumes'
@@ -60,27 +67,15 @@ class VolumeProcessor(BaseProcessor):
                 context['processed_volumes'].append(raw_vol)
 
         # 3. Process Dependency Volumes (Sidecars)
-        deps = context.get('dependencies', {})
-        if isinstance(deps, dict):
-            for dep_name, dep_cfg in deps.items():
-                dep_svc_name = dep_cfg.get('name', f"{main_svc}-{dep_name}")
-                dep_cfg['processed_volumes'] = []
-                
-                dep_vols = dep_cfg.get('volumes', {})
-                if not isinstance(dep_vols, dict):
-                    continue
+        for dep in model.dependencies:
+            dep.config['processed_volumes'] = []
 
-                for v_id, v_def in dep_vols.items():
-                    if not isinstance(v_def, dict):
-                        continue
-                        
-                    target = v_def.get('target', f"/{v_id}")
-                    flags = v_def.get('flags', '')
-                    mock_mount_str = f"{v_id}:{target}"
-                    if flags:
-                        mock_mount_str += f":{flags}"
-                        
-                    vol_string = self._generate_volume_string(v_id, v_def, main_svc, base_path, context, mock_mount_str)
-                    dep_cfg['processed_volumes'].append(vol_string)
+            for volume in dep.volumes.values():
+                mock_mount_str = f"{volume.id}:{volume.target}"
+                if volume.flags:
+                    mock_mount_str += f":{volume.flags}"
+                    
+                vol_string = self._generate_volume_string(volume, main_svc, base_path, context, mock_mount_str)
+                dep.config['processed_volumes'].append(vol_string)
 
         return context
\ No newline at end of file
@@ -0,0 +1,323 @@
+# scripts/manifest_generator/schema.py
+"""
+Declarative schemas for service.yml and catalog blueprints, compiled once into validator functions.
+
+A schema is a dict with any of:
+    type      'mapping', 'list', 'string', 'integer', 'number', 'boolean', 'null' or 'scalar' (or a tuple of them)
+    keys      {key: schema} of known mapping keys (unknown keys are allowed)
+    values    schema every mapping value must match
+    items     schema every list item must match
+    required  keys that must be present
+    enum      allowed values
+    typos     {key: message} of keys that are known mistakes
+    legacy    {key: message} of keys the generator still handles, but the linter reports
+    checks    functions(value) yielding (relative path, message) for rules spanning several keys
+    lint      like checks, for rules the generator has a fallback for; only the linter reports them
+Jinja expressions ('{{ ... }}') are accepted wherever a scalar is expected; they are rendered later.
+Only fatal issues stop the generator; the others (legacy keys, lint rules) are for the fleet linter.
+"""
+from dataclasses import dataclass
+
+import yaml
+
+from .catalog import SafeLoader
+
+_TYPES = {
+    'mapping': lambda v: isinstance(v, dict),
+    'list': lambda v: isinstance(v, list),
+    'string': lambda v: isinstance(v, str),
+    'integer': lambda v: isinstance(v, int) and not isinstance(v, bool),
+    'number': lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    'boolean': lambda v: isinstance(v, bool),
+    'null': lambda v: v is None,
+    'scalar': lambda v: v is None or isinstance(v, (str, int, float, bool)),
+}
+_SCALAR_TYPES = {'string', 'integer', 'number', 'boolean', 'scalar'}
+
+
+@dataclass(slots=True)
+class SchemaIssue:
+    path: tuple
+    message: str
+    line: int = None
+    # False for findings the generator can work around (legacy keys, lint rules)
+    fatal: bool = True
+
+    @property
+    def location(self) -> str:
+        """'deployments.docker_compose.ports[0]' style path."""
+        text = ''
+        for key in self.path:
+            text += f"[{key}]" if isinstance(key, int) else (f".{key}" if text else str(key))
+        return text or '<root>'
+
+    def __str__(self):
+        line = f"line {self.line}: " if self.line else ''
+        return f"{line}{self.location}: {self.message}"
+
+
+class SchemaValidationError(ValueError):
+    """A service.yml or blueprint does not match its schema; carries every issue found."""
+    def __init__(self, name: str, issues: list):
+        details = '\n'.join(f"    - {issue}" for issue in issues)
+        super().__init__(f"{name} has {len(issues)} schema error(s):\n{details}")
+        self.issues = issues
+
+
+def _type_name(value) -> str:
+    if value is None:
+        return 'null'
+    return {dict: 'mapping', list: 'list', str: 'string', bool: 'boolean'}.get(type(value), type(value).__name__)
+
+
+def compile_schema(schema: dict):
+    """Turns a schema into validate(value, path, issues), resolving everything that does not depend on the data."""
+    types = schema.get('type')
+    types = (types,) if isinstance(types, str) else tuple(types or ())
+    type_checks = [_TYPES[t] for t in types]
+    allows_template = bool(_SCALAR_TYPES.intersection(types))
+    expected = ' or '.join(types)
+    keys = {k: compile_schema(s) for k, s in schema.get('keys', {}).items()}
+    values = compile_schema(schema['values']) if 'values' in schema else None
+    items = compile_schema(schema['items']) if 'items' in schema else None
+    required = tuple(schema.get('required', ()))
+    enum = tuple(schema.get('enum', ()))
+    typos = dict(schema.get('typos', {}))
+    legacy = dict(schema.get('legacy', {}))
+    checks = tuple(schema.get('checks', ()))
+    lint = tuple(schema.get('lint', ()))
+
+    def validate(value, path: tuple, issues: list):
+        if type_checks and not any(check(value) for check in type_checks):
+            if not (allows_template and isinstance(value, str) and '{{' in value):
+                issues.append(SchemaIssue(path, f"expected {expected}, got {_type_name(value)}"))
+            return
+        if enum and value not in enum and not (isinstance(value, str) and '{{' in value):
+            issues.append(SchemaIssue(path, f"must be one of {', '.join(map(str, enum))}, got {value!r}"))
+        if isinstance(value, dict):
+            for key in required:
+                if key not in value:
+                    issues.append(SchemaIssue(path, f"missing required key '{key}'"))
+            for key, sub in value.items():
+                if key in legacy:
+                    issues.append(SchemaIssue(path + (key,), legacy[key], fatal=False))
+                if key in typos:
+                    issues.append(SchemaIssue(path + (key,), typos[key]))
+                elif key in keys:
+                    keys[key](sub, path + (key,), issues)
+                elif values is not None:
+                    values(sub, path + (key,), issues)
+        elif isinstance(value, list) and items is not None:
+            for i, item in enumerate(value):
+                items(item, path + (i,), issues)
+        for check in checks:
+            for rel_path, message in check(value):
+                issues.append(SchemaIssue(path + tuple(rel_path), message))
+        for check in lint:
+            for rel_path, message in check(value):
+                issues.append(SchemaIssue(path + tuple(rel_path), message, fatal=False))
+
+    return validate
+
+
+# --- Cross-key rules ---
+
+def _get(node, *path):
+    """Value at path, or None if any step is missing or not a mapping."""
+    for key in path:
+        if not isinstance(node, dict):
+            return None
+        node = node.get(key)
+    return node
+
+
+def _dangling_volumes(body):
+    """Mounts in deployments.docker_compose.volumes should reference a root 'volumes:' entry (else defaults apply)."""
+    mounts = _get(body, 'deployments', 'docker_compose', 'volumes')
+    if not isinstance(mounts, list):
+        return
+    defined = _get(body, 'volumes') or {}
+    for i, mount in enumerate(mounts):
+        if not isinstance(mount, str):
+            continue
+        v_id = mount.split(':')[0]
+        # Direct host mounts (/ or .) and Jinja variables are not volume ids
+        if not v_id.startswith(('/', '.', '{{')) and v_id not in defined:
+            yield (('deployments', 'docker_compose', 'volumes', i),
+                   f"dangling volume '{v_id}': mounted, but missing from the root 'volumes:' block")
+
+
+def _traefik_domain(config):
+    """Traefik routing needs a domain to build the host rule from (else local.lan is used)."""
+    if _get(config, 'integrations', 'traefik', 'enabled') is True \
+            and not _get(config, 'domain_name') and not _get(config, 'public_domain_name'):
+        yield (('integrations', 'traefik', 'enabled'), "traefik is enabled, but 'config' has no domain_name")
+
+
+def _standalone_service(ssot):
+    """Without a catalog import, the SSoT itself should define the service identity and its deployment."""
+    if not isinstance(ssot, dict) or 'import' in ssot:
+        return
+    service = ssot.get('service')
+    if service is None:
+        yield ((), "missing required key 'service'")
+    elif isinstance(service, dict):
+        for key in ('name', 'image_repo', 'image_tag', 'stage'):
+            if key not in service:
+                yield (('service',), f"missing required key '{key}'")
+    if _get(ssot, 'deployments', 'docker_compose') is None:
+        yield (('deployments',), "missing required key 'docker_compose'")
+
+
+def _healthcheck_test(healthcheck):
+    """A healthcheck needs a test command, unless it only disables the image's own healthcheck."""
+    if isinstance(healthcheck, dict) and 'test' not in healthcheck and not healthcheck.get('disable'):
+        yield ((), "missing required key 'test' (or 'disable: true')")
+
+
+def _port_protocol(port):
+    """Protocols are written lower-cased, so any spelling of the ones Compose knows is fine."""
+    protocol = _get(port, 'protocol')
+    if isinstance(protocol, str) and '{{' not in protocol and protocol.lower() not in _PROTOCOLS:
+        yield (('protocol',), f"must be one of {', '.join(_PROTOCOLS)}, got {protocol!r}")
+
+
+# --- Building blocks ---
+
+_STRING = {'type': 'string'}
+_BOOL = {'type': 'boolean'}
+_SCALAR = {'type': 'scalar'}
+_PORT_NUMBER = {'type': ('integer', 'string', 'null')}
+_ENV = {'type': ('mapping', 'null'), 'values': _SCALAR}
+_STRINGS = {'type': ('list', 'null'), 'items': _STRING}
+
+_PROTOCOLS = ('tcp', 'udp', 'sctp')
+
+_PORT = {'type': 'mapping', 'keys': {
+    'name': _STRING, 'port': _PORT_NUMBER, 'external_port': _PORT_NUMBER, 'protocol': _STRING,
+}, 'checks': (_port_protocol,)}
+_VOLUME = {'type': ('mapping', 'null'), 'keys': {
+    k: _STRING for k in ('description', 'type', 'target', 'source', 'file', 'driver', 'flags')
+}}
+_HEALTHCHECK = {'type': 'mapping', 'keys': {
+    'test': {'type': ('list', 'string')}, 'interval': _STRING, 'timeout': _STRING, 'start_period': _STRING,
+    'retries': {'type': ('integer', 'string')}, 'disable': _BOOL,
+}, 'checks': (_healthcheck_test,)}
+_DOCKER_COMPOSE = {'type': 'mapping', 'keys': {
+    'restart_policy': _STRING, 'host_base_path': _STRING, 'network_mode': _STRING,
+    'volumes': _STRINGS, 'raw_volumes': _STRINGS, 'networks_to_join': _STRINGS, 'network_definitions': {'type': 'mapping'},
+    'healthcheck': _HEALTHCHECK, 'dot_env': _ENV, 'stack_env': _ENV, 'routing_host_network': _BOOL,
+}, 'typos': {
+    'environments': "typo: must be 'environment'",
+    'security_opts': "typo: must be 'security_opt'",
+    'ports': "misplaced key: 'ports' belongs to the root level",
+}, 'legacy': {
+    'raw_volumes': "legacy key: 'raw_volumes' is lifted into 'volumes', move its mounts there",
+}}
+_SERVICE = {'type': 'mapping', 'keys': {
+    **{k: _STRING for k in ('name', 'friendly_name', 'description', 'category', 'icon', 'stage', 'hostname',
+                            'image_repo')},
+    # Tags like 8.6 are parsed as numbers
+    'image_tag': _SCALAR,
+}}
+_CONFIG = {'type': 'mapping', 'keys': {
+    'domain_name': _STRING, 'public_domain_name': _STRING, 'generate_hostname': _BOOL,
+    'integrations': {'type': 'mapping', 'keys': {
+        'traefik': {'type': 'mapping', 'keys': {
+            'enabled': _BOOL, 'internet_facing': _BOOL, 'cert_resolver': _STRING, 'entrypoint': _STRING,
+            'service_port': _PORT_NUMBER, 'service_scheme': _STRING, 'servers_transport': _STRING,
+        }},
+        'homepage': {'type': 'mapping', 'keys': {'enabled': _BOOL, 'widget': {'type': 'mapping'}}},
+        'autodns': {'type': 'mapping', 'keys': {'enabled': _BOOL, 'create_wildcard': _BOOL}},
+    }},
+}, 'lint': (_traefik_domain,)}
+
+# Keys a sidecar (dependency block or catalog blueprint) may define
+_SIDECAR_KEYS = {
+    'name': _STRING, 'image_repo': _STRING, 'image_tag': _SCALAR, 'restart_policy': _STRING,
+    'network_mode': _STRING, 'networks_to_join': _STRINGS, 'healthcheck': _HEALTHCHECK,
+    'environment': _ENV, 'ports': {'type': ('list', 'null'), 'items': _PORT},
+    'volumes': {'type': ('mapping', 'null'), 'values': _VOLUME},
+}
+_DEPENDENCY = {'type': 'mapping', 'keys': {
+    **_SIDECAR_KEYS, 'import': _STRING, 'overrides': {'type': 'mapping', 'keys': _SIDECAR_KEYS},
+}}
+# Keys of a service definition (root of service.yml, its overrides and stage overrides)
+_BODY_KEYS = {
+    'service': _SERVICE, 'config': _CONFIG, 'environment': _ENV, 'secrets': _ENV,
+    'ports': {'type': ('list', 'null'), 'items': _PORT},
+    'volumes': {'type': ('mapping', 'null'), 'values': _VOLUME},
+    'deployments': {'type': 'mapping', 'keys': {'docker_compose': _DOCKER_COMPOSE}},
+    'dependencies': {'type': ('mapping', 'null'), 'values': _DEPENDENCY},
+}
+_BODY = {'type': 'mapping', 'keys': _BODY_KEYS, 'lint': (_dangling_volumes,)}
+
+SSOT_SCHEMA = {'type': 'mapping', 'keys': {
+    **_BODY_KEYS,
+    'import': _STRING,
+    'overrides': _BODY,
+    'stage_overrides': {'type': 'mapping', 'values': {'type': ('mapping', 'null'), 'keys': {**_BODY_KEYS, 'overrides': _BODY}}},
+    'deployment_strategy': {'type': 'mapping', 'values': {'type': 'mapping', 'keys': {
+        'enabled': _BOOL, 'target_stage': _STRING,
+    }}},
+}, 'lint': (_dangling_volumes, _standalone_service)}
+
+BLUEPRINT_SCHEMA = {'type': 'mapping', 'keys': {**_BODY_KEYS, **_SIDECAR_KEYS}, 'lint': (_dangling_volumes,)}
+
+_validate_ssot = compile_schema(SSOT_SCHEMA)
+_validate_blueprint = compile_schema(BLUEPRINT_SCHEMA)
+
+
+# --- Line numbers ---
+
+def _node_line(root, path: tuple):
+    """1-based line of the deepest node along path in a composed YAML tree."""
+    node, line = root, root.start_mark.line + 1
+    for key in path:
+        if isinstance(node, yaml.MappingNode):
+            for key_node, value_node in node.value:
+                if key_node.value == str(key):
+                    node, line = value_node, key_node.start_mark.line + 1
+                    break
+            else:
+                return line
+        elif isinstance(node, yaml.SequenceNode) and isinstance(key, int) and key < len(node.value):
+            node = node.value[key]
+            line = node.start_mark.line + 1
+        else:
+            return line
+    return line
+
+
+def locate(issues: list, source) -> list:
+    """Fills in the YAML line of every issue; only runs (composes the document again) if there are issues."""
+    if not issues or source is None:
+        return issues
+    try:
+        root = yaml.compose(source, Loader=SafeLoader)
+    except yaml.YAMLError:
+        return issues
+    if root is not None:
+        for issue in issues:
+            issue.line = _node_line(root, issue.path)
+        issues.sort(key=lambda issue: issue.line)
+    return issues
+
+
+def fatal_issues(issues: list) -> list:
+    """The issues the generator cannot work around."""
+    return [issue for issue in issues if issue.fatal]
+
+
+def validate_ssot(data, source=None) -> list:
+    """Every schema issue of a parsed service.yml; source (its text) adds line numbers."""
+    issues = []
+    _validate_ssot(data, (), issues)
+    return locate(issues, source)
+
+
+def validate_blueprint(data, source=None) -> list:
+    """Every schema issue of a parsed catalog blueprint; source (its text) adds line numbers."""
+    issues = []
+    _validate_blueprint(data, (), issues)
+    return locate(issues, source)
@@ -0,0 +1,211 @@
+# scripts/manifest_generator/template_index.py
+import os
+import sys
+import json
+import hashlib
+import argparse
+import threading
+from jinja2 import Environment, meta
+
+from .context import extract_references
+from .fingerprint import engine_version
+
+# (filename, mtime) -> TemplateInfo; a template is parsed once per process as long as it is unchanged
+_INFO_CACHE = {}
+_INFO_LOCK = threading.Lock()
+
+_MISSING = '<undefined>'
+
+
+class TemplateInfo:
+    """What a single template reads from the context and which templates it pulls in."""
+    __slots__ = ('name', 'filename', 'checksum', 'reads', 'includes')
+
+    def __init__(self, name, filename, checksum, reads, includes):
+        self.name = name
+        self.filename = filename
+        self.checksum = checksum
+        # frozenset of context paths, e.g. ('processed_labels',) or ('service', 'name')
+        self.reads = reads
+        # frozenset of included/extended/imported template names, None if any reference is dynamic
+        self.includes = includes
+
+
+def template_info(env: Environment, name: str) -> TemplateInfo:
+    """Parses a template once (per file version) and extracts its context reads and template references."""
+    source, filename, _ = env.loader.get_source(env, name)
+    key = (filename, os.path.getmtime(filename) if filename else source)
+    with _INFO_LOCK:
+        info = _INFO_CACHE.get(key)
+    if info is not None:
+        return info
+
+    ast = env.parse(source)
+    undeclared = meta.find_undeclared_variables(ast)
+    # Loop variables and {% set %} names are template locals; only undeclared roots come from the context
+    reads = frozenset(ref for ref in extract_references(ast, set()) if ref[0] in undeclared)
+
+    includes = set()
+    for ref in meta.find_referenced_templates(ast):
+        if ref is None:
+            includes = None
+            break
+        includes.add(ref)
+
+    info = TemplateInfo(name, filename, hashlib.sha256(source.encode('utf-8')).hexdigest(), reads,
+                        frozenset(includes) if includes is not None else None)
+    with _INFO_LOCK:
+        _INFO_CACHE[key] = info
+    return info
+
+
+def _lookup(context: dict, path: tuple):
+    node = context
+    for key in path:
+        if isinstance(node, dict) and key in node:
+            node = node[key]
+        elif isinstance(node, list) and isinstance(key, int) and -len(node) <= key < len(node):
+            node = node[key]
+        else:
+            return _MISSING
+    return node
+
+
+def _overlaps(a: tuple, b: tuple) -> bool:
+    depth = min(len(a), len(b))
+    return a[:depth] == b[:depth]
+
+
+class TemplateIndex:
+    """
+    Queryable index over the templates of one Environment: which context keys each template reads
+    and which templates include/extend which. Used to re-render only outputs whose inputs changed.
+    """
+    def __init__(self, env: Environment, names: list = None):
+        self.env = env
+        if names is None:
+            names = [n for n in env.list_templates() if n.endswith('.j2')]
+        self.templates = {}
+        for name in names:
+            self.add(name)
+
+    def add(self, name: str):
+        """Indexes a template and, transitively, everything it includes."""
+        if name in self.templates:
+            return
+        info = template_info(self.env, name)
+        self.templates[name] = info
+        for ref in info.includes or ():
+            if ref not in self.templates:
+                try:
+                    self.add(ref)
+                except Exception:
+                    # Unresolvable partials fail at render time with a proper Jinja error
+                    pass
+
+    def includes(self, name: str, transitive: bool = True):
+        """Templates pulled in by name (None if any of them is chosen dynamically)."""
+        found, pending = set(), [name]
+        while pending:
+            info = self.templates.get(pending.pop())
+            if info is None:
+                continue
+            if info.includes is None:
+                return None
+            for ref in info.includes:
+                if ref not in found:
+                    found.add(ref)
+                    if transitive:
+                        pending.append(ref)
+        return found
+
+    def dependents(self, name: str) -> set:
+        """Templates that (transitively) include or extend name, i.e. must re-render when name changes."""
+        return {t for t in self.templates if t != name and (self.includes(t) is None or name in self.includes(t))}
+
+    def reads(self, name: str, transitive: bool = True):
+        """Context paths a template reads, including its partials. None means it may read anything."""
+        members = {name}
+        if transitive:
+            included = self.includes(name)
+            if included is None:
+                return None
+            members |= included
+        paths = set()
+        for member in members:
+            info = self.templates.get(member)
+            if info is not None:
+                paths |= info.reads
+        return paths
+
+    def readers(self, path: tuple) -> set:
+        """Templates whose output depends on the context subtree at path (e.g. ('processed_labels',))."""
+        result = set()
+        for name in self.templates:
+            reads = self.reads(name)
+            if reads is None or any(_overlaps(path, r) for r in reads):
+                result.add(name)
+        return result
+
+    def affected_by(self, changed_paths=(), changed_templates=()) -> set:
+        """Templates to re-render after the given context subtrees and/or template files changed."""
+        affected = set()
+        for path in changed_paths:
+            affected |= self.readers(tuple(path))
+        for name in changed_templates:
+            affected.add(name)
+            affected |= self.dependents(name)
+        return affected
+
+    def input_digest(self, name: str, context: dict) -> str:
+        """
+        Digest of everything the rendered output of name depends on: the template and its partials
+        plus the context values it reads. Equal digests mean the output would be identical.
+        """
+        h = hashlib.sha256(engine_version().encode('utf-8'))
+        included = self.includes(name)
+        members = sorted({name} | (included or set()))
+        for member in members:
+            info = self.templates.get(member)
+            h.update(f"{member}\0{info.checksum if info else _MISSING}\0".encode('utf-8'))
+
+        reads = self.reads(name)
+        values = context if reads is None else {json.dumps(p): _lookup(context, p) for p in sorted(reads, key=str)}
+        # Key order is kept: templates loop over mappings in insertion order (to_yaml does not sort either)
+        h.update(json.dumps(values, default=str).encode('utf-8'))
+        return h.hexdigest()
+
+    def to_dict(self) -> dict:
+        """Plain-data view for tooling: reads and includes per template."""
+        return {
+            name: {
+                'reads': sorted('.'.join(str(p) for p in path) for path in info.reads),
+                'includes': sorted(info.includes) if info.includes is not None else None,
+                'included_by': sorted(self.dependents(name))
+            }
+            for name, info in sorted(self.templates.items())
+        }
+
+
+def main():
+    from .engine import ManifestEngine
+
+    parser = argparse.ArgumentParser(description="Inspect which context keys and partials each template uses")
+    parser.add_argument('--template-path', required=True, help="Path to template engine repo")
+    parser.add_argument('--service-path', default=os.getcwd(), help="Service repository (for custom_templates overrides)")
+    parser.add_argument('--deployment-type', default='docker_compose', help="Template folder (docker_compose, documentation, ...)")
+    parser.add_argument('--changed-path', action='append', default=[], help="Dotted context path, e.g. processed_labels (repeatable)")
+    parser.add_argument('--changed-template', action='append', default=[], help="Template name (repeatable)")
+    args = parser.parse_args()
+
+    index = ManifestEngine(args.template_path, args.service_path).template_index(args.deployment_type)
+    if args.changed_path or args.changed_template:
+        paths = [tuple(p.split('.')) for p in args.changed_path]
+        json.dump(sorted(index.affected_by(paths, args.changed_template)), sys.stdout, indent=2)
+    else:
+        json.dump(index.to_dict(), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
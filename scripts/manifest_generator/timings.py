@@ -0,0 +1,121 @@
+# scripts/manifest_generator/timings.py
+import os
+import json
+import time
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager, nullcontext
+
+# The recorder spans report to; None (the default) makes span() a no-op
+_ACTIVE = None
+_NOOP = nullcontext()
+
+
+class Timings:
+    """
+    Wall and CPU time per phase (input parse, context build passes, processors, templates, file writes).
+    Phases are recorded through span() while the recorder is active (see recording()). Spans nest, e.g. catalog
+    loads inside the ImportProcessor, so totals of different phases may overlap.
+    """
+    def __init__(self):
+        # (name, category, start offset in s, wall s, cpu s, depth, thread id)
+        self.records = []
+        # Epoch time of the recorder's start, to line up recorders of different processes
+        self.origin = time.time()
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def span(self, name: str, category: str = 'phase'):
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - start, time.thread_time() - cpu_start
+            self._local.depth = depth
+            with self._lock:
+                self.records.append((name, category, start - self._origin, wall, cpu, depth, threading.get_ident()))
+
+    def export(self) -> dict:
+        """Picklable snapshot for merge() in another process."""
+        return {'origin': self.origin, 'pid': os.getpid(), 'records': list(self.records)}
+
+    def merge(self, exported: dict):
+        """Adds the records of another recorder (e.g. of a worker process) on this recorder's time line."""
+        offset = exported['origin'] - self.origin
+        with self._lock:
+            for name, category, start, wall, cpu, depth, _ in exported['records']:
+                # One trace lane per process
+                self.records.append((name, category, start + offset, wall, cpu, depth, exported['pid']))
+
+    def totals(self) -> dict:
+        """(category, name) -> [calls, wall s, cpu s]."""
+        totals = {}
+        for name, category, _, wall, cpu, _, _ in self.records:
+            entry = totals.setdefault((category, name), [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += wall
+            entry[2] += cpu
+        return totals
+
+    def summary(self, limit: int = 25) -> str:
+        """The slowest phases by total wall time, one per line."""
+        rows = sorted(self.totals().items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        if not rows:
+            return "  (no timings recorded)"
+        width = max(len(f"{category}:{name}") for (category, name), _ in rows)
+        lines = [f"  {'phase':<{width}} {'calls':>6} {'wall ms':>10} {'cpu ms':>10}"]
+        for (category, name), (calls, wall, cpu) in rows:
+            lines.append(f"  {f'{category}:{name}':<{width}} {calls:>6} {wall * 1000:>10.2f} {cpu * 1000:>10.2f}")
+        return '\n'.join(lines)
+
+    def chrome_trace(self) -> dict:
+        """Trace Event Format (chrome://tracing, Perfetto) with one complete event per span."""
+        pid = os.getpid()
+        return {'traceEvents': [
+            {'name': name, 'cat': category, 'ph': 'X', 'ts': round(start * 1e6, 1), 'dur': round(wall * 1e6, 1),
+             'pid': pid, 'tid': tid, 'args': {'cpu_ms': round(cpu * 1000, 3)}}
+            for name, category, start, wall, cpu, _, tid in sorted(self.records, key=lambda r: (r[6], r[2], r[5]))
+        ], 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f)
+
+
+def span(name: str, category: str = 'phase'):
+    """Times the enclosed block on the active recorder; costs a single lookup when none is active."""
+    recorder = _ACTIVE
+    if recorder is None:
+        return _NOOP
+    return recorder.span(name, category)
+
+
+@contextmanager
+def recording(timings: Timings = None):
+    """Makes timings (a new Timings if not given) the active recorder for the enclosed block."""
+    global _ACTIVE
+    previous, _ACTIVE = _ACTIVE, timings if timings is not None else Timings()
+    try:
+        yield _ACTIVE
+    finally:
+        _ACTIVE = previous
+
+
+@contextmanager
+def profiling(output: str = None, limit: int = 25):
+    """cProfile for the enclosed block; prints the top functions by cumulative time and optionally dumps the stats."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if output:
+            profiler.dump_stats(output)
+            print(f"  [I] cProfile stats written to {output} (inspect with: python -m pstats {output})")
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(limit)
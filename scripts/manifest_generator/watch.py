@@ -0,0 +1,233 @@
+# scripts/manifest_generator/watch.py
+import os
+import sys
+import time
+import ctypes
+import ctypes.util
+import select
+import struct
+
+from .fingerprint import catalog_imports
+
+# A burst of events (an editor's write + rename + chmod, a git checkout) ends after this much quiet time (s)
+DEBOUNCE = 0.2
+POLL_INTERVAL = 0.5
+
+# inotify(7)
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT = struct.Struct('iIII')
+
+
+def input_paths(ssot_file: str, raw_ssot: dict, template_path: str, service_path: str, modes: list) -> dict:
+    """path -> kind ('ssot', 'catalog' or 'templates') of every input a run reads; template folders may not exist yet."""
+    template_path = os.path.abspath(template_path)
+    paths = {os.path.abspath(ssot_file): 'ssot'}
+    for import_path in catalog_imports(raw_ssot, template_path):
+        paths[os.path.join(template_path, import_path)] = 'catalog'
+    for mode in modes:
+        paths[os.path.join(os.path.abspath(service_path), 'custom_templates', mode)] = 'templates'
+        if mode != 'files':
+            paths[os.path.join(template_path, 'templates', mode)] = 'templates'
+    return paths
+
+
+def watch_roots(paths: dict) -> list:
+    """
+    (directory, recursive) pairs to observe: template folders recursively, files through their folder
+    (editors replace files by renaming) and missing paths through their nearest existing parent.
+    """
+    roots = set()
+    for path in paths:
+        if os.path.isdir(path):
+            roots.add((path, True))
+            continue
+        parent = os.path.dirname(path)
+        while parent != os.path.dirname(parent) and not os.path.isdir(parent):
+            parent = os.path.dirname(parent)
+        roots.add((parent, False))
+    return sorted(roots)
+
+
+def classify(changed: set, paths: dict) -> dict:
+    """The changed paths that are (or lie inside) an input, with that input's kind; other files are noise."""
+    found = {}
+    for path in changed:
+        for watched, kind in paths.items():
+            if path == watched:
+                found[path] = kind
+            elif kind == 'templates' and path.startswith(watched + os.sep) and path.endswith('.j2'):
+                found[path] = kind
+    return found
+
+
+class PollingWatcher:
+    """Compares mtime/size snapshots of the roots; works everywhere."""
+    name = 'polling'
+
+    def __init__(self, roots: list, interval: float = POLL_INTERVAL):
+        self.roots = roots
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> dict:
+        found = {}
+        for root, recursive in self.roots:
+            if recursive:
+                entries = [os.path.join(d, n) for d, dirs, files in os.walk(root) for n in dirs + files]
+            else:
+                try:
+                    entries = [os.path.join(root, n) for n in os.listdir(root)]
+                except OSError:
+                    entries = []
+            for path in entries:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                found[path] = (st.st_mtime_ns, st.st_size)
+        return found
+
+    def poll(self, timeout: float) -> set:
+        """Paths created, modified or deleted within timeout seconds."""
+        time.sleep(min(timeout, self.interval))
+        current = self._scan()
+        changed = {p for p in current.keys() | self._snapshot.keys() if current.get(p) != self._snapshot.get(p)}
+        self._snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Linux inotify through libc; directories created below a recursive root are watched as they appear."""
+    name = 'inotify'
+
+    def __init__(self, roots: list):
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # watch descriptor -> (directory, recursive)
+        self._dirs = {}
+        try:
+            for root, recursive in roots:
+                self._add(root, recursive)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def _add(self, directory: str, recursive: bool):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            if errno == 28:  # ENOSPC: out of watches, let the caller fall back to polling
+                raise OSError(errno, "inotify watch limit reached")
+            return
+        self._dirs[wd] = (directory, recursive)
+        if recursive:
+            for entry in os.scandir(directory):
+                if entry.is_dir(follow_symlinks=False):
+                    self._add(entry.path, True)
+
+    def poll(self, timeout: float) -> set:
+        """Paths created, modified or deleted within timeout seconds."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed, offset = set(), 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0')
+            offset += _EVENT.size + length
+            directory, recursive = self._dirs.get(wd, (None, False))
+            if directory is None:
+                continue
+            path = os.path.join(directory, os.fsdecode(name)) if name else directory
+            if recursive and mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO):
+                self._add(path, True)
+                # Files moved or copied in before the new watch existed raised no events of their own
+                changed.update(os.path.join(d, n) for d, _, files in os.walk(path) for n in files)
+            changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+def make_watcher(roots: list, polling: bool = False):
+    """inotify where available, otherwise (or with polling) mtime polling."""
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(roots)
+
+
+def watch(inputs, rebuild, debounce: float = DEBOUNCE, polling: bool = False):
+    """
+    Calls rebuild({changed path: kind}) after every burst of changes to the inputs, until interrupted.
+    inputs() returns the watched paths (see input_paths); it is re-evaluated after each rebuild, since a
+    changed service.yml may import other catalog files.
+    """
+    paths = inputs()
+    roots = watch_roots(paths)
+    missing = {path for path in paths if not os.path.exists(path)}
+    watcher = make_watcher(roots, polling)
+    print(f"\n  [I] Watching {len(paths)} inputs ({watcher.name}). Press Ctrl+C to stop.")
+
+    def poll(timeout):
+        nonlocal roots, watcher
+        events = watcher.poll(timeout)
+        changed = classify(events, paths)
+        if events and watch_roots(paths) != roots:
+            # Parents of a missing input appeared: observe them from now on, the input itself may follow later
+            roots = watch_roots(paths)
+            watcher.close()
+            watcher = make_watcher(roots, polling)
+        # Missing inputs that exist now, even if their creation raised no event on the old roots
+        appeared = {path for path in missing if os.path.exists(path)}
+        missing.difference_update(appeared)
+        changed.update((path, paths[path]) for path in appeared)
+        return events, changed
+
+    try:
+        while True:
+            _, changed = poll(1.0)
+            if not changed:
+                continue
+            # Wait for the burst to settle, so one save triggers one rebuild
+            while True:
+                events, more = poll(debounce)
+                changed.update(more)
+                if not events:
+                    break
+
+            rebuild(changed)
+
+            paths = inputs()
+            missing = {path for path in paths if not os.path.exists(path)}
+            if watch_roots(paths) != roots:
+                roots = watch_roots(paths)
+                watcher.close()
+                watcher = make_watcher(roots, polling)
+    except KeyboardInterrupt:
+        print("\n  [I] Stopped watching.")
+    finally:
+        watcher.close()
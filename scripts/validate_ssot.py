@@ -1,99 +1,206 @@
 import os
 import sys
+import json
+import hashlib
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree import ElementTree
+
 import yaml
 
-def validate_ssot(yaml_path):
-    with open(yaml_path, 'r', encoding='utf-8') as f:
-        try:
-            data = yaml.safe_load(f)
-        except Exception as e:
-            return [f"FATAL YAML Parse Error: {e}"]
+from manifest_generator import schema
+from manifest_generator.catalog import load_yaml
+from manifest_generator.fleet import discover_services
+from manifest_generator.schema import validate_blueprint, validate_ssot
+
+APPLICATIONS_ENV = 'AAC_APPLICATIONS_DIR'
+LINT_CACHE_ENV = 'AAC_LINT_CACHE'
+LINT_CACHE_FILE = '.ssot-lint-cache.json'
+
+# Below this many files to parse, starting worker processes costs more than it saves
+POOL_THRESHOLD = 16
 
+
+def _linter_version() -> str:
+    """Digest of the linter and the schemas; cached results of an older linter are not trusted."""
+    h = hashlib.sha256()
+    for path in (__file__, schema.__file__):
+        with open(os.path.abspath(path), 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def lint_source(source: bytes, kind: str = 'ssot') -> list:
+    """Parses one service.yml ('ssot') or catalog blueprint ('blueprint') and checks it against its schema."""
+    try:
+        text = source.decode('utf-8-sig')
+        data = load_yaml(text)
+    except yaml.MarkedYAMLError as e:
+        return [f"line {e.problem_mark.line + 1}: FATAL YAML Parse Error: {e.problem}"]
+    except (UnicodeDecodeError, yaml.YAMLError) as e:
+        return [f"FATAL YAML Parse Error: {e}"]
     if not data:
         return ["File is completely empty."]
+    validate = validate_ssot if kind == 'ssot' else validate_blueprint
+    return [str(issue) for issue in validate(data, text)]
+
+
+def lint_file(path: str, kind: str = 'ssot') -> list:
+    with open(path, 'rb') as f:
+        return lint_source(f.read(), kind)
+
+
+class LintCache:
+    """Results of earlier runs keyed by file kind and the sha256 of each file's content."""
+    def __init__(self, path: str = None):
+        self.path = path
+        self.version = _linter_version()
+        self.entries = {}
+        if path:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    loaded = json.load(f)
+                if loaded.get('version') == self.version:
+                    self.entries = loaded['results']
+            except (OSError, ValueError, KeyError):
+                pass
+
+    def get(self, key: str):
+        return self.entries.get(key)
+
+    def save(self, results: list):
+        if not self.path:
+            return
+        # Only the current fleet is kept, so the cache does not grow with every edit
+        data = {'version': self.version, 'results': {f"{r['kind']}:{r['hash']}": r['errors'] for r in results}}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"  [!] Could not write lint cache {self.path}: {e}", file=sys.stderr)
+
 
-    errors = []
+def catalog_files(catalog_dir: str) -> list:
+    """Every blueprint (*.yml/*.yaml) below a catalog directory, sorted."""
+    found = []
+    for root, dirs, files in os.walk(catalog_dir):
+        dirs.sort()
+        found += [os.path.abspath(os.path.join(root, n)) for n in sorted(files) if n.endswith(('.yml', '.yaml'))]
+    return found
 
-    # 1. Mandatory Service Keys
-    svc = data.get('service', {})
-    if not svc:
-        errors.append("Missing root block: 'service'")
+
+def lint_fleet(ssot_files: list, jobs: int = 1, cache: LintCache = None, blueprints: list = ()) -> list:
+    """
+    Lints every service.yml (and catalog blueprint) and returns [{'name', 'path', 'kind', 'hash', 'errors', 'cached'}]
+    in input order. Files whose content hash is in the cache are not parsed again; the rest is spread across a
+    process pool.
+    """
+    cache = cache or LintCache()
+    results, pending = [], []
+    files = [(path, 'ssot') for path in ssot_files] + [(path, 'blueprint') for path in blueprints]
+    for path, kind in files:
+        with open(path, 'rb') as f:
+            source = f.read()
+        digest = hashlib.sha256(source).hexdigest()
+        errors = cache.get(f"{kind}:{digest}")
+        name = os.path.basename(os.path.dirname(path)) if kind == 'ssot' else os.path.basename(path)
+        result = {'name': name, 'path': path, 'kind': kind, 'hash': digest, 'errors': errors, 'cached': errors is not None}
+        results.append(result)
+        if errors is None:
+            pending.append((result, source))
+
+    sources = [source for _, source in pending]
+    kinds = [result['kind'] for result, _ in pending]
+    if jobs > 1 and len(pending) >= POOL_THRESHOLD:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as pool:
+            found = list(pool.map(lint_source, sources, kinds, chunksize=max(1, len(sources) // (jobs * 4))))
+    else:
+        found = [lint_source(source, kind) for source, kind in zip(sources, kinds)]
+    for (result, _), errors in zip(pending, found):
+        result['errors'] = errors
+    return results
+
+
+def format_json(results: list) -> str:
+    return json.dumps({
+        'total': len(results),
+        'failed': sum(1 for r in results if r['errors']),
+        'results': results
+    }, indent=2)
+
+
+def format_junit(results: list) -> str:
+    root = ElementTree.Element('testsuites')
+    suite = ElementTree.SubElement(root, 'testsuite', name='ssot-lint', tests=str(len(results)),
+                                   failures=str(sum(1 for r in results if r['errors'])))
+    for r in results:
+        case = ElementTree.SubElement(suite, 'testcase', classname=r['name'], name=os.path.basename(r['path']),
+                                      file=r['path'])
+        if r['errors']:
+            failure = ElementTree.SubElement(case, 'failure', message=f"{len(r['errors'])} error(s)")
+            failure.text = '\n'.join(r['errors'])
+    return ElementTree.tostring(root, encoding='unicode', xml_declaration=True)
+
+
+def format_text(results: list) -> str:
+    failed = [r for r in results if r['errors']]
+    lines = ["======================================================",
+             "🔎 RUNNING SSOT LINTER (STRICT MODE)",
+             "======================================================"]
+    for r in failed:
+        lines.append(f"\n❌ {r['name']}")
+        lines.extend(f"   - {err}" for err in r['errors'])
+    lines.append("\n======================================================")
+    if not failed:
+        lines.append(f"✅ ALL {len(results)} FILES PASSED VALIDATION.")
     else:
-        for req in ['name', 'image_repo', 'image_tag', 'stage']:
-            if req not in svc:
-                errors.append(f"Missing mandatory key: 'service.{req}'")
-
-    # 2. Deployment Block Exists
-    dc = data.get('deployments', {}).get('docker_compose', {})
-    if not dc:
-        errors.append("Missing block: 'deployments.docker_compose'")
-
-    # 3. Dangling Volumes (Mounted but not defined)
-    defined_volumes = data.get('volumes', {}) or {}
-    for vol_str in dc.get('volumes', []):
-        if not isinstance(vol_str, str):
-            continue
-            
-        v_id = vol_str.split(':')[0]
-        
-        # Ignore direct host mounts (start with / or .) and Jinja variables (start with {{)
-        if not v_id.startswith('/') and not v_id.startswith('.') and not v_id.startswith('{{'):
-            if v_id not in defined_volumes:
-                errors.append(f"Dangling Volume: '{v_id}' is mounted in docker_compose, but missing from root 'volumes:' block.")
-
-    # 4. Common Typos and Misplaced Keys
-    if 'environments' in dc:
-        errors.append("Typo: Found 'environments' in docker_compose. It must be 'environment'.")
-    if 'security_opts' in dc:
-        errors.append("Typo: Found 'security_opts'. It must be 'security_opt'.")
-    if 'raw_volumes' in dc:
-        errors.append("Legacy Code: 'raw_volumes' still exists.")
-    if 'ports' in dc:
-        errors.append("Misplaced Key: 'ports' should be at the root level, not inside 'deployments.docker_compose'.")
-
-    # 5. Traefik Domain Validation
-    cfg = data.get('config', {})
-    traefik_enabled = cfg.get('integrations', {}).get('traefik', {}).get('enabled', False)
-    if traefik_enabled:
-        if not cfg.get('domain_name') and not cfg.get('public_domain_name'):
-            errors.append("Traefik enabled, but no 'domain_name' found in 'config:' block.")
-
-    return errors
+        lines.append(f"⚠️  {len(failed)} out of {len(results)} files have errors.")
+    lines.append("======================================================")
+    return '\n'.join(lines)
+
+
+FORMATTERS = {'text': format_text, 'json': format_json, 'junit': format_junit}
+
 
 def main():
-    base_dir = r"C:\Users\Shared\Workdirektory\Code-Infra\GitLab\aac-application-defenitions\applications"
-    
-    print("======================================================")
-    print("🔎 RUNNING SSOT LINTER (STRICT MODE)")
-    print("======================================================")
-
-    if not os.path.exists(base_dir):
-        print(f"Directory not found: {base_dir}")
+    parser = argparse.ArgumentParser(description="Lints the service.yml of every application repository against its schema")
+    parser.add_argument('paths', nargs='*', help=f"service.yml files, repositories or directories of repositories (default: ${APPLICATIONS_ENV})")
+    parser.add_argument('--catalog', action='append', default=[],
+                        help="Also lint every blueprint in this catalog directory (repeatable)")
+    parser.add_argument('--jobs', '-j', type=int, default=0, help="Parallel worker processes (0 = one per CPU core)")
+    parser.add_argument('--format', choices=sorted(FORMATTERS), default='text', help="Report format")
+    parser.add_argument('--output', '-o', help="Write the report to this file instead of stdout")
+    parser.add_argument('--cache', default=os.getenv(LINT_CACHE_ENV, LINT_CACHE_FILE),
+                        help=f"Result cache keyed by file hash (default: ${LINT_CACHE_ENV} or ./{LINT_CACHE_FILE})")
+    parser.add_argument('--no-cache', action='store_true', help="Lint every file, do not read or write the cache")
+    args = parser.parse_args()
+
+    paths = args.paths or ([os.environ[APPLICATIONS_ENV]] if os.getenv(APPLICATIONS_ENV) else [])
+    if not paths and not args.catalog:
+        parser.error(f"no paths given and ${APPLICATIONS_ENV} is not set")
+    try:
+        ssot_files = discover_services(paths)
+    except FileNotFoundError as e:
+        print(f"Directory not found: {e}")
         sys.exit(1)
+    blueprints = [path for catalog_dir in args.catalog for path in catalog_files(catalog_dir)]
+
+    cache = LintCache(None if args.no_cache else args.cache)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    results = lint_fleet(ssot_files, jobs, cache, blueprints)
+    cache.save(results)
 
-    total_repos = 0
-    failed_repos = 0
-
-    for entry in os.listdir(base_dir):
-        repo_path = os.path.join(base_dir, entry)
-        if os.path.isdir(repo_path):
-            yaml_path = os.path.join(repo_path, 'service.yml')
-            if os.path.exists(yaml_path):
-                total_repos += 1
-                errors = validate_ssot(yaml_path)
-                
-                if errors:
-                    failed_repos += 1
-                    print(f"\n❌ {entry}")
-                    for err in errors:
-                        print(f"   - {err}")
-
-    print("\n======================================================")
-    if failed_repos == 0:
-        print(f"✅ ALL {total_repos} REPOSITORIES PASSED VALIDATION.")
+    report = FORMATTERS[args.format](results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report + '\n')
     else:
-        print(f"⚠️  {failed_repos} out of {total_repos} repositories have errors.")
-    print("======================================================")
+        print(report)
+    sys.exit(1 if any(r['errors'] for r in results) else 0)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
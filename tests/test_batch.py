@@ -0,0 +1,63 @@
+# tests/test_batch.py
+import os
+import shutil
+import pytest
+from manifest_generator.batch import discover_services, run_batch
+
+ENGINE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICE_TEST = os.path.join(ENGINE_ROOT, "tests", "service-test")
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_batch_renders_every_service_and_stage(tmp_path, jobs):
+    """Verifies that one process renders each (service, stage) unit into its own deployments directory."""
+    # 1. Setup a fleet directory with two service repositories
+    fleet = tmp_path / "applications"
+    for repo in ("aac-one", "aac-two"):
+        shutil.copytree(SERVICE_TEST, fleet / repo)
+
+    # 2. Discover and render
+    ssot_files = discover_services([str(fleet)])
+    results = run_batch(ssot_files, ["dev", "prod"], ENGINE_ROOT, explicit_stages=True, jobs=jobs)
+
+    # 3. Assertions
+    assert [os.path.basename(os.path.dirname(f)) for f in ssot_files] == ["aac-one", "aac-two"]
+    assert len(results) == 4
+    # Results come back in input order, whether rendered serially or in a pool
+    assert [(os.path.basename(os.path.dirname(r["service"])), r["stage"]) for r in results] == [
+        ("aac-one", "dev"), ("aac-one", "prod"), ("aac-two", "dev"), ("aac-two", "prod")
+    ]
+    assert all(r["ok"] for r in results)
+    for repo in ("aac-one", "aac-two"):
+        for stage in ("dev", "prod"):
+            out = fleet / repo / "deployments" / stage
+            assert (out / "ansible_context.json").is_file()
+            assert (out / "docker_compose" / "docker-compose.yml").is_file()
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_batch_collects_phase_timings(tmp_path, jobs):
+    """Verifies that per-unit phase timings are merged into one recorder and exported as a Chrome trace."""
+    from manifest_generator.timings import Timings
+
+    # 1. Setup a fleet with two service repositories
+    fleet = tmp_path / "applications"
+    for repo in ("aac-one", "aac-two"):
+        shutil.copytree(SERVICE_TEST, fleet / repo)
+
+    # 2. Render with a recorder
+    timings = Timings()
+    results = run_batch(discover_services([str(fleet)]), ["dev"], ENGINE_ROOT, explicit_stages=True,
+                        jobs=jobs, timings=timings)
+    assert all(r["ok"] for r in results)
+
+    # 3. Every unit contributed its processors, templates and writes
+    totals = timings.totals()
+    assert totals[("unit", "aac-one (dev)")][0] == 1
+    assert totals[("processor", "ImportProcessor")][0] == 2
+    assert totals[("template", "docker-compose.yml.j2")][0] == 2
+    assert any(category == "write" for category, _ in totals)
+    assert "processor:ImportProcessor" in timings.summary()
+
+    # 4. The trace has one complete event per span
+    trace = timings.chrome_trace()["traceEvents"]
+    assert len(trace) == len(timings.records)
+    assert {event["ph"] for event in trace} == {"X"}
@@ -0,0 +1,22 @@
+# tests/test_benchmarks.py
+import os
+from benchmarks.suite import compare, run_suite
+
+ENGINE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_benchmark_suite_runs_every_phase():
+    """Verifies that the synthetic fixtures go through every phase and that slowdowns are flagged."""
+    # 1. One small service and a tiny fleet, a single round each
+    results = run_suite(ENGINE_ROOT, ["small"], rounds=1, fleet=2)
+
+    # 2. Every phase was measured
+    for phase in ("schema.validate", "context.build", "processor.ImportProcessor", "processor.AnsibleProcessor",
+                  "render.all", "render.files", "render.documentation"):
+        assert results[f"small/{phase}"] > 0
+    assert results["fleet.serial"] > 0 and results["fleet.incremental"] > 0
+
+    # 3. Regressions beyond the threshold (and the noise floor) are reported
+    baseline = {"small/context.build": 1.0, "small/render.all": 1.0}
+    assert compare({"small/context.build": 1.2, "small/render.all": 2.0}, baseline, 0.25) == [
+        "small/render.all: 1.000 ms -> 2.000 ms (+100%)"
+    ]
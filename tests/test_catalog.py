@@ -0,0 +1,32 @@
+# tests/test_catalog.py
+from manifest_generator import catalog
+from manifest_generator.catalog import build_catalog_index, clear_catalog_cache, load_blueprint
+
+def test_blueprints_are_parsed_once_and_copied(tmp_path, monkeypatch):
+    """Verifies that a blueprint is parsed once per process and every caller gets its own mutable copy."""
+    clear_catalog_cache()
+    (tmp_path / "catalog").mkdir()
+    (tmp_path / "catalog" / "mariadb.yml").write_text("service:\n  image_repo: mariadb\nports: [3306]\n")
+
+    parses = []
+    original = catalog.load_yaml
+    monkeypatch.setattr(catalog, "load_yaml", lambda f: parses.append(f.name) or original(f))
+
+    # 1. Repeated imports share one parse but never share mutable state
+    first = load_blueprint(str(tmp_path), "catalog/mariadb.yml")
+    first["ports"].append(1234)
+    second = load_blueprint(str(tmp_path), "catalog/mariadb.yml")
+    assert second == {"service": {"image_repo": "mariadb"}, "ports": [3306]}
+    assert len(parses) == 1
+
+    # 2. The pre-compiled index serves blueprints without parsing YAML at all
+    assert build_catalog_index(str(tmp_path)) == 1
+    clear_catalog_cache()
+    parses.clear()
+    assert load_blueprint(str(tmp_path), "catalog/mariadb.yml") == second
+    assert parses == []
+
+    # 3. A blueprint edited after indexing is parsed again
+    (tmp_path / "catalog" / "mariadb.yml").write_text("service:\n  image_repo: mariadb-custom\n")
+    assert load_blueprint(str(tmp_path), "catalog/mariadb.yml") == {"service": {"image_repo": "mariadb-custom"}}
+    assert len(parses) == 1
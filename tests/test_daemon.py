@@ -0,0 +1,105 @@
+# tests/test_daemon.py
+import os
+import json
+import shutil
+import threading
+import urllib.error
+import urllib.request
+import pytest
+from manifest_generator.daemon import Generator, make_server
+from manifest_generator.pipeline import generate, load_ssot
+
+ENGINE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICE_TEST = os.path.join(ENGINE_ROOT, "tests", "service-test")
+
+def test_daemon_renders_in_memory_with_warm_contexts(tmp_path):
+    """Verifies that the daemon returns the same manifests as a CLI run and reuses processed contexts."""
+    # 1. Setup a service checkout and the reference output on disk
+    repo = tmp_path / "aac-nextcloud"
+    shutil.copytree(SERVICE_TEST, repo)
+    generate(load_ssot(str(repo / "service.yml")), ENGINE_ROOT, "prod", str(repo), str(tmp_path / "out"),
+             current_branch="main", strategy_stage=False)
+
+    # 2. Start the daemon on a free port
+    server = make_server(Generator(ENGINE_ROOT, max_concurrent=2, cache_size=1), port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def post(path, payload):
+        request = urllib.request.Request(url + path, json.dumps(payload).encode(), {"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.load(response)
+        except urllib.error.HTTPError as e:
+            return e.code, json.load(e)
+
+    try:
+        ssot = (repo / "service.yml").read_text()
+        request = {"ssot": ssot, "stage": "prod", "outputs": ["compose", "ansible"], "service_path": str(repo)}
+
+        # 3. First request builds the context, the second one reuses it
+        status, first = post("/render", request)
+        assert status == 200 and first["status"] == "rendered" and not first["cached_context"]
+        for name in ("docker_compose/docker-compose.yml", "docker_compose/.env", "ansible_context.json"):
+            assert first["files"][name] == (tmp_path / "out" / name).read_text()
+        status, second = post("/render", request)
+        assert second["cached_context"] and second["files"] == first["files"]
+
+        # 4. Another stage evicts the only cache slot
+        assert post("/render", dict(request, stage="dev"))[1]["cached_context"] is False
+        assert post("/render", request)[1]["cached_context"] is False
+
+        # 5. Invalid input is rejected with every schema issue
+        status, error = post("/render", {"ssot": {"service": {"name": 5}}, "stage": "dev"})
+        assert status == 422 and error["issues"]
+        assert post("/render", {"ssot": ssot})[0] == 400
+
+        with urllib.request.urlopen(url + "/health") as response:
+            health = json.load(response)
+        assert health["requests"] == 6 and health["contexts"]["evictions"] == 2
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_daemon_sandboxes_requests_and_requires_a_token_beyond_loopback(tmp_path):
+    """Verifies that SSoT expressions and templates cannot reach Python internals and that auth is enforced."""
+    # 1. Setup a service checkout whose custom template tries the same escape
+    repo = tmp_path / "aac-nextcloud"
+    shutil.copytree(SERVICE_TEST, repo)
+    (repo / "custom_templates" / "docker_compose").mkdir()
+    (repo / "custom_templates" / "docker_compose" / "stack.env.j2").write_text(
+        "PID={{ cycler.__init__.__globals__.os.getpid() }}\n")
+    ssot = (repo / "service.yml").read_text()
+    escape = "{{ cycler.__init__.__globals__.os.getpid() }}"
+
+    # 2. Non-loopback addresses need a token
+    with pytest.raises(ValueError, match="without a token"):
+        make_server(Generator(ENGINE_ROOT), host="0.0.0.0", port=0)
+    server = make_server(Generator(ENGINE_ROOT), port=0, token="s3cret")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def post(payload, token="s3cret"):
+        headers = {"Content-Type": "application/json", "Authorization": f"Bearer {token}"}
+        request = urllib.request.Request(url + "/render", json.dumps(payload).encode(), headers)
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.load(response)
+        except urllib.error.HTTPError as e:
+            return e.code, json.load(e)
+
+    try:
+        assert post({"ssot": ssot, "stage": "dev"}, token="wrong")[0] == 401
+
+        # 3. The escape is rejected in the SSoT and in templates, the pid never leaks
+        status, error = post({"ssot": ssot.replace('"Selfhosted Cloud Plattform"', f'"{escape}"'), "stage": "dev"})
+        assert status == 400 and "Unsafe" in error["error"]
+        status, error = post({"ssot": ssot, "stage": "dev", "service_path": str(repo)})
+        assert status == 400 and str(os.getpid()) not in json.dumps(error)
+
+        # 4. Regular requests still render
+        status, result = post({"ssot": ssot, "stage": "dev"})
+        assert status == 200 and "docker_compose/docker-compose.yml" in result["files"]
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,91 @@
+# tests/test_engine.py
+import pytest
+from manifest_generator.engine import ManifestEngine, clear_environment_cache, configure_bytecode_cache, precompile_templates
+
+@pytest.fixture
+def engine_and_services(tmp_path):
+    """Creates a global template tree and two service repositories, one of them overriding a template."""
+    clear_environment_cache()
+    base = tmp_path / "engine"
+    (base / "templates" / "docker_compose").mkdir(parents=True)
+    (base / "templates" / "docker_compose" / "compose.yml.j2").write_text("name: {{ service.name }}\n")
+    (base / "templates" / "docker_compose" / "stack.env.j2").write_text("STAGE={{ stage }}\n")
+
+    plain = tmp_path / "plain"
+    plain.mkdir()
+    custom = tmp_path / "custom"
+    (custom / "custom_templates" / "docker_compose").mkdir(parents=True)
+    (custom / "custom_templates" / "docker_compose" / "stack.env.j2").write_text("CUSTOM={{ stage }}\n")
+
+    return str(base), str(plain), str(custom)
+
+def test_engine_reuses_compiled_global_templates(engine_and_services):
+    """Verifies that services share compiled global templates and only overrides come from the overlay."""
+    base, plain, custom = engine_and_services
+
+    plain_templates = {n: t for n, t, _ in ManifestEngine(base, plain)._load_templates("docker_compose")}
+    custom_templates = {n: t for n, t, _ in ManifestEngine(base, custom)._load_templates("docker_compose")}
+
+    # The untouched global template is the very same compiled object for both services
+    assert plain_templates["compose.yml.j2"] is custom_templates["compose.yml.j2"]
+    # The override is served from the service overlay
+    assert custom_templates["stack.env.j2"].render(stage="dev") == "CUSTOM=dev"
+    assert plain_templates["stack.env.j2"].render(stage="dev") == "STAGE=dev"
+
+def test_engine_renders_into_output_path(engine_and_services, tmp_path):
+    """Verifies that render_all writes below the configured output path."""
+    base, _, custom = engine_and_services
+    out = tmp_path / "out"
+
+    ManifestEngine(base, custom, str(out)).render_all({"service": {"name": "aac-app"}, "stage": "prod"}, "docker_compose")
+
+    assert (out / "docker_compose" / "compose.yml").read_text() == "name: aac-app"
+    assert (out / "docker_compose" / "stack.env").read_text() == "CUSTOM=prod"
+
+def test_engine_persists_bytecode_cache(engine_and_services, tmp_path):
+    """Verifies that warming the cache writes one bytecode entry per compiled template."""
+    base, _, _ = engine_and_services
+    cache_dir = tmp_path / "jinja-cache"
+
+    configure_bytecode_cache(str(cache_dir))
+    try:
+        assert precompile_templates(base, ["docker_compose"]) == 2
+    finally:
+        configure_bytecode_cache(None)
+
+    assert len(list(cache_dir.iterdir())) == 2
+
+def test_template_index_tracks_reads_and_includes(tmp_path):
+    """Verifies that the index knows which context keys and partials each template uses."""
+    clear_environment_cache()
+    base = tmp_path / "engine"
+    (base / "templates" / "docker_compose").mkdir(parents=True)
+    (base / "templates" / "docker_compose" / "compose.yml.j2").write_text(
+        "{% include '_labels.j2' %}\n{% for port in service.ports %}{{ port }}{% endfor %}\n")
+    (base / "templates" / "docker_compose" / "_labels.j2").write_text("{{ processed_labels | to_yaml }}")
+    (base / "templates" / "docker_compose" / "stack.env.j2").write_text("STAGE={{ stage }}\n")
+
+    index = ManifestEngine(str(base), str(tmp_path)).template_index("docker_compose")
+
+    assert index.reads("compose.yml.j2") == {("processed_labels",), ("service", "ports")}
+    assert index.dependents("_labels.j2") == {"compose.yml.j2"}
+    assert index.affected_by([("processed_labels",)]) == {"compose.yml.j2", "_labels.j2"}
+    assert index.affected_by([("stage",)]) == {"stack.env.j2"}
+    assert index.affected_by(changed_templates=["_labels.j2"]) == {"compose.yml.j2", "_labels.j2"}
+
+def test_engine_skips_templates_with_unchanged_inputs(engine_and_services, tmp_path):
+    """Verifies that only templates reading a changed context key are re-rendered."""
+    base, plain, _ = engine_and_services
+    out = tmp_path / "out"
+
+    first = ManifestEngine(base, plain, str(out))
+    first.render_all({"service": {"name": "aac-app"}, "stage": "dev"}, "docker_compose")
+    previous = {path: {"inputs": digest, "output": first.writer.hashes[path]} for path, digest in first.renders.items()}
+
+    second = ManifestEngine(base, plain, str(out))
+    second.previous_renders = previous
+    second.render_all({"service": {"name": "aac-app"}, "stage": "prod"}, "docker_compose")
+
+    assert second.writer.written == [str(out / "docker_compose" / "stack.env")]
+    assert second.writer.unchanged == [str(out / "docker_compose" / "compose.yml")]
+    assert (out / "docker_compose" / "stack.env").read_text() == "STAGE=prod"
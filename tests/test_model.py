@@ -0,0 +1,42 @@
+# tests/test_model.py
+import json
+import pytest
+from manifest_generator.model import ContextError, ContextModel
+from manifest_generator.pipeline import build_processors, build_context
+
+def test_context_model_types_structural_blocks():
+    """Verifies that ports, volumes and sidecars are exposed as typed records backed by the context."""
+    context = {
+        "service": {"name": "aac-app"},
+        "ports": [{"port": 80, "external_port": 8080}, {"port": 9000}],
+        "volumes": {"data": {"target": "/data"}, "cache": {"driver": "local"}},
+        "dependencies": {"db": {"image_repo": "MariaDB", "healthcheck": {}, "volumes": {"db": {}, "tmp": None}}},
+    }
+
+    model = ContextModel.from_context(context)
+
+    assert [p.mapping for p in model.ports] == ["8080:80/tcp", None]
+    assert model.volumes["data"].target == "/data" and model.volumes["cache"].driver == "local"
+    db = model.dependencies[0]
+    assert (db.name, db.is_database, db.has_healthcheck) == ("aac-app-db", True, True)
+    assert db.volumes["db"].target == "/db" and "tmp" not in db.volumes
+    # Records point at the live context blocks, processors write through them
+    assert db.config is context["dependencies"]["db"]
+
+def test_malformed_context_fails_before_rendering(tmp_path):
+    """Verifies that structural mistakes are reported with their path instead of failing inside a template."""
+    ssot = {"service": {"name": "aac-app"}, "ports": ["8080:80"]}
+
+    with pytest.raises(ContextError, match=r"'ports\[0\]': expected a mapping, got str"):
+        build_context(json.dumps(ssot), "dev", build_processors(str(tmp_path)), current_branch="main")
+
+def test_null_sidecar_volumes_are_not_mounted(tmp_path):
+    """Verifies that a sidecar volume without a definition is skipped, while root volumes fall back to defaults."""
+    ssot = {"service": {"name": "aac-app"}, "volumes": {"data": None},
+            "deployments": {"docker_compose": {"volumes": ["data:/data"]}},
+            "dependencies": {"db": {"volumes": {"db": None, "conf": {"target": "/etc/db"}}}}}
+
+    context = build_context(json.dumps(ssot), "dev", build_processors(str(tmp_path)), current_branch="main")
+
+    assert context["processed_volumes"] == ["/export/docker/aac-app/data:/data"]
+    assert context["dependencies"]["db"]["processed_volumes"] == ["/export/docker/aac-app/conf:/etc/db"]
@@ -0,0 +1,73 @@
+# tests/test_output.py
+import os
+from manifest_generator.output import OutputWriter
+
+def test_output_writer_skips_identical_content(tmp_path):
+    """Verifies that unchanged outputs are not rewritten, so their mtime stays stable."""
+    target = tmp_path / "docker_compose" / "docker-compose.yml"
+
+    # 1. First run creates the file (including missing directories)
+    first = OutputWriter()
+    assert first.write(str(target), "services: {}\n") is True
+    os.utime(target, (1_000_000, 1_000_000))
+
+    # 2. Identical content is a no-op
+    second = OutputWriter()
+    assert second.write(str(target), "services: {}\n") is False
+    assert os.stat(target).st_mtime == 1_000_000
+    assert second.counts() == {"written": 0, "unchanged": 1, "removed": 0}
+
+    # 3. Changed content is replaced atomically and leaves no temp files behind
+    assert second.write(str(target), "services: {app: {}}\n") is True
+    assert target.read_text() == "services: {app: {}}\n"
+    assert os.listdir(target.parent) == ["docker-compose.yml"]
+
+def test_output_writer_prunes_stale_outputs(tmp_path):
+    """Verifies that files from templates that no longer exist are removed."""
+    out = tmp_path / "files"
+    writer = OutputWriter()
+    writer.write(str(out / "config" / "keep.yml"), "keep")
+    writer.write(str(out / "old" / "stale.yml"), "stale")
+
+    writer.prune(str(out), {str(out / "config" / "keep.yml")})
+
+    assert (out / "config" / "keep.yml").is_file()
+    assert not (out / "old").exists()
+    assert writer.summary() == "2 written, 0 unchanged, 1 removed"
+
+def test_context_formats_and_sidecars(tmp_path):
+    """Verifies that every context format round-trips and that 'pretty' matches json.dumps(indent=2)."""
+    import json
+    from manifest_generator import context_io
+    from manifest_generator.context_io import read_context, write_context
+
+    context = {"service": {"name": "app", "description": "Grüße"}, "ports": [{"port": 80}], "deployment_enabled": True}
+    writer = OutputWriter()
+
+    # 1. Pretty keeps the historic byte layout (non-ASCII is escaped, whichever encoder runs)
+    write_context(context, str(tmp_path), writer, 'pretty', ['gzip'])
+    assert (tmp_path / "ansible_context.json").read_text() == json.dumps(context, indent=2)
+    assert read_context(str(tmp_path / "ansible_context.json.gz")) == context
+
+    # 2. Streamed output of the stdlib encoder is identical, and unchanged content is not rewritten
+    orjson, context_io.orjson = context_io.orjson, None
+    try:
+        assert writer.write_chunks(str(tmp_path / "ansible_context.json"), context_io.json_chunks(context)) is False
+    finally:
+        context_io.orjson = orjson
+    assert sorted(os.listdir(tmp_path)) == ["ansible_context.json", "ansible_context.json.gz"]
+
+    # 3. Compact is smaller and reads back to the same context
+    write_context(context, str(tmp_path), writer, 'compact')
+    assert b"\n" not in (tmp_path / "ansible_context.json").read_bytes()
+    assert read_context(str(tmp_path / "ansible_context.json")) == context
+
+def test_context_floats_match_the_json_module():
+    """Verifies that floats orjson formats differently (exponents, NaN, Infinity) are written like json.dumps."""
+    import json
+    from manifest_generator.context_io import json_chunks
+
+    for value in (0.5, 1e16, 1e-07, -2.5e-300, float("nan"), float("inf")):
+        context = {"limits": {"cpus": value, "ratios": [1.25, value]}, "plain": 0.25}
+        assert b"".join(json_chunks(context)).decode() == json.dumps(context, indent=2)
+        assert b"".join(json_chunks(context, compact=True)).decode() == json.dumps(context, separators=(",", ":"))
@@ -0,0 +1,169 @@
+# tests/test_pipeline.py
+import os
+import json
+import shutil
+import tarfile
+import zipfile
+from manifest_generator.output import ArchiveWriter
+from manifest_generator.pipeline import load_ssot, generate, iter_service, render_service
+
+ENGINE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICE_TEST = os.path.join(ENGINE_ROOT, "tests", "service-test")
+
+def test_generate_skips_unchanged_inputs(tmp_path):
+    """Verifies that the fingerprint manifest turns a repeated run into a no-op and catches template edits."""
+    # 1. Setup a service repository
+    repo = tmp_path / "aac-nextcloud"
+    shutil.copytree(SERVICE_TEST, repo)
+    ssot_json = load_ssot(str(repo / "service.yml"))
+    out = str(repo / "deployments")
+
+    def run():
+        return generate(ssot_json, ENGINE_ROOT, "dev", str(repo), out, current_branch="main")
+
+    # 2. First run renders, second run is skipped entirely
+    assert run()["status"] == "rendered"
+    assert run()["status"] == "unchanged"
+
+    # 3. A new service override re-renders without rebuilding the context
+    overrides = repo / "custom_templates" / "docker_compose"
+    overrides.mkdir(parents=True)
+    (overrides / "stack.env.j2").write_text("OVERRIDDEN=true\n")
+    result = run()
+    assert result["status"] == "rendered"
+    assert (repo / "deployments" / "docker_compose" / "stack.env").read_text() == "OVERRIDDEN=true"
+
+    # 4. Manually edited outputs are detected and regenerated
+    (repo / "deployments" / "docker_compose" / "stack.env").write_text("tampered")
+    assert run()["status"] == "rendered"
+    assert (repo / "deployments" / "docker_compose" / "stack.env").read_text() == "OVERRIDDEN=true"
+
+def test_generate_rerenders_when_only_key_order_changes(tmp_path):
+    """Verifies that reordered environment keys re-render the files that list them in order."""
+    repo = tmp_path / "aac-nextcloud"
+    shutil.copytree(SERVICE_TEST, repo)
+    out = tmp_path / "out"
+
+    def run():
+        ssot_json = load_ssot(str(repo / "service.yml"))
+        return generate(ssot_json, ENGINE_ROOT, "dev", str(repo), str(out), current_branch="main")
+
+    run()
+    service = repo / "service.yml"
+    service.write_text(service.read_text().replace('PUID: "1000"\n  PGID: "1000"', 'PGID: "1000"\n  PUID: "1000"'))
+    assert run()["status"] == "rendered"
+    env = (out / "docker_compose" / ".env").read_text()
+    assert env.index("PGID") < env.index("PUID")
+
+def test_generate_tracks_catalog_files_imported_through_overrides_and_blueprints(tmp_path):
+    """Verifies that editing a blueprint imported below the SSoT's root re-renders instead of being skipped."""
+    # 1. Setup an engine copy whose app blueprint declares its own cache sidecar
+    engine = tmp_path / "engine"
+    shutil.copytree(os.path.join(ENGINE_ROOT, "templates"), engine / "templates")
+    shutil.copytree(os.path.join(ENGINE_ROOT, "catalog"), engine / "catalog")
+    (engine / "catalog" / "app.yml").write_text(
+        "image_repo: app\ndependencies:\n  cache:\n    import: catalog/redis.yml\n")
+    ssot_json = json.dumps({"import": "catalog/app.yml", "overrides": {
+        "service": {"name": "my-app"},
+        "dependencies": {"db": {"import": "catalog/mariadb.yml", "overrides": {"name": "my-app-db"}}}}})
+
+    def run():
+        return generate(ssot_json, str(engine), "dev", str(tmp_path), str(tmp_path / "out"), current_branch="main")["status"]
+
+    assert run() == "rendered"
+    assert run() == "unchanged"
+
+    # 2. The sidecar imported through overrides.dependencies and the one the blueprint declares both count
+    for blueprint, old, new in (("mariadb.yml", "mariadb", "mysql"), ("redis.yml", "redis", "valkey")):
+        path = engine / "catalog" / blueprint
+        path.write_text(path.read_text().replace(f'image_repo: "{old}"', f'image_repo: "{new}"'))
+        assert run() == "rendered"
+        assert f'image: "{new}:' in (tmp_path / "out" / "docker_compose" / "docker-compose.yml").read_text()
+
+def test_generate_stages_renders_each_stage_in_one_pass(tmp_path):
+    """Verifies that --stages output matches separate single-stage runs."""
+    from manifest_generator.pipeline import generate_stages
+
+    # 1. Setup a service repository
+    repo = tmp_path / "aac-nextcloud"
+    shutil.copytree(SERVICE_TEST, repo)
+    ssot_json = load_ssot(str(repo / "service.yml"))
+
+    # 2. All stages in one pass vs. one run per stage
+    results = generate_stages(ssot_json, ENGINE_ROOT, ["dev", "prod"], str(repo), str(tmp_path / "multi"),
+                              current_branch="main")
+    assert {stage: r["status"] for stage, r in results.items()} == {"dev": "rendered", "prod": "rendered"}
+    for stage in ("dev", "prod"):
+        single = tmp_path / "single" / stage
+        generate(ssot_json, ENGINE_ROOT, stage, str(repo), str(single), current_branch="main", strategy_stage=False)
+        for name in ("ansible_context.json", "docker_compose/docker-compose.yml", "docker_compose/.env"):
+            assert (tmp_path / "multi" / stage / name).read_text() == (single / name).read_text()
+
+    # 3. The stages really differ (prod overrides the domain)
+    assert (tmp_path / "multi" / "dev" / "ansible_context.json").read_text() != \
+        (tmp_path / "multi" / "prod" / "ansible_context.json").read_text()
+
+def test_generate_renders_several_outputs_from_one_context(tmp_path):
+    """Verifies that --outputs renders every selected family like separate runs and skips them together."""
+    # 1. Setup a service repository (without the custom file that needs a compose-only key)
+    repo = tmp_path / "aac-nextcloud"
+    shutil.copytree(SERVICE_TEST, repo)
+    (repo / "custom_templates" / "files" / "config" / "traefik.yml.j2").unlink()
+    ssot_json = load_ssot(str(repo / "service.yml"))
+
+    def run(out, **options):
+        return generate(ssot_json, ENGINE_ROOT, "dev", str(repo), str(tmp_path / out), current_branch="main", **options)
+
+    # 2. One combined run vs. one run per family
+    assert run("combined", outputs=["compose", "files", "docs", "ansible"])["status"] == "rendered"
+    run("single", deployment_type="docker_compose")
+    run("single", process_files=True)
+    run("single", process_documentation=True)
+    for name in ("ansible_context.json", "docker_compose/docker-compose.yml", "files/config/dynamic/traefik-dynamic.yml",
+                 "documentation/docs/index.md", "documentation/mkdocs.yml"):
+        assert (tmp_path / "combined" / name).read_text() == (tmp_path / "single" / name).read_text()
+
+    # 3. Unchanged inputs skip all families; without 'ansible' no context is written
+    assert run("combined", outputs=["compose", "files", "docs", "ansible"])["status"] == "unchanged"
+    assert run("compose-only", outputs=["compose"])["status"] == "rendered"
+    assert not (tmp_path / "compose-only" / "ansible_context.json").exists()
+    assert run("compose-only", outputs=["compose"])["status"] == "unchanged"
+
+def test_generate_keeps_the_enabled_flag_with_a_top_level_import(tmp_path):
+    """Verifies that a service importing its whole definition from the catalog still renders."""
+    ssot_json = json.dumps({"import": "catalog/redis.yml", "overrides": {"service": {"name": "my-redis"}}})
+    result = generate(ssot_json, ENGINE_ROOT, "dev", str(tmp_path), str(tmp_path / "out"), current_branch="main")
+    assert result["status"] == "rendered" and result["context"]["deployment_enabled"] is True
+    assert (tmp_path / "out" / "docker_compose" / "docker-compose.yml").exists()
+    assert "docker_compose/docker-compose.yml" in render_service(ssot_json, "dev", ENGINE_ROOT)
+
+def test_render_service_returns_outputs_without_touching_disk(tmp_path):
+    """Verifies that the in-memory API matches a disk run and streams into deterministic archives."""
+    # 1. Setup a service repository and the reference output on disk
+    repo = tmp_path / "aac-nextcloud"
+    shutil.copytree(SERVICE_TEST, repo)
+    (repo / "custom_templates" / "files" / "config" / "traefik.yml.j2").unlink()
+    outputs = ["compose", "files", "docs", "ansible"]
+    generate(load_ssot(str(repo / "service.yml")), ENGINE_ROOT, "dev", str(repo), str(tmp_path / "out"),
+             current_branch="main", outputs=outputs)
+    on_disk = {os.path.relpath(os.path.join(d, n), tmp_path / "out"): open(os.path.join(d, n)).read()
+               for d, _, files in os.walk(tmp_path / "out") for n in files if n != ".fingerprints.json"}
+
+    # 2. Same files in memory; the generator yields them one by one
+    rendered = render_service(str(repo / "service.yml"), "dev", ENGINE_ROOT, str(repo), outputs)
+    assert rendered == on_disk
+    stream = iter_service((repo / "service.yml").read_text(), "dev", ENGINE_ROOT, outputs=["compose"])
+    assert next(stream)[0].startswith("docker_compose" + os.sep)
+    assert dict(stream).keys() <= rendered.keys()
+    assert not (repo / "deployments").exists()
+
+    # 3. Archive sinks hold the same files and are byte-identical across runs
+    for name in ("a.zip", "b.zip", "a.tar.gz", "b.tar.gz"):
+        with ArchiveWriter(str(tmp_path / name)) as sink:
+            render_service(str(repo / "service.yml"), "dev", ENGINE_ROOT, str(repo), outputs, sink=sink, root="deployments")
+    assert (tmp_path / "a.zip").read_bytes() == (tmp_path / "b.zip").read_bytes()
+    assert (tmp_path / "a.tar.gz").read_bytes() == (tmp_path / "b.tar.gz").read_bytes()
+    with zipfile.ZipFile(tmp_path / "a.zip") as archive:
+        assert archive.read("deployments/ansible_context.json").decode() == on_disk["ansible_context.json"]
+    with tarfile.open(tmp_path / "a.tar.gz") as archive:
+        assert sorted(archive.getnames()) == sorted(os.path.join("deployments", p) for p in on_disk)
@@ -1,9 +1,17 @@
 # tests/test_processors.py
 import pytest
 import os
+import json
 import yaml
 from manifest_generator.processors.imports import ImportProcessor
 from manifest_generator.processors.volumes import VolumeProcessor
+from manifest_generator.processors.metadata import MetadataProcessor
+from manifest_generator.processors.base import BaseProcessor
+from manifest_generator.processors.scheduler import ProcessorPipeline, UndeclaredWriteError
+from manifest_generator.processors.memo import ProcessorMemo
+from manifest_generator.pipeline import build_processors, build_context, load_ssot
+
+ENGINE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 @pytest.fixture
 def temp_engine_dir(tmp_path):
@@ -100,4 +108,111 @@ def test_volume_processor_prevents_hijack():
     
     # Ensure Database volume correctly nests under the MAIN application folder
     assert len(dep_vols) == 1
-    assert "/export/docker/aac-nextcloud/db:/var/lib/mysql" in dep_vols
\ No newline at end of file
+    assert "/export/docker/aac-nextcloud/db:/var/lib/mysql" in dep_vols
+
+def test_processor_declarations_cover_their_writes():
+    """Verifies that every built-in processor only writes the context paths it declares."""
+    ssot_json = load_ssot(os.path.join(ENGINE_ROOT, "tests", "service-test", "service.yml"))
+    processors = build_processors(ENGINE_ROOT, check_writes=True)
+
+    for stage in ("dev", "prod"):
+        build_context(ssot_json, stage, processors, current_branch="main", strategy_stage=False)
+    # A whole-service import lacks deployments, which is created on the way to the declared writes
+    imported = json.dumps({"import": "catalog/redis.yml", "overrides": {"service": {"name": "my-redis"}}})
+    build_context(imported, "dev", processors, current_branch="main", strategy_stage=False)
+
+    # Independent processors share a level; the importer replaces the context and stands alone
+    assert [type(p).__name__ for p in processors.levels[0]] == ["ImportProcessor"]
+    assert [type(p).__name__ for p in processors.levels[1]] == ["ModelProcessor"]
+    assert {"MetadataProcessor", "PortProcessor", "EnvironmentProcessor"} == {type(p).__name__ for p in processors.levels[2]}
+
+def test_processor_pipeline_rejects_undeclared_writes():
+    """Verifies that a processor touching keys outside its declared writes fails fast."""
+    class SneakyProcessor(BaseProcessor):
+        reads = (("service",),)
+        writes = (("processed_labels",),)
+
+        def process(self, context):
+            context["processed_labels"] = {}
+            context["service"]["name"] = "hijacked"
+            return context
+
+    # Reading 'service' makes it depend on the metadata processor (which writes it), not on the volumes
+    metadata, volumes, sneaky = MetadataProcessor(), VolumeProcessor(), SneakyProcessor()
+    pipeline = ProcessorPipeline([metadata, volumes, sneaky], check_writes=True)
+    assert pipeline.dependencies(sneaky) == [metadata]
+    with pytest.raises(UndeclaredWriteError, match="SneakyProcessor"):
+        pipeline.run({"service": {"name": "aac-app"}})
+
+def test_processor_memo_reuses_results_for_identical_inputs(tmp_path):
+    """Verifies that memoized processors return the same context and hit when only unrelated keys change."""
+    ssot_json = load_ssot(os.path.join(ENGINE_ROOT, "tests", "service-test", "service.yml"))
+    plain = build_processors(ENGINE_ROOT)
+    memo = ProcessorMemo(directory=str(tmp_path / "memo"))
+    memoized = build_processors(ENGINE_ROOT, memo=memo)
+
+    # 1. Results are identical to an unmemoized run, for every stage
+    expected = {}
+    for stage in ("dev", "prod"):
+        expected[stage] = build_context(ssot_json, stage, plain, current_branch="main", strategy_stage=False)
+        actual = build_context(ssot_json, stage, memoized, current_branch="main", strategy_stage=False)
+        assert json.dumps(actual) == json.dumps(expected[stage])
+    hits, misses = memo.stats["IngressProcessor"]
+    assert hits + misses == 2
+
+    # 2. A fresh process (new memo on the same directory) hits the persisted results, stored as JSON
+    fresh = ProcessorMemo(directory=str(tmp_path / "memo"))
+    context = build_context(ssot_json, "dev", build_processors(ENGINE_ROOT, memo=fresh), current_branch="main", strategy_stage=False)
+    assert context == expected["dev"]
+    assert all(misses == 0 for _, misses in fresh.stats.values())
+    assert "ImportProcessor" not in fresh.stats
+    entries = list((tmp_path / "memo").rglob("*.*"))
+    assert entries and all(entry.suffix == ".json" for entry in entries)
+
+    # 3. Changing an input of one processor only misses for the processors reading it
+    ssot = json.loads(ssot_json)
+    ssot["config"]["domain_name"] = "changed.example.com"
+    build_context(json.dumps(ssot), "dev", build_processors(ENGINE_ROOT, memo=fresh), current_branch="main", strategy_stage=False)
+    assert fresh.stats["IngressProcessor"] == [1, 1]
+    assert fresh.stats["VolumeProcessor"] == [2, 0]
+
+    # 4. Corrupt entries are ignored and the processors run again
+    for entry in entries:
+        entry.write_bytes(b"\x80 not json")
+    again = ProcessorMemo(directory=str(tmp_path / "memo"))
+    context = build_context(ssot_json, "dev", build_processors(ENGINE_ROOT, memo=again), current_branch="main", strategy_stage=False)
+    assert context == expected["dev"]
+    assert again.stats["VolumeProcessor"] == [0, 1]
+
+def test_dependency_model_is_built_once_and_not_rendered():
+    """Verifies that sidecar facts are derived once and the records never reach the rendered context."""
+    ssot_json = load_ssot(os.path.join(ENGINE_ROOT, "tests", "service-test", "service.yml"))
+    context = build_context(ssot_json, "dev", build_processors(ENGINE_ROOT), current_branch="main", strategy_stage=False)
+
+    assert "__model__" not in context
+    database = context["dependencies"]["database"]
+    # Ownership of the database volume follows the image detection of the dependency record
+    db_dirs = [d for d in context["ansible_directories"] if d["path"] in {v.split(":")[0] for v in database["processed_volumes"]}]
+    assert db_dirs and all(d["owner"] == "999" for d in db_dirs)
+
+def test_cli_checks_writes_with_host_network_sidecars(tmp_path):
+    """Verifies that host-network sidecars extend extra_hosts without touching the docker_compose block."""
+    import subprocess
+    import sys
+
+    # 1. A service with its own extra_hosts and a sidecar on the host network
+    ssot = yaml.safe_load(open(os.path.join(ENGINE_ROOT, "tests", "service-test", "service.yml"), encoding="utf-8"))
+    ssot["deployments"]["docker_compose"]["extra_hosts"] = ["gateway:10.0.0.1"]
+    ssot["dependencies"]["redis"]["overrides"]["network_mode"] = "host"
+    (tmp_path / "service.yml").write_text(yaml.safe_dump(ssot, sort_keys=False))
+
+    # 2. The CLI runs with the write check enabled
+    result = subprocess.run([sys.executable, "-m", "manifest_generator.main", "--ssot-json", "service.yml",
+                             "--template-path", ENGINE_ROOT, "--stage", "dev"], cwd=tmp_path, capture_output=True,
+                            text=True, env=dict(os.environ, PYTHONPATH=os.path.join(ENGINE_ROOT, "scripts")))
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    # 3. Only processed_specs carries the sidecar mapping
+    context = json.loads((tmp_path / "deployments" / "ansible_context.json").read_text())
+    assert context["deployments"]["docker_compose"]["extra_hosts"] == ["gateway:10.0.0.1"]
+    assert context["processed_specs"]["extra_hosts"] == ["gateway:10.0.0.1", "aac-nextcloud-redis:host-gateway"]
@@ -0,0 +1,84 @@
+# tests/test_schema.py
+import os
+import json
+import pytest
+
+from manifest_generator.catalog import load_yaml
+from manifest_generator.pipeline import render_service, validate_inputs
+from manifest_generator.schema import SchemaValidationError, validate_ssot
+
+ENGINE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SSOT = """\
+service:
+  name: "aac-app"
+  image_repo: "app"
+  image_tag: 8.6
+  stage: "dev"
+ports:
+  - port: "{{ config.port }}"
+    protocol: "HTTP"
+volumes:
+  data: {target: "/data"}
+deployments:
+  docker_compose:
+    environments: {A: "1"}
+    volumes:
+      - "data:/data"
+      - "cache:/cache"
+config:
+  integrations:
+    traefik:
+      enabled: "yes"
+"""
+
+def test_schema_reports_every_issue_with_line_numbers():
+    """Verifies that one pass finds all issues, in file order, and that Jinja expressions pass as scalars."""
+    issues = validate_ssot(load_yaml(SSOT), SSOT)
+
+    assert [str(i) for i in issues] == [
+        "line 8: ports[0].protocol: must be one of tcp, udp, sctp, got 'HTTP'",
+        "line 13: deployments.docker_compose.environments: typo: must be 'environment'",
+        "line 16: deployments.docker_compose.volumes[1]: dangling volume 'cache': mounted, but missing from the root 'volumes:' block",
+        "line 20: config.integrations.traefik.enabled: expected boolean, got string",
+    ]
+
+def test_validate_inputs_checks_imported_blueprints(tmp_path):
+    """Verifies that a broken catalog blueprint aborts with its own file name and line."""
+    (tmp_path / "catalog").mkdir()
+    (tmp_path / "catalog" / "db.yml").write_text("image_repo: db\nports:\n  - port: 5432\n    external_port: [1]\n")
+    ssot = {"service": {"name": "a", "image_repo": "a", "image_tag": "1", "stage": "dev"},
+            "deployments": {"docker_compose": {}},
+            "dependencies": {"db": {"import": "catalog/db.yml"}}}
+
+    with pytest.raises(SchemaValidationError) as exc:
+        validate_inputs(json.dumps(ssot), str(tmp_path))
+
+    assert "catalog/db.yml has 1 schema error(s)" in str(exc.value)
+    assert str(exc.value.issues[0]) == "line 4: ports[0].external_port: expected integer or string or null, got list"
+
+def test_generator_only_stops_on_issues_it_cannot_work_around():
+    """Verifies that legacy keys and lint rules are reported, but do not stop what the processors still handle."""
+    # 1. Standalone service without a stage, lifted raw_volumes, a default-backed mount, disabled healthchecks
+    ssot = {"service": {"name": "a", "image_repo": "a", "image_tag": "1"},
+            "ports": [{"port": 53, "external_port": 53, "protocol": "Udp"}],
+            "deployments": {"docker_compose": {"volumes": ["cache:/cache"], "raw_volumes": ["/srv/x:/x"],
+                                               "healthcheck": {"disable": True}}},
+            "dependencies": {"db": {"image_repo": "postgres", "healthcheck": {"disable": True}}}}
+    issues = validate_ssot(ssot)
+    assert {str(i) for i in issues} == {
+        "deployments.docker_compose.raw_volumes: legacy key: 'raw_volumes' is lifted into 'volumes', move its mounts there",
+        "deployments.docker_compose.volumes[0]: dangling volume 'cache': mounted, but missing from the root 'volumes:' block",
+        "service: missing required key 'stage'",
+    }
+    assert not any(i.fatal for i in issues)
+
+    # 2. The generator renders it; nothing waits on a healthcheck that is switched off
+    compose = render_service(json.dumps(ssot), "dev", ENGINE_ROOT)["docker_compose/docker-compose.yml"]
+    assert compose.count("disable: true") == 2 and "condition: service_started" in compose
+    assert "/srv/x:/x" in compose and "53:53/udp" in compose
+
+    # 3. A healthcheck without a test still needs 'disable'
+    ssot["deployments"]["docker_compose"]["healthcheck"] = {"interval": "10s"}
+    with pytest.raises(SchemaValidationError, match="missing required key 'test'"):
+        validate_inputs(json.dumps(ssot), ENGINE_ROOT)
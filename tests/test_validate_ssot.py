@@ -0,0 +1,41 @@
+# tests/test_validate_ssot.py
+import os
+import shutil
+from xml.etree import ElementTree
+
+from manifest_generator.fleet import discover_services
+from validate_ssot import LintCache, format_junit, lint_fleet
+
+SERVICE_TEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "service-test")
+
+def test_lint_fleet_reports_and_caches_results(tmp_path):
+    """Verifies that broken repositories are reported and unchanged files are served from the cache."""
+    # 1. Setup a fleet with one valid, one malformed and one incomplete repository
+    fleet = tmp_path / "applications"
+    shutil.copytree(SERVICE_TEST, fleet / "aac-good")
+    (fleet / "aac-broken").mkdir()
+    (fleet / "aac-broken" / "service.yml").write_text("service: [\n")
+    (fleet / "aac-incomplete").mkdir()
+    (fleet / "aac-incomplete" / "service.yml").write_text("service:\n  name: x\ndeployments:\n  docker_compose: {security_opts: []}\n")
+    ssot_files = discover_services([str(fleet)])
+
+    # 2. First run parses everything
+    cache_file = str(tmp_path / "lint-cache.json")
+    cache = LintCache(cache_file)
+    results = lint_fleet(ssot_files, jobs=1, cache=cache)
+    cache.save(results)
+    errors = {os.path.basename(os.path.dirname(r["path"])): r["errors"] for r in results}
+    assert errors["aac-good"] == []
+    assert errors["aac-broken"][0].startswith("line 2: FATAL YAML Parse Error")
+    assert "line 4: deployments.docker_compose.security_opts: typo: must be 'security_opt'" in errors["aac-incomplete"]
+    assert not any(r["cached"] for r in results)
+
+    # 3. Second run only parses the edited file
+    (fleet / "aac-broken" / "service.yml").write_text("service: {name: x}\n")
+    rerun = lint_fleet(ssot_files, jobs=1, cache=LintCache(cache_file))
+    assert [r["cached"] for r in rerun] == [False, True, True]
+    assert [r["errors"] for r in rerun][1:] == [errors["aac-good"], errors["aac-incomplete"]]
+
+    # 4. JUnit report has one failing test case per broken repository
+    suite = ElementTree.fromstring(format_junit(rerun)).find("testsuite")
+    assert suite.get("tests") == "3" and suite.get("failures") == "2"
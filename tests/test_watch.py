@@ -0,0 +1,65 @@
+# tests/test_watch.py
+import time
+import _thread
+import threading
+import pytest
+from manifest_generator.watch import input_paths, watch
+
+@pytest.mark.parametrize("polling", [True, False])
+def test_watch_debounces_and_classifies_changes(tmp_path, polling):
+    """Verifies that a burst of saves triggers one rebuild with the changed inputs and ignores unrelated files."""
+    # 1. Setup a service repository and an engine with a catalog blueprint
+    engine = tmp_path / "engine"
+    (engine / "templates" / "docker_compose").mkdir(parents=True)
+    (engine / "templates" / "docker_compose" / "docker-compose.yml.j2").write_text("services: {}\n")
+    (engine / "catalog").mkdir()
+    (engine / "catalog" / "redis.yml").write_text("image_repo: redis\n")
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "service.yml").write_text("service: {name: app}\n")
+    raw = {"dependencies": {"cache": {"import": "catalog/redis.yml"}}}
+
+    paths = input_paths(str(repo / "service.yml"), raw, str(engine), str(repo), ["docker_compose"])
+    assert sorted(paths.values()) == ["catalog", "ssot", "templates", "templates"]
+
+    # 2. Edit inputs in bursts while watching; each burst waits for the previous rebuild, the third ends the watch
+    rebuilds = []
+    rebuilt = threading.Semaphore(0)
+
+    def rebuild(changed):
+        rebuilds.append(changed)
+        rebuilt.release()
+        if len(rebuilds) == 3:
+            raise KeyboardInterrupt
+
+    def wait_for_rebuild():
+        # Ends the watch (and fails the assertions below) instead of hanging if a change is missed
+        if not rebuilt.acquire(timeout=10):
+            _thread.interrupt_main()
+            return False
+        return True
+
+    def edit():
+        time.sleep(0.6)
+        (repo / "notes.txt").write_text("unrelated")
+        for i in range(3):
+            (repo / "service.yml").write_text(f"service: {{name: app{i}}}\n")
+            time.sleep(0.02)
+        if not wait_for_rebuild():
+            return
+        # A custom template folder that did not exist before is picked up, although only its parent was watched
+        (repo / "custom_templates").mkdir()
+        time.sleep(0.5)
+        (repo / "custom_templates" / "docker_compose").mkdir()
+        if not wait_for_rebuild():
+            return
+        (engine / "catalog" / "redis.yml").write_text("image_repo: valkey\n")
+
+    threading.Thread(target=edit, daemon=True).start()
+    watch(lambda: paths, rebuild, debounce=0.3, polling=polling)
+
+    # 3. Assertions
+    assert len(rebuilds) == 3
+    assert set(rebuilds[0].values()) == {"ssot"}
+    assert rebuilds[1] == {str(repo / "custom_templates" / "docker_compose"): "templates"}
+    assert set(rebuilds[2].values()) == {"catalog"}